@@ -8,6 +8,9 @@ Process Tracker — CLI (stdlib argparse)
   python -m process_tracker.cli init-db
   python -m process_tracker.cli seed-rbac
   python -m process_tracker.cli create-user --email you@example.com --password-prompt
+  python -m process_tracker.cli export tasks --format csv -o tasks.csv
+  python -m process_tracker.cli import tasks tasks.ndjson
+  python -m process_tracker.cli bench-sqlite --writers 16 --ops 50 [--dir /var/lib/process_tracker]
 
   # как скрипт из src/process_tracker/
   python cli.py init-db
@@ -66,10 +69,10 @@ async def cmd_seed_rbac(_args) -> None:
     await init_db()
 
     # потом сеем
-    from process_tracker.db.session import AsyncSessionLocal
+    from process_tracker.db.session import AsyncWriteSessionLocal
     from process_tracker.db.seed import seed_rbac
     setup_logging, logger = _logging()
-    async with AsyncSessionLocal() as session:
+    async with AsyncWriteSessionLocal() as session:
         await seed_rbac(session)
     logger.info("rbac_seeded")
 
@@ -150,7 +153,7 @@ async def cmd_create_user(args) -> None:
     await init_db()
 
     from process_tracker.core.security import hash_password
-    from process_tracker.db.session import AsyncSessionLocal
+    from process_tracker.db.session import AsyncWriteSessionLocal
     from process_tracker.db.dal.user_repo import UserRepo
     from process_tracker.db.dal.role_repo import RoleRepo
 
@@ -179,7 +182,7 @@ async def cmd_create_user(args) -> None:
     if not roles:
         roles = ["user"]
 
-    async with AsyncSessionLocal() as session:
+    async with AsyncWriteSessionLocal() as session:
         urepo = UserRepo(session)
         rrepo = RoleRepo(session)
 
@@ -221,6 +224,82 @@ async def cmd_create_user(args) -> None:
         logger.info("user_roles_updated", email=email, roles=[r.name for r in user.roles], newly_assigned=assigned)
 
 
+async def cmd_export(args) -> None:
+    """Потоковая выгрузка в файл тем же движком, что и /export эндпоинты."""
+    from process_tracker.db import init_db
+    from process_tracker.services.export_service import export_submissions, export_tasks
+    await init_db()
+    setup_logging, logger = _logging()
+
+    if args.what == "tasks":
+        filters = [tuple(f.split(":", 2)) for f in (args.field or [])]
+        for f in filters:
+            if len(f) != 3:
+                raise SystemExit("--field ожидает key:op:value, например estimate:lt:8")
+        chunks = export_tasks(
+            args.format,
+            status=args.status,
+            assignee_id=args.assignee_id,
+            process_id=args.process_id,
+            type_id=args.type_id,
+            field_filters=filters,
+        )
+    else:
+        chunks = export_submissions(args.format, form_key=args.form_key)
+
+    # только в файл: логи CLI идут в stdout и перемешались бы с данными
+    written = 0
+    with open(args.output, "wb") as out:
+        async for chunk in chunks:
+            out.write(chunk)
+            written += len(chunk)
+    logger.info("export_done", what=args.what, format=args.format, bytes=written, output=args.output)
+
+
+async def cmd_import(args) -> None:
+    """Импорт NDJSON/CSV чанками; при сбое — повторить с --start-chunk <resume_from>."""
+    from process_tracker.db import init_db
+    from process_tracker.services.import_service import import_file
+    await init_db()
+    setup_logging, logger = _logging()
+
+    def _report(p) -> None:
+        logger.info(
+            "import_progress",
+            chunk=p.resume_from, rows=p.rows_read, inserted=p.inserted, failed=p.failed, done=p.done,
+        )
+
+    try:
+        progress = await import_file(
+            args.file,
+            args.what,
+            args.format,
+            chunk_size=args.chunk_size,
+            start_chunk=args.start_chunk,
+            on_progress=_report,
+        )
+    except ValueError as e:
+        raise SystemExit(str(e))
+    for err in progress.errors:
+        logger.warning("import_row_error", **err)
+    logger.info("import_done", what=args.what, inserted=progress.inserted, failed=progress.failed)
+
+
+async def cmd_bench_sqlite(args) -> None:
+    """Сравнить пропускную способность записи: прежняя конфигурация SQLite против db/sqlite.py."""
+    import os
+    import tempfile
+    from process_tracker.db.sqlite import bench_writes
+    setup_logging, logger = _logging()
+
+    # выигрыш зависит от стоимости fsync — мерить на диске, где будет лежать БД
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for production in (False, True):
+            path = os.path.join(tmp, f"bench_{int(production)}.db")
+            res = await bench_writes(path, production=production, writers=args.writers, ops=args.ops)
+            logger.info("sqlite_bench", **res)
+
+
 def cmd_run_api(args) -> None:
     import uvicorn
     from process_tracker.server import get_application
@@ -278,6 +357,35 @@ def build_parser() -> argparse.ArgumentParser:
     p_user.add_argument("--force-reset", action="store_true", help="Если пользователь существует — перезаписать пароль")
     p_user.set_defaults(func=lambda a: asyncio.run(cmd_create_user(a)))
 
+    # Export
+    p_exp = sub.add_parser("export", help="Выгрузить задачи/ответы форм в NDJSON или CSV (потоково)")
+    p_exp.add_argument("what", choices=["tasks", "submissions"])
+    p_exp.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    p_exp.add_argument("-o", "--output", required=True, help="Файл назначения")
+    p_exp.add_argument("--status", default=None)
+    p_exp.add_argument("--assignee-id", type=int, default=None)
+    p_exp.add_argument("--process-id", type=int, default=None)
+    p_exp.add_argument("--type-id", type=int, default=None)
+    p_exp.add_argument("--field", action="append", help="Фильтр по fields: key:op:value, например priority:eq:P1 (можно несколько)")
+    p_exp.add_argument("--form-key", default=None, help="Для submissions: только эта форма")
+    p_exp.set_defaults(func=lambda a: asyncio.run(cmd_export(a)))
+
+    # Import
+    p_imp = sub.add_parser("import", help="Импорт задач/процессов из NDJSON или CSV (чанками)")
+    p_imp.add_argument("what", choices=["tasks", "processes"])
+    p_imp.add_argument("file", help="Путь к .ndjson/.jsonl/.csv")
+    p_imp.add_argument("--format", choices=["ndjson", "csv"], default=None, help="По умолчанию — по расширению")
+    p_imp.add_argument("--chunk-size", type=int, default=1000)
+    p_imp.add_argument("--start-chunk", type=int, default=0, help="Продолжить с чанка (resume_from из лога)")
+    p_imp.set_defaults(func=lambda a: asyncio.run(cmd_import(a)))
+
+    # bench-sqlite
+    p_bench = sub.add_parser("bench-sqlite", help="Бенчмарк записи SQLite: прежний режим против писатель+читатели")
+    p_bench.add_argument("--writers", type=int, default=16, help="Параллельных пишущих корутин")
+    p_bench.add_argument("--ops", type=int, default=50, help="Транзакций на корутину")
+    p_bench.add_argument("--dir", default=None, help="Каталог для файлов бенчмарка (диск, на котором будет БД)")
+    p_bench.set_defaults(func=lambda a: asyncio.run(cmd_bench_sqlite(a)))
+
     # Servers
     p_api = sub.add_parser("run-api", help="Запустить только API-сервер (FastAPI+Uvicorn)")
     p_api.add_argument("--host", default=None)
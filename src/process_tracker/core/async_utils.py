@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import asyncio
+import functools
+import inspect
 import logging
 import random
 import threading
@@ -12,6 +14,7 @@ from typing import (
     Awaitable,
     Callable,
     Deque,
+    Hashable,
     Iterable,
     Optional,
     Sequence,
@@ -20,6 +23,8 @@ from typing import (
     Union,
 )
 
+from .deadline import DeadlineExceeded, budget, detached, remaining
+
 T = TypeVar("T")
 
 logger = logging.getLogger(__name__)
@@ -28,9 +33,22 @@ logger = logging.getLogger(__name__)
 # ----------------------------- Базовые обёртки ----------------------------- #
 
 async def wait_for(coro: Awaitable[T], timeout: Optional[float]) -> T:
-    if timeout is None or timeout <= 0:
+    """Таймаут, урезанный до остатка дедлайна запроса (core/deadline.py)."""
+    own = timeout if timeout is not None and timeout > 0 else None
+    try:
+        timeout = budget(own, "wait_for")
+    except DeadlineExceeded:
+        if inspect.iscoroutine(coro):
+            coro.close()  # не запускаем — и не оставляем «never awaited»
+        raise
+    if timeout is None:
         return await coro
-    return await asyncio.wait_for(coro, timeout=timeout)
+    try:
+        return await asyncio.wait_for(coro, timeout=timeout)
+    except asyncio.TimeoutError as e:
+        if own is None or timeout < own:
+            raise DeadlineExceeded("wait_for") from e
+        raise
 
 
 async def retry(
@@ -52,12 +70,16 @@ async def retry(
         try:
             return await wait_for(coro_factory(), timeout)
         except exceptions as exc:  # noqa: B902
-            if attempt >= retries:
+            if attempt >= retries or isinstance(exc, DeadlineExceeded):
                 raise
             sleep_for = min(current_delay, max_delay)
             if jitter:
                 delta = sleep_for * jitter
                 sleep_for = max(0.0, sleep_for + random.uniform(-delta, delta))
+            left = remaining()
+            if left is not None and left <= sleep_for:
+                # до следующей попытки бюджет запроса не доживёт — отдаём ошибку сразу
+                raise
             if on_retry:
                 try:
                     on_retry(attempt + 1, exc, sleep_for)
@@ -68,11 +90,19 @@ async def retry(
             current_delay *= backoff
 
 
+async def _detached(coro: Awaitable[T]) -> T:
+    with detached():
+        return await coro
+
+
 def fire_and_forget(coro: Awaitable[Any], *, name: Optional[str] = None):
     """
     Запустить корутину "в фоне" надёжно и залогировать способ запуска.
     Может вернуть asyncio.Task (если текущий loop) или None.
+    Фоновая задача не наследует дедлайн запроса, из которого её запустили.
     """
+    coro = _detached(coro)
+
     # 1) Есть running loop в текущем потоке
     try:
         loop = asyncio.get_running_loop()
@@ -254,6 +284,191 @@ class Throttler:
         self._last = monotonic()
 
 
+# ----------------------------- Single-flight ----------------------------- #
+
+@dataclass
+class _Flight:
+    task: "asyncio.Future[Any]"
+    waiters: int = 0
+
+
+class SingleFlight:
+    """
+    Склейка одинаковых одновременных вызовов: пока вычисление по ключу в полёте,
+    остальные вызовы с тем же ключом ждут его результат (или исключение), а не
+    запускают своё. Завершилось — ключ забыт, следующий вызов считает заново
+    (это не кэш: результат не старше самого запроса).
+
+    Вычисление не должно жить на ресурсах вызывающего (его сессии БД): первый вызов
+    может уйти раньше остальных. single_flight поэтому подставляет вычислению свою сессию.
+
+    Само вычисление дедлайна запроса не наследует (detached): каждый вызов ждёт
+    его не дольше своего остатка (remaining()) и получает DeadlineExceeded (или
+    отмену), не обрывая остальных; ушёл последний ожидающий — вычисление отменяется.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[Hashable, _Flight] = {}
+        self._stats: dict[str, list[int]] = {}  # имя → [вызовов, склеено]
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[T]], *, name: str = "") -> T:
+        budget(None, "single_flight")  # бюджет уже исчерпан — не присоединяемся и не запускаем
+        counters = self._stats.setdefault(name, [0, 0])
+        counters[0] += 1
+        flight = self._flights.get(key)
+        if flight is not None:
+            counters[1] += 1
+        else:
+            flight = self._start(key, factory)
+        flight.waiters += 1
+        try:
+            return await _await_own_deadline(flight.task)
+        except (asyncio.CancelledError, DeadlineExceeded):
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()  # результат больше никому не нужен
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _start(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> _Flight:
+        flight = _Flight(asyncio.ensure_future(_detached(factory())))
+        self._flights[key] = flight
+
+        def _done(_t: "asyncio.Future[Any]") -> None:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+        flight.task.add_done_callback(_done)
+        return flight
+
+    def stats(self) -> dict[str, Any]:
+        def row(calls: int, coalesced: int) -> dict[str, Any]:
+            return {
+                "calls": calls,
+                "coalesced": coalesced,
+                "ratio": round(coalesced / calls, 4) if calls else None,
+            }
+
+        total = [sum(c[0] for c in self._stats.values()), sum(c[1] for c in self._stats.values())]
+        return {
+            **row(*total),
+            "in_flight": len(self._flights),
+            "by_name": {n: row(*c) for n, c in sorted(self._stats.items())},
+        }
+
+
+async def _await_own_deadline(task: "asyncio.Future[T]") -> T:
+    """Результат общей задачи, но не дольше остатка дедлайна вызывающего; задачу не отменяет."""
+    left = remaining()
+    if left is None:
+        return await asyncio.shield(task)
+    if left > 0:
+        await asyncio.wait({task}, timeout=left)
+    if not task.done():
+        raise DeadlineExceeded("single_flight")
+    return task.result()
+
+
+singleflight = SingleFlight()
+
+# параметры, не входящие в ключ: у каждого запроса свои, на результат не влияют
+_UNKEYED_PARAMS = {"self", "cls", "db", "session", "response"}
+_SESSION_PARAMS = ("db", "session")
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(v) for v in value)
+    return value
+
+
+def _call_key(sig: inspect.Signature, args: tuple, kwargs: dict) -> Hashable:
+    """
+    Ключ вызова по аргументам: request → путь + query, user → его права
+    (одинаковые права — один результат), db/session/self пропускаются.
+    """
+    bound = sig.bind_partial(*args, **kwargs)
+    parts: list[Any] = []
+    for name, value in bound.arguments.items():
+        if name in _UNKEYED_PARAMS:
+            continue
+        if name == "request":
+            value = (value.url.path, tuple(sorted(value.query_params.multi_items())))
+        elif name == "user" and isinstance(value, dict):
+            value = frozenset(value.get("perms") or ())
+        parts.append((name, _freeze(value)))
+    return tuple(parts)
+
+
+async def _on_own_session(
+    f: Callable[..., Awaitable[T]],
+    sig: inspect.Signature,
+    args: tuple,
+    kwargs: dict,
+    session_factory: Optional[Callable[[], Any]],
+) -> T:
+    """Вызвать f, подменив сессию вызывающего (db / session / self.session) своей."""
+    bound = sig.bind_partial(*args, **kwargs)
+    names = [n for n in _SESSION_PARAMS if n in bound.arguments]
+    owner = bound.arguments.get("self")
+    if owner is not None and not hasattr(owner, "session"):
+        owner = None
+    if not names and owner is None:
+        return await f(*args, **kwargs)
+    if session_factory is None:
+        from ..db.session import AsyncSessionLocal  # лениво: core не тянет БД при импорте
+
+        session_factory = AsyncSessionLocal
+    async with session_factory() as session:
+        for n in names:
+            bound.arguments[n] = session
+        if owner is not None:
+            bound.arguments["self"] = type(owner)(session)
+        return await f(*bound.args, **bound.kwargs)
+
+
+def single_flight(
+    fn: Optional[Callable[..., Awaitable[T]]] = None,
+    *,
+    key: Optional[Callable[..., Hashable]] = None,
+    group: Optional[SingleFlight] = None,
+    session_factory: Optional[Callable[[], Any]] = None,
+) -> Any:
+    """
+    Декоратор async-функции / метода сервиса / FastAPI-маршрута:
+
+        @router.get("/summary")
+        @single_flight
+        async def stats_summary(db=..., user=CurrentUser): ...
+
+    key(*args, **kwargs) — свой ключ; по умолчанию см. _call_key.
+    Сигнатура сохраняется (functools.wraps) — FastAPI видит исходные параметры.
+
+    Общее вычисление идёт на своей сессии из session_factory (по умолчанию
+    db.session.AsyncSessionLocal): она подставляется вместо db / session, а сервису
+    (self с атрибутом session) — его копия type(self)(сессия). Так первый вызов
+    уходит по своему дедлайну (504 вовремя), не закрывая сессию под остальными.
+    """
+
+    def deco(f: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        sig = inspect.signature(f)
+        name = f"{f.__module__.rsplit('.', 1)[-1]}.{f.__qualname__}"
+        sf = group or singleflight
+
+        @functools.wraps(f)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            k = key(*args, **kwargs) if key is not None else _call_key(sig, args, kwargs)
+            return await sf.do((name, k), lambda: _on_own_session(f, sig, args, kwargs, session_factory), name=name)
+
+        return wrapper
+
+    return deco(fn) if fn is not None else deco
+
+
 # ----------------------------- Простейшая очередь событий ----------------------------- #
 
 class AsyncEventQueue:
@@ -0,0 +1,164 @@
+from __future__ import annotations
+"""
+Сжатые битовые множества неотрицательных int (id задач).
+
+Если установлен pyroaring — используются Roaring-битмапы (C, SIMD).
+Иначе — Bitmap ниже: контейнеры по 2^16 id, ключ — старшие биты id,
+значение — битовая маска младших 16 бит в Python int. Пустые контейнеры
+не хранятся, операции идут только по общим контейнерам, поэтому стоимость
+AND/OR/ANDNOT пропорциональна числу затронутых блоков по 65536 id,
+а не числу элементов.
+
+Общий интерфейс обоих вариантов: add/discard/update, `in`, len, итерация по
+возрастанию, операторы & | - и |= &= -=; сверх него — функция page_desc().
+"""
+
+from typing import Iterable, Iterator, Optional
+
+_BITS = 16
+_LOW = (1 << _BITS) - 1
+
+
+class Bitmap:
+    __slots__ = ("_c",)
+
+    def __init__(self, ids: Iterable[int] = ()) -> None:
+        self._c: dict[int, int] = {}
+        self.update(ids)
+
+    # ---- изменение ----
+
+    def add(self, i: int) -> None:
+        hi = i >> _BITS
+        self._c[hi] = self._c.get(hi, 0) | (1 << (i & _LOW))
+
+    def discard(self, i: int) -> None:
+        hi = i >> _BITS
+        m = self._c.get(hi)
+        if m is None:
+            return
+        m &= ~(1 << (i & _LOW))
+        if m:
+            self._c[hi] = m
+        else:
+            del self._c[hi]
+
+    def update(self, ids: Iterable[int]) -> None:
+        for i in ids:
+            self.add(i)
+
+    def copy(self) -> "Bitmap":
+        out = Bitmap()
+        out._c = dict(self._c)
+        return out
+
+    # ---- чтение ----
+
+    def __contains__(self, i: object) -> bool:
+        if not isinstance(i, int) or i < 0:
+            return False
+        return bool(self._c.get(i >> _BITS, 0) >> (i & _LOW) & 1)
+
+    def __len__(self) -> int:
+        return sum(m.bit_count() for m in self._c.values())
+
+    def __bool__(self) -> bool:
+        return bool(self._c)
+
+    def __iter__(self) -> Iterator[int]:
+        for hi in sorted(self._c):
+            base, m = hi << _BITS, self._c[hi]
+            while m:
+                low = m & -m
+                yield base + low.bit_length() - 1
+                m ^= low
+
+    def iter_desc(self, below: Optional[int] = None) -> Iterator[int]:
+        """id по убыванию, строго меньше below (если задан)."""
+        for hi in sorted(self._c, reverse=True):
+            base, m = hi << _BITS, self._c[hi]
+            if below is not None:
+                if base >= below:
+                    continue
+                if below - base <= _LOW:
+                    m &= (1 << (below - base)) - 1
+            while m:
+                b = m.bit_length() - 1
+                yield base + b
+                m ^= 1 << b
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Bitmap) and self._c == other._c
+
+    def __repr__(self) -> str:
+        return f"Bitmap(<{len(self)} ids>)"
+
+    # ---- алгебра ----
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        a, b = (self._c, other._c) if len(self._c) <= len(other._c) else (other._c, self._c)
+        out = Bitmap()
+        for hi, m in a.items():
+            r = m & b.get(hi, 0)
+            if r:
+                out._c[hi] = r
+        return out
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        out = self.copy()
+        out |= other
+        return out
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        out = Bitmap()
+        for hi, m in self._c.items():
+            r = m & ~other._c.get(hi, 0)
+            if r:
+                out._c[hi] = r
+        return out
+
+    def __ior__(self, other: "Bitmap") -> "Bitmap":
+        for hi, m in other._c.items():
+            self._c[hi] = self._c.get(hi, 0) | m
+        return self
+
+    def __iand__(self, other: "Bitmap") -> "Bitmap":
+        self._c = (self & other)._c
+        return self
+
+    def __isub__(self, other: "Bitmap") -> "Bitmap":
+        self._c = (self - other)._c
+        return self
+
+
+try:
+    from pyroaring import BitMap as _Roaring  # type: ignore
+
+    def new_bitmap(ids: Iterable[int] = ()):
+        return _Roaring(ids)
+
+    BACKEND = "roaring"
+except Exception:  # pragma: no cover — pyroaring не обязателен
+    _Roaring = None
+
+    def new_bitmap(ids: Iterable[int] = ()):
+        return Bitmap(ids)
+
+    BACKEND = "python"
+
+
+def page_desc(bm, n: int, below: Optional[int] = None) -> list[int]:
+    """До n id по убыванию, строго меньше below — страница keyset-листания по id."""
+    if isinstance(bm, Bitmap):
+        out: list[int] = []
+        for i in bm.iter_desc(below):
+            out.append(i)
+            if len(out) >= n:
+                break
+        return out
+    # roaring: rank(x) — число элементов <= x, bm[k] — k-й по возрастанию
+    end = len(bm) if below is None else (bm.rank(below - 1) if below > 0 else 0)
+    return [bm[k] for k in range(end - 1, max(end - n, 0) - 1, -1)]
+
+
+__all__ = ["Bitmap", "BACKEND", "new_bitmap", "page_desc"]
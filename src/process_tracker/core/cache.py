@@ -0,0 +1,85 @@
+from __future__ import annotations
+"""
+In-process кэши результатов чтения.
+
+- LRUCache: ограниченный по размеру LRU с необязательным TTL
+- поколения ресурсов ("tasks", "processes", справочники): событие task_* / process_* / ... двигает
+  поколение, и ключи, в которые оно входит, больше не находятся — старые записи
+  просто вытесняются LRU. Инвалидация без обхода кэшей.
+- run_cache_invalidator(): слушатель шины событий (lifespan приложения)
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from .events import events
+
+# префикс события → ресурс; выбирается самый длинный совпавший (task_type_* — не задачи)
+_RESOURCE_EVENTS = {
+    "task_": "tasks",
+    "process_": "processes",
+    "task_type_": "task_types",
+    "form_def_": "forms",
+    "template_": "templates",
+    "blueprint_": "workflows",
+}
+_PREFIXES = sorted(_RESOURCE_EVENTS, key=len, reverse=True)
+# производное событие пересчёта статистики данные задач не меняет
+_IGNORED_EVENTS = {"task_stats"}
+
+_generation: dict[str, int] = {r: 0 for r in _RESOURCE_EVENTS.values()}
+
+
+class LRUCache:
+    def __init__(self, size: int, ttl: Optional[float] = None) -> None:
+        self.size, self.ttl = size, ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        hit = self._data.get(key)
+        if hit is None:
+            return None
+        ts, val = hit
+        if self.ttl is not None and time.monotonic() - ts > self.ttl:
+            self._data.pop(key, None)
+            return None
+        self._data.move_to_end(key)
+        return val
+
+    def put(self, key: Hashable, val: Any) -> None:
+        self._data[key] = (time.monotonic(), val)
+        self._data.move_to_end(key)
+        while len(self._data) > self.size:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+def generation(resource: str) -> int:
+    return _generation.get(resource, 0)
+
+
+def invalidate_resource(resource: str) -> None:
+    _generation[resource] = _generation.get(resource, 0) + 1
+
+
+async def run_cache_invalidator() -> None:
+    """Слушает шину: событие ресурса (task_*, process_*, task_type_*, ...) делает закэшированные чтения устаревшими."""
+    q = await events.subscribe()
+    try:
+        while True:
+            ev = await q.get()
+            t = str(ev.get("type", "")) if isinstance(ev, dict) else ""
+            if t in _IGNORED_EVENTS:
+                continue
+            for prefix in _PREFIXES:
+                if t.startswith(prefix):
+                    invalidate_resource(_RESOURCE_EVENTS[prefix])
+                    break
+    finally:
+        await events.unsubscribe(q)
+
+
+__all__ = ["LRUCache", "generation", "invalidate_resource", "run_cache_invalidator"]
@@ -49,7 +49,41 @@ class Settings(BaseSettings):
     db_url: str = "sqlite+aiosqlite:///./process_tracker.db"
     db_echo: bool = False
     db_query_timeout: float = 10.0
-    db_max_concurrency: int = 8  # 🔹 ограничение параллельных запросов (для семафора)
+    db_max_concurrency: int = 8  # 🔹 начальный лимит параллельных запросов к движку (db/admission.py)
+    # admission control: границы адаптивного лимита, целевая задержка запроса, очередь и ожидание слота
+    db_admission_min: int = 1
+    db_admission_max: int = 32
+    db_admission_target_ms: float = 50.0
+    db_admission_queue: int = 512
+    db_admission_wait: float = 10.0
+
+    # Дедлайн запроса API (routes/deadline.py), сек: умолчание маршрутов без @with_deadline;
+    # клиент сокращает его заголовком X-Request-Deadline. 0 — без умолчания
+    request_deadline_default: float = 30.0
+
+    # SQLite (db/sqlite.py): PRAGMA каждого соединения, один писатель + пул читателей
+    sqlite_single_writer: bool = True
+    sqlite_read_pool_size: int = 4
+    sqlite_writer_wait: float = 30.0        # сколько ждать очереди к писателю/читателям, сек
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_busy_retries: int = 5            # повторы BEGIN IMMEDIATE сверх busy_timeout
+    sqlite_cache_size_kib: int = 65536
+    sqlite_mmap_size: int = 268435456
+
+    # Групповой commit мутаций TaskService (services/group_commit.py): окно, мс, и размер пачки
+    task_group_commit: bool = False
+    task_group_commit_window_ms: float = 5.0
+    task_group_commit_max_ops: int = 64
+
+    # Кэш сущностей по id (db/entity_cache.py): размер (0 — выключен) и TTL, сек
+    entity_cache_size: int = 4096
+    entity_cache_ttl: float = 30.0
+    # Кэш ответов справочных GET (routes/response_cache.py): записей (0 — выключен) и TTL-страховка, сек
+    response_cache_size: int = 512
+    response_cache_ttl: float = 300.0
+
+    # Stats: сверка task_counters с фактическими COUNT(*) (сек, 0 — не запускать)
+    stats_reconcile_interval: float = 600.0
 
     # Служебное
     project_root: Path = Field(default_factory=lambda: PROJECT_ROOT)
@@ -0,0 +1,111 @@
+from __future__ import annotations
+"""
+Дедлайн запроса: один бюджет времени на всю цепочку — API → БД → исходящие HTTP.
+
+Раньше у каждого слоя был свой таймаут (db_query_timeout 10 с, httpx 10 с в send_webhook,
+10 с в ui ApiClient), и клиент с бюджетом 2 с мог стоить серверу 30 с работы.
+
+- дедлайн — абсолютное время (monotonic) в contextvar; вложенный deadline_scope его
+  только сокращает
+- API берёт его из заголовка X-Request-Deadline (секунды бюджета, «2.5» или «2500ms»)
+  или из умолчания маршрута (routes/deadline.py)
+- слои спрашивают budget(свой_таймаут): меньшее из своего и оставшегося; бюджет вышел —
+  DeadlineExceeded сразу, без запроса к БД/сети
+- фоновая работа (fire_and_forget, BackgroundTasks, групповой commit) запускается
+  detached(): задача, пережившая запрос, не наследует его дедлайн
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+HEADER = "X-Request-Deadline"
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Бюджет запроса исчерпан (наследник TimeoutError — старые обработчики таймаутов его ловят)."""
+
+    def __init__(self, where: str = "") -> None:
+        super().__init__(f"request deadline exceeded{f' ({where})' if where else ''}")
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[Optional[float]]:
+    """Дедлайн now+seconds в блоке (не позже действующего); None — оставить как есть."""
+    current = _deadline.get()
+    if seconds is None:
+        yield current
+        return
+    deadline = time.monotonic() + max(0.0, seconds)
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def detached() -> Iterator[None]:
+    """Блок без дедлайна запроса (фоновая работа, пережившая запрос)."""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Сколько секунд осталось (может быть ≤ 0) или None, если дедлайна нет."""
+    d = _deadline.get()
+    return None if d is None else d - time.monotonic()
+
+
+def budget(default: Optional[float], where: str = "") -> Optional[float]:
+    """Таймаут слоя с учётом дедлайна: min(default, оставшееся); вышло — DeadlineExceeded."""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded(where)
+    return left if default is None or default <= 0 else min(default, left)
+
+
+def parse_header(value: Optional[str]) -> Optional[float]:
+    """«2.5» → 2.5 с, «2500ms» → 2.5 с; мусор и неположительное — None (заголовок игнорируется)."""
+    if not value:
+        return None
+    raw = value.strip().lower()
+    scale = 1.0
+    if raw.endswith("ms"):
+        raw, scale = raw[:-2], 0.001
+    elif raw.endswith("s"):
+        raw = raw[:-1]
+    try:
+        seconds = float(raw) * scale
+    except ValueError:
+        return None
+    return seconds if seconds > 0 else None
+
+
+def header_value(default: Optional[float] = None) -> Optional[str]:
+    """Оставшийся бюджет для исходящего X-Request-Deadline (нижестоящий сервис тоже уложится)."""
+    left = budget(default)
+    return None if left is None else f"{left:.3f}"
+
+
+__all__ = [
+    "HEADER",
+    "DeadlineExceeded",
+    "deadline_scope",
+    "detached",
+    "remaining",
+    "budget",
+    "parse_header",
+    "header_value",
+]
@@ -13,7 +13,7 @@ from typing import AsyncIterator, Callable, TypeVar
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..db.session import AsyncSessionLocal
+from ..db.session import AsyncWriteSessionLocal
 from ..services.task_service import TaskService
 from ..services.process_service import ProcessService
 
@@ -26,9 +26,10 @@ S = TypeVar("S")  # тип сервиса
 async def provide_session() -> AsyncIterator[AsyncSession]:
     """
     Выдаёт AsyncSession в контексте.
-    Коммит/rollback — на уровне сервисов (явно).
+    Коммит/rollback — на уровне сервисов (явно). Сервисы и читают, и пишут —
+    сессия записи (db/sqlite.py: чтения перед записью в той же транзакции).
     """
-    async with AsyncSessionLocal() as session:
+    async with AsyncWriteSessionLocal() as session:
         yield session
 
 
@@ -72,5 +73,5 @@ async def session_dependency() -> AsyncIterator[AsyncSession]:
         ...
     ```
     """
-    async with AsyncSessionLocal() as session:
+    async with AsyncWriteSessionLocal() as session:
         yield session
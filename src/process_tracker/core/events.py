@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Set
+import threading
+from typing import Any, Dict
 
 
 class Broadcaster:
@@ -10,33 +11,42 @@ class Broadcaster:
       - subscribe() -> asyncio.Queue: подписка на события
       - publish(event: dict) -> None: разослать событие всем подписчикам
       - unsubscribe(queue) -> None: отписка
-    Потокобезопасно для asyncio-задач внутри одного процесса.
+    Подписчик может жить в другом event loop (UI на Flet, API — в своём потоке):
+    такой очереди событие доставляется через call_soon_threadsafe её loop'а.
     """
 
     def __init__(self) -> None:
-        self._subs: Set[asyncio.Queue] = set()
-        self._lock = asyncio.Lock()
+        self._subs: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self._lock = threading.Lock()
 
     async def subscribe(self) -> asyncio.Queue:
         q: asyncio.Queue = asyncio.Queue()
-        async with self._lock:
-            self._subs.add(q)
+        with self._lock:
+            self._subs[q] = asyncio.get_running_loop()
         return q
 
     async def unsubscribe(self, q: asyncio.Queue) -> None:
-        async with self._lock:
-            self._subs.discard(q)
+        with self._lock:
+            self._subs.pop(q, None)
 
     async def publish(self, event: dict[str, Any]) -> None:
         # рассылаем неблокирующе всем текущим подписчикам
-        async with self._lock:
-            targets = list(self._subs)
-        for q in targets:
-            try:
-                q.put_nowait(event)
-            except asyncio.QueueFull:
-                # если когда-то сделаем ограниченную очередь — не роняемся
-                pass
+        with self._lock:
+            targets = list(self._subs.items())
+        current = asyncio.get_running_loop()
+        for q, loop in targets:
+            if loop is current:
+                self._put(q, event)
+            elif not loop.is_closed():
+                loop.call_soon_threadsafe(self._put, q, event)
+
+    @staticmethod
+    def _put(q: asyncio.Queue, event: dict[str, Any]) -> None:
+        try:
+            q.put_nowait(event)
+        except asyncio.QueueFull:
+            # если когда-то сделаем ограниченную очередь — не роняемся
+            pass
 
 
 # Глобальный экземпляр
@@ -0,0 +1,97 @@
+from __future__ import annotations
+"""
+Префиксный индекс для подсказок (typeahead).
+
+Отсортированный список пар (ключ, id), где ключи — нормализованные (casefold)
+значения полей сущности и их «хвосты» с начала каждого слова: для
+"Ivan Petrov <ivan.petrov@x.io>" найдутся и "iva", и "pet", и "petrov@".
+Поиск — bisect до первого ключа >= префикса и проход вперёд, пока ключи
+начинаются с префикса: O(log n + N) на запрос.
+
+Изменение одной сущности — удаление/вставка её ключей (bisect + сдвиг списка),
+без перестройки всего индекса.
+"""
+
+import re
+from bisect import bisect_left, insort
+from typing import Any, Iterable, Optional, Sequence
+
+_WORD_START = re.compile(r"(?<![^\W_])[^\W_]")  # первая буква/цифра каждого слова
+MAX_KEY_LEN = 64  # хвосты длиннее префикса запроса не нужны
+
+
+def normalize(value: Optional[str]) -> str:
+    return " ".join((value or "").casefold().split())
+
+
+def keys_for(values: Iterable[Optional[str]]) -> set[str]:
+    out: set[str] = set()
+    for v in values:
+        s = normalize(v)
+        if not s:
+            continue
+        out.add(s[:MAX_KEY_LEN])
+        for m in _WORD_START.finditer(s):
+            out.add(s[m.start():m.start() + MAX_KEY_LEN])
+    return out
+
+
+class PrefixIndex:
+    def __init__(self) -> None:
+        self._keys: list[tuple[str, int]] = []
+        self._by_id: dict[int, tuple[str, ...]] = {}
+        self._items: dict[int, dict[str, Any]] = {}
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item_id: object) -> bool:
+        return item_id in self._items
+
+    def load(self, entries: Iterable[tuple[int, Sequence[Optional[str]], dict[str, Any]]]) -> None:
+        """Полная загрузка: (id, индексируемые значения, элемент ответа). Одна сортировка на всё."""
+        keys: list[tuple[str, int]] = []
+        by_id: dict[int, tuple[str, ...]] = {}
+        items: dict[int, dict[str, Any]] = {}
+        for item_id, values, item in entries:
+            ks = tuple(keys_for(values))
+            by_id[item_id] = ks
+            items[item_id] = item
+            keys.extend((k, item_id) for k in ks)
+        keys.sort()
+        self._keys, self._by_id, self._items = keys, by_id, items
+        self.ready = True
+
+    def upsert(self, item_id: int, values: Sequence[Optional[str]], item: dict[str, Any]) -> None:
+        self.remove(item_id)
+        ks = tuple(keys_for(values))
+        for k in ks:
+            insort(self._keys, (k, item_id))
+        self._by_id[item_id] = ks
+        self._items[item_id] = item
+
+    def remove(self, item_id: int) -> None:
+        for k in self._by_id.pop(item_id, ()):
+            i = bisect_left(self._keys, (k, item_id))
+            if i < len(self._keys) and self._keys[i] == (k, item_id):
+                del self._keys[i]
+        self._items.pop(item_id, None)
+
+    def suggest(self, prefix: str, limit: int = 10) -> list[dict[str, Any]]:
+        """До limit элементов, у которых какое-то значение (или слово в нём) начинается с prefix."""
+        p = normalize(prefix)[:MAX_KEY_LEN]
+        keys, out, seen = self._keys, [], set()
+        i = bisect_left(keys, (p, -1))
+        while i < len(keys) and len(out) < limit:
+            k, item_id = keys[i]
+            if not k.startswith(p):
+                break
+            if item_id not in seen:
+                seen.add(item_id)
+                out.append(self._items[item_id])
+            i += 1
+        return out
+
+
+__all__ = ["PrefixIndex", "keys_for", "normalize"]
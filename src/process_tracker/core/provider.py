@@ -12,7 +12,7 @@ from typing import AsyncIterator, Callable, TypeVar
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..db.session import AsyncSessionLocal
+from ..db.session import AsyncWriteSessionLocal
 
 S = TypeVar("S")  # тип сервиса
 
@@ -23,9 +23,10 @@ S = TypeVar("S")  # тип сервиса
 async def provide_session() -> AsyncIterator[AsyncSession]:
     """
     Выдаёт AsyncSession в контексте.
-    Коммит/rollback — на уровне сервисов (явно).
+    Коммит/rollback — на уровне сервисов (явно). Сервисы и читают, и пишут —
+    сессия записи (db/sqlite.py: чтения перед записью в той же транзакции).
     """
-    async with AsyncSessionLocal() as session:
+    async with AsyncWriteSessionLocal() as session:
         yield session
 
 
@@ -71,5 +72,5 @@ async def session_dependency() -> AsyncIterator[AsyncSession]:
         ...
     ```
     """
-    async with AsyncSessionLocal() as session:
+    async with AsyncWriteSessionLocal() as session:
         yield session
@@ -6,11 +6,19 @@ DB package public API:
 - bootstrap_db() — миграции (если есть alembic) + сид RBAC
 """
 
-from sqlalchemy import text
-from sqlalchemy.exc import OperationalError
+import warnings
 
-from .session import engine, AsyncSessionLocal
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError, SAWarning
+from sqlalchemy.schema import CreateColumn
+
+from .session import engine, AsyncWriteSessionLocal
+from .activity import ensure_activity_triggers
 from .models import Base               # регистрирует metadata
+from .field_indexes import backfill_due_dates, ensure_span_check, sync_field_indexes
+from .ranking import backfill_ranks
+from .search import ensure_search_schema
+from .stats import ensure_counter_triggers
 from . import models_meta as _models   # noqa: F401 — импортируем модели в metadata
 
 __all__ = ["init_db", "drop_db", "bootstrap_db"]
@@ -19,21 +27,72 @@ __all__ = ["init_db", "drop_db", "bootstrap_db"]
 async def init_db() -> None:
     """
     Идемпотентная инициализация схемы БД:
-    - включает полезные PRAGMA для SQLite
-    - создаёт недостающие таблицы (create_all)
+    - создаёт недостающие таблицы (create_all), а в существующих — новые
+      nullable-колонки и индексы (ALTER TABLE ADD COLUMN / CREATE INDEX)
+    - проставляет ранги доски задачам, созданным до появления Task.rank,
+      и переносит строковый fields.due_at в колонку Task.due_at
+    - ставит проверку start_at <= due_at (ck_tasks_span) на таблицу tasks старых БД
+    - синхронизирует индексы по Task.fields из TaskType.default_fields
+    - создаёт полнотекстовый индекс и триггеры его синхронизации
+    - ставит триггеры счётчиков дашборда (task_counters)
+    - ставит триггеры processes.last_activity_at и заполняет его у старых процессов
     """
     async with engine.begin() as conn:
-        if engine.url.get_backend_name().startswith("sqlite"):
-            for pragma in ("foreign_keys=ON", "journal_mode=WAL", "synchronous=NORMAL"):
-                try:
-                    await conn.execute(text(f"PRAGMA {pragma}"))
-                except Exception:
-                    pass
         try:
             await conn.run_sync(lambda sc: Base.metadata.create_all(sc))
         except OperationalError:
             # например, при редком конфликте/гонке — не валим приложение
             pass
+        try:
+            await conn.run_sync(_add_missing_columns)
+            await backfill_ranks(conn)
+            await backfill_due_dates(conn)
+        except OperationalError:
+            pass
+        try:
+            await ensure_span_check(conn)
+        except OperationalError:
+            pass
+        try:
+            await sync_field_indexes(conn)
+        except OperationalError:
+            pass
+        try:
+            await ensure_search_schema(conn)
+        except OperationalError:
+            # например, SQLite собран без FTS5 — поиск просто не работает
+            pass
+        try:
+            await ensure_counter_triggers(conn)
+        except OperationalError:
+            pass
+        try:
+            await ensure_activity_triggers(conn)
+        except OperationalError:
+            pass
+
+
+def _add_missing_columns(sync_conn) -> None:
+    """
+    create_all не трогает уже существующие таблицы: догоняем их схему до моделей.
+    Только nullable-колонки (их можно добавить без значения) и индексы.
+    """
+    insp = inspect(sync_conn)
+    tables = set(insp.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        have = {c["name"] for c in insp.get_columns(table.name)}
+        for col in table.columns:
+            if col.name in have or not col.nullable or col.primary_key:
+                continue
+            ddl = CreateColumn(col).compile(dialect=sync_conn.dialect)
+            sync_conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+        with warnings.catch_warnings():
+            # checkfirst отражает индексы таблицы, а expression-индексы SQLAlchemy отражать не умеет
+            warnings.filterwarnings("ignore", "Skipped unsupported reflection", SAWarning)
+            for idx in table.indexes:
+                idx.create(sync_conn, checkfirst=True)
 
 
 async def drop_db() -> None:
@@ -62,7 +121,7 @@ async def bootstrap_db() -> None:
     # 2) сид RBAC (необязателен для старта, но желателен)
     try:
         from .seed import seed_rbac
-        async with AsyncSessionLocal() as s:
+        async with AsyncWriteSessionLocal() as s:
             await seed_rbac(s)
     except Exception:
         pass
@@ -0,0 +1,80 @@
+from __future__ import annotations
+"""
+processes.last_activity_at — «когда в процессе что-то происходило последний раз».
+
+Правку самого процесса ставит ORM (onupdate), записи в его задачах — триггеры
+на tasks, в той же транзакции (ORM, bulk executemany, COPY — без разницы):
+- SQLite: построчные триггеры AFTER INSERT/UPDATE/DELETE
+- Postgres: триггеры уровня statement с transition-таблицами — один UPDATE
+  processes на statement, а не на каждую строку пакетной вставки
+
+Процессы, вставленные в обход ORM (импорт, сырой SQL), получают значение
+триггером на INSERT; уже существующие — бэкфиллом из updated_at задач.
+"""
+
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# формат совпадает с тем, как SQLAlchemy пишет DateTime в SQLite ('YYYY-MM-DD HH:MM:SS.ffffff')
+_SQLITE_NOW = "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+_BACKFILL = """
+UPDATE processes SET last_activity_at = (
+    SELECT CASE WHEN t.ts IS NOT NULL AND t.ts > coalesce(processes.updated_at, processes.created_at)
+                THEN t.ts ELSE coalesce(processes.updated_at, processes.created_at) END
+    FROM (SELECT max(coalesce(updated_at, created_at)) AS ts FROM tasks WHERE process_id = processes.id) t
+)
+WHERE last_activity_at IS NULL
+"""
+
+
+def _is_pg(conn: Any) -> bool:
+    return conn.dialect.name == "postgresql"
+
+
+def _sqlite_ddl() -> list[str]:
+    touch = f"UPDATE processes SET last_activity_at = {_SQLITE_NOW} WHERE id"
+    return [
+        "CREATE TRIGGER IF NOT EXISTS trg_activity_tasks_ai AFTER INSERT ON tasks "
+        f"WHEN new.process_id IS NOT NULL BEGIN {touch} = new.process_id; END",
+        "CREATE TRIGGER IF NOT EXISTS trg_activity_tasks_au AFTER UPDATE ON tasks "
+        f"WHEN coalesce(new.process_id, old.process_id) IS NOT NULL BEGIN {touch} IN (new.process_id, old.process_id); END",
+        "CREATE TRIGGER IF NOT EXISTS trg_activity_tasks_ad AFTER DELETE ON tasks "
+        f"WHEN old.process_id IS NOT NULL BEGIN {touch} = old.process_id; END",
+        "CREATE TRIGGER IF NOT EXISTS trg_activity_processes_ai AFTER INSERT ON processes "
+        f"WHEN new.last_activity_at IS NULL BEGIN {touch} = new.id; END",
+    ]
+
+
+def _pg_ddl() -> list[str]:
+    touch = "UPDATE processes SET last_activity_at = now() WHERE id IN"
+    return [
+        "CREATE OR REPLACE FUNCTION pt_process_activity() RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN "
+        f"IF TG_OP = 'INSERT' THEN {touch} (SELECT process_id FROM new_rows); "
+        f"ELSIF TG_OP = 'DELETE' THEN {touch} (SELECT process_id FROM old_rows); "
+        f"ELSE {touch} (SELECT process_id FROM new_rows UNION SELECT process_id FROM old_rows); "
+        "END IF; RETURN NULL; END $$",
+        "DROP TRIGGER IF EXISTS trg_activity_tasks_ai ON tasks",
+        "CREATE TRIGGER trg_activity_tasks_ai AFTER INSERT ON tasks "
+        "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION pt_process_activity()",
+        "DROP TRIGGER IF EXISTS trg_activity_tasks_au ON tasks",
+        "CREATE TRIGGER trg_activity_tasks_au AFTER UPDATE ON tasks "
+        "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION pt_process_activity()",
+        "DROP TRIGGER IF EXISTS trg_activity_tasks_ad ON tasks",
+        "CREATE TRIGGER trg_activity_tasks_ad AFTER DELETE ON tasks "
+        "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION pt_process_activity()",
+        "CREATE OR REPLACE FUNCTION pt_process_activity_default() RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN "
+        "NEW.last_activity_at := coalesce(NEW.last_activity_at, now()); RETURN NEW; END $$",
+        "DROP TRIGGER IF EXISTS trg_activity_processes_bi ON processes",
+        "CREATE TRIGGER trg_activity_processes_bi BEFORE INSERT ON processes "
+        "FOR EACH ROW EXECUTE FUNCTION pt_process_activity_default()",
+    ]
+
+
+async def ensure_activity_triggers(conn: AsyncConnection) -> None:
+    """Идемпотентно ставит триггеры и заполняет last_activity_at там, где он ещё NULL."""
+    for stmt in (_pg_ddl() if _is_pg(conn) else _sqlite_ddl()):
+        await conn.execute(text(stmt))
+    await conn.execute(text(_BACKFILL))
@@ -0,0 +1,316 @@
+from __future__ import annotations
+"""
+Admission control обращений к БД: сколько операторов на одном движке выполняется одновременно.
+
+Заменяет глобальный asyncio.Semaphore, который брался дважды (get_session на весь запрос
+и BaseRepo._guard на каждый SQL — вложенность могла съесть все слоты) и привязывался
+к первому event loop, что его тронул (Flet и uvicorn работают в разных потоках/циклах).
+
+- слот берётся на каждый оператор событиями движка (install_admission): before_cursor_execute
+  вызывается, когда соединение уже взято из пула, — слот никогда не держится в ожидании
+  соединения (иначе сессии в очереди к единственному писателю SQLite занимают все слоты,
+  а сессия, которая держит писателя, ждёт слот на следующий оператор)
+- лимит на движок, которым оператор реально выполняется (писатель и читатели SQLite — разные
+  контроллеры со своей задержкой); состояние под threading.Lock, ожидающие — futures своих
+  циклов, будятся через call_soon_threadsafe
+- slot() — тот же лимит для работы вне SQLAlchemy; операторы внутри него слот не берут повторно
+- лимит подстраивается по задержке операторов (AIMD): оператор уложился в target_ms и слоты
+  заняты — +1/limit (≈ +1 за «круг» лимита), дольше target_ms — ×BACKOFF, не чаще раза
+  в окно, чтобы одна медленная пачка не обрушила лимит до min
+- очередь длиннее max_queue или ожидание дольше wait — AdmissionRejected (API отвечает 503);
+  ожидание не дольше остатка дедлайна запроса — по нему DeadlineExceeded (504)
+"""
+import asyncio
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Optional
+
+from sqlalchemy import event
+from sqlalchemy.util import await_only
+from sqlalchemy.util.concurrency import in_greenlet
+
+from ..core.config import settings
+from ..core.deadline import DeadlineExceeded, remaining
+
+BACKOFF = 0.75
+DECREASE_WINDOW = 0.25  # сек — не чаще одного снижения за окно (или за target, если он больше)
+
+_CTX_STARTED = "_admission_started"  # атрибут ExecutionContext: слот оператора взят (monotonic)
+
+_held: ContextVar[frozenset[int]] = ContextVar("db_admission_held", default=frozenset())
+
+
+class AdmissionRejected(RuntimeError):
+    """Запрос к БД не допущен: очередь переполнена или ожидание слота превысило лимит."""
+
+    def __init__(self, name: str, reason: str) -> None:
+        super().__init__(f"db admission rejected ({name}): {reason}")
+        self.reason = reason
+
+
+@dataclass(eq=False)
+class _Waiter:
+    loop: asyncio.AbstractEventLoop
+    future: "asyncio.Future[None]"
+    granted: bool = False
+    queued: bool = True  # ещё в self._waiters (_dispatch выбрасывает и отменённых)
+
+
+@dataclass
+class _Stats:
+    admitted: int = 0
+    queued: int = 0
+    rejected_queue: int = 0
+    rejected_timeout: int = 0
+    rejected_deadline: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+    latency_ewma: Optional[float] = None
+    increases: int = 0
+    decreases: int = 0
+    by_loop: dict[int, int] = field(default_factory=dict)
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        name: str = "db",
+        *,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        target_ms: float = 50.0,
+        max_queue: int = 512,
+        wait: float = 10.0,
+    ) -> None:
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.target = max(0.001, target_ms / 1000.0)
+        self.max_queue = max(0, max_queue)
+        self.wait = wait
+        self.in_flight = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+        self._last_decrease = 0.0
+        self._stats = _Stats()
+
+    # ---- вход / выход ----
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        held = _held.get()
+        if id(self) in held:
+            yield
+            return
+        await self.acquire()
+        token = _held.set(held | {id(self)})
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            _held.reset(token)
+            self.release(time.monotonic() - started)
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                self._admit(loop, 0.0)
+                return
+            if len(self._waiters) >= self.max_queue:
+                self._stats.rejected_queue += 1
+                raise AdmissionRejected(self.name, "queue full")
+            w = _Waiter(loop, loop.create_future())
+            self._waiters.append(w)
+            self._stats.queued += 1
+
+        started = time.monotonic()
+        own = self.wait if self.wait and self.wait > 0 else None
+        left = remaining()
+        wait = own if left is None else (max(0.0, left) if own is None else max(0.0, min(own, left)))
+        try:
+            if wait is not None:
+                await asyncio.wait_for(w.future, timeout=wait)
+            else:
+                await w.future
+        except BaseException as e:
+            by_request = wait is not None and (own is None or wait < own)
+            with self._lock:
+                granted = w.granted
+                if w.queued:
+                    # таймаут отменил future, но _dispatch мог уже выкинуть его из очереди
+                    self._waiters.remove(w)
+                    w.queued = False
+                if isinstance(e, asyncio.TimeoutError) and not granted:
+                    if by_request:
+                        self._stats.rejected_deadline += 1
+                    else:
+                        self._stats.rejected_timeout += 1
+            if isinstance(e, asyncio.TimeoutError):
+                if not granted:
+                    if by_request:
+                        raise DeadlineExceeded("db admission") from None
+                    raise AdmissionRejected(self.name, f"waited > {self.wait}s") from None
+                # слот передан в последний момент — берём его
+            else:
+                if granted:
+                    # слот уже передан нам, но забрать его не успели — возвращаем без учёта задержки
+                    self.release(None)
+                raise
+        with self._lock:
+            self._admit(loop, time.monotonic() - started)
+
+    def release(self, latency: Optional[float]) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if latency is not None:
+                self._adapt(latency)
+            wake = self._dispatch()
+        for w in wake:
+            try:
+                w.loop.call_soon_threadsafe(_grant, w.future)
+            except RuntimeError:
+                # цикл ожидающего уже закрыт — слот возвращаем
+                self.release(None)
+
+    # ---- внутреннее (под self._lock) ----
+
+    def _admit(self, loop: asyncio.AbstractEventLoop, waited: float) -> None:
+        s = self._stats
+        s.admitted += 1
+        s.wait_total += waited
+        s.wait_max = max(s.wait_max, waited)
+        s.by_loop[id(loop)] = s.by_loop.get(id(loop), 0) + 1
+
+    def _adapt(self, latency: float) -> None:
+        s = self._stats
+        s.latency_ewma = latency if s.latency_ewma is None else 0.9 * s.latency_ewma + 0.1 * latency
+        now = time.monotonic()
+        if latency > self.target:
+            if now - self._last_decrease >= max(DECREASE_WINDOW, self.target) and self.limit > self.min_limit:
+                self.limit = max(float(self.min_limit), self.limit * BACKOFF)
+                self._last_decrease = now
+                s.decreases += 1
+        elif self.in_flight + 1 >= int(self.limit) and self.limit < self.max_limit:
+            # растём, только когда лимит действительно упирается (иначе он ничего не значит)
+            before = int(self.limit)
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            if int(self.limit) > before:
+                s.increases += 1
+
+    def _dispatch(self) -> list[_Waiter]:
+        wake: list[_Waiter] = []
+        while self._waiters and self.in_flight < int(self.limit):
+            w = self._waiters.popleft()
+            w.queued = False
+            if w.future.cancelled():
+                continue
+            w.granted = True
+            self.in_flight += 1
+            wake.append(w)
+        return wake
+
+    # ---- метрики ----
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            s = self._stats
+            return {
+                "name": self.name,
+                "limit": round(self.limit, 2),
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "target_ms": round(self.target * 1000, 1),
+                "in_flight": self.in_flight,
+                "queued_now": len(self._waiters),
+                "admitted": s.admitted,
+                "queued": s.queued,
+                "rejected": {
+                    "queue_full": s.rejected_queue,
+                    "timeout": s.rejected_timeout,
+                    "deadline": s.rejected_deadline,
+                },
+                "queue_wait_ms": {
+                    "avg": round(s.wait_total / s.admitted * 1000, 3) if s.admitted else None,
+                    "max": round(s.wait_max * 1000, 3),
+                },
+                "latency_ms_ewma": round(s.latency_ewma * 1000, 3) if s.latency_ewma is not None else None,
+                "limit_changes": {"increases": s.increases, "decreases": s.decreases},
+                "loops": len(s.by_loop),
+            }
+
+
+def _grant(fut: "asyncio.Future[None]") -> None:
+    # ожидающий мог уже отвалиться по таймауту/отмене — тогда он сам вернёт слот (granted=True)
+    if not fut.done():
+        fut.set_result(None)
+
+
+_controllers: "weakref.WeakKeyDictionary[Any, AdmissionController]" = weakref.WeakKeyDictionary()
+_controllers_lock = threading.Lock()
+
+
+def admission_for(engine: Any, *, role: Optional[str] = None) -> AdmissionController:
+    """Контроллер движка (AsyncEngine или Engine); создаётся при первом обращении."""
+    key = getattr(engine, "sync_engine", engine)
+    with _controllers_lock:
+        ctl = _controllers.get(key)
+        if ctl is None:
+            name = str(getattr(key, "url", "db")).split("?")[0].rsplit("/", 1)[-1] or "db"
+            ctl = AdmissionController(
+                f"{name}:{role}" if role else name,
+                initial=settings.db_max_concurrency,
+                min_limit=settings.db_admission_min,
+                max_limit=settings.db_admission_max,
+                target_ms=settings.db_admission_target_ms,
+                max_queue=settings.db_admission_queue,
+                wait=settings.db_admission_wait,
+            )
+            _controllers[key] = ctl
+        return ctl
+
+
+def install_admission(engine: Any, *, role: Optional[str] = None) -> AdmissionController:
+    """Слот на каждый оператор движка (см. модуль); вызывать до первого соединения."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    ctl = admission_for(sync_engine, role=role)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _acquire(conn, cursor, statement, parameters, context, executemany):  # pragma: no cover
+        # вне greenlet AsyncEngine (синхронный вызов) ждать слот нечем; slot() выше по стеку — уже взят
+        if context is None or not in_greenlet() or id(ctl) in _held.get():
+            return
+        await_only(ctl.acquire())
+        setattr(context, _CTX_STARTED, time.monotonic())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _release(conn, cursor, statement, parameters, context, executemany):  # pragma: no cover
+        started = context.__dict__.pop(_CTX_STARTED, None) if context is not None else None
+        if started is not None:
+            ctl.release(time.monotonic() - started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _release_failed(ctx):  # pragma: no cover
+        # ошибка и отмена (CancelledError) оператора — слот вернуть, задержку не учитывать
+        context = ctx.execution_context
+        if context is not None and context.__dict__.pop(_CTX_STARTED, None) is not None:
+            ctl.release(None)
+
+    return ctl
+
+
+def admission_stats() -> list[dict[str, Any]]:
+    with _controllers_lock:
+        ctls = list(_controllers.values())
+    return [c.stats() for c in ctls]
+
+
+__all__ = ["AdmissionController", "AdmissionRejected", "admission_for", "admission_stats", "install_admission"]
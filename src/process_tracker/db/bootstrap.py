@@ -4,7 +4,7 @@ import asyncio
 
 from .migrations import upgrade_head_with_bootstrap
 from .seed import seed_rbac
-from .session import AsyncSessionLocal
+from .session import AsyncWriteSessionLocal
 
 
 def run_migrations_blocking() -> None:
@@ -15,7 +15,7 @@ def run_migrations_blocking() -> None:
 
 
 async def run_seed() -> None:
-    async with AsyncSessionLocal() as s:
+    async with AsyncWriteSessionLocal() as s:
         await seed_rbac(s)
 
 
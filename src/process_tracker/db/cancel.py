@@ -0,0 +1,269 @@
+from __future__ import annotations
+"""
+Настоящая отмена запросов по дедлайну — не только брошенный await.
+
+asyncio.wait_for лишь перестаёт ждать: оператор SQLite продолжает работать в потоке
+aiosqlite, бэкенд Postgres — на сервере, оба держат блокировки. Здесь дедлайн доходит до БД:
+
+- statement_scope(timeout) — дедлайн операции в contextvar (вложенные берут меньший);
+  before_cursor_execute переносит его на соединение, которое выполняет оператор
+- SQLite: progress handler соединения раз в PROGRESS_OPS инструкций VM сверяет дедлайн
+  и прерывает оператор сам; на то, где VM не крутится (ожидание блокировки, fsync),
+  есть страховка — по таймауту await вызывается sqlite3 interrupt()
+- Postgres: statement_timeout сессии = остаток бюджета (SET — только когда он заметно
+  меньше уже выставленного); страховка — pg_cancel_backend(pid) с другого соединения
+- прерванный по дедлайну оператор превращается в asyncio.TimeoutError (как было у wait_for),
+  а если таймаут урезан дедлайном запроса (core/deadline.py) — в DeadlineExceeded
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..core.deadline import DeadlineExceeded, budget
+
+log = logging.getLogger(__name__)
+
+PROGRESS_OPS = 1000          # как часто SQLite зовёт progress handler (инструкций VM)
+CANCEL_GRACE = 0.5           # сек: сколько ждать, пока БД прервёт оператор сама, до страховки
+_PG_SLACK = 0.8              # SET statement_timeout, только если остаток < 80% выставленного (или больше него)
+
+_INFO_CELL = "_deadline_cell"
+_INFO_PID = "_pg_backend_pid"
+_INFO_PG_TIMEOUT = "_pg_statement_timeout_ms"   # зафиксированное значение сессии
+_INFO_PG_PENDING = "_pg_statement_timeout_tx"    # SET внутри текущей транзакции (ROLLBACK его отменит)
+
+
+class StatementScope:
+    """Дедлайн операции и соединение, на котором она сейчас выполняется (для страховочной отмены)."""
+
+    __slots__ = ("deadline", "dialect", "driver_connection", "backend_pid", "engine")
+
+    def __init__(self, deadline: float) -> None:
+        self.deadline = deadline
+        self.dialect: Optional[str] = None
+        self.driver_connection: Any = None
+        self.backend_pid: Optional[int] = None
+        self.engine: Any = None
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.deadline
+
+
+class _Cell:
+    """Дедлайн, который видит progress handler соединения SQLite (из потока aiosqlite)."""
+
+    __slots__ = ("deadline",)
+
+    def __init__(self) -> None:
+        self.deadline: Optional[float] = None
+
+
+_scope: ContextVar[Optional[StatementScope]] = ContextVar("db_statement_scope", default=None)
+
+
+@contextmanager
+def statement_scope(timeout: Optional[float]) -> Iterator[Optional[StatementScope]]:
+    """Дедлайн now+timeout для запросов внутри блока (не позже уже действующего)."""
+    outer = _scope.get()
+    if timeout is None or timeout <= 0:
+        yield outer
+        return
+    deadline = time.monotonic() + timeout
+    if outer is not None:
+        deadline = min(deadline, outer.deadline)
+    scope = StatementScope(deadline)
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+def is_cancellation(exc: BaseException) -> bool:
+    """Оператор прерван нами: SQLite interrupt или Postgres query_canceled (57014)."""
+    orig = getattr(exc, "orig", exc)
+    if getattr(orig, "sqlstate", None) == "57014" or getattr(orig, "pgcode", None) == "57014":
+        return True
+    msg = str(orig).lower()
+    return msg == "interrupted" or "canceling statement" in msg
+
+
+async def cancel_running(scope: Optional[StatementScope]) -> None:
+    """Страховка по таймауту await: прервать оператор, если БД не прервала его сама."""
+    if scope is None or scope.driver_connection is None and scope.backend_pid is None:
+        return
+    try:
+        if scope.dialect == "sqlite" and scope.driver_connection is not None:
+            # sqlite3 interrupt() потокобезопасен; aiosqlite зовёт его напрямую, без очереди
+            await scope.driver_connection.interrupt()
+        elif scope.dialect == "postgresql" and scope.backend_pid and scope.engine is not None:
+            async with scope.engine.connect() as conn:
+                await conn.execute(text("SELECT pg_cancel_backend(:pid)"), {"pid": scope.backend_pid})
+    except Exception:
+        log.exception("db_cancel_failed")
+
+
+async def await_with_deadline(coro: Any, timeout: Optional[float]) -> Any:
+    """
+    await запроса с дедлайном, который доходит до БД (см. модуль).
+    timeout — таймаут слоя; дедлайн запроса (core/deadline.py) его только сокращает,
+    а исчерпанный — DeadlineExceeded без обращения к БД.
+    """
+    try:
+        limit = budget(timeout, "db")
+    except DeadlineExceeded:
+        if inspect.iscoroutine(coro):
+            coro.close()
+        raise
+    by_request = limit is not None and (timeout is None or limit < timeout)
+    with statement_scope(limit) as scope:
+        if scope is None:
+            return await coro
+        # не wait_for: тот сразу отменяет задачу и ждёт отмены, а SQLAlchemy при отмене
+        # идёт в то же соединение (rollback) — и стоит в очереди потока за нашим же оператором
+        task = asyncio.ensure_future(coro)
+        try:
+            done, _ = await asyncio.wait({task}, timeout=scope.remaining() + CANCEL_GRACE)
+        except asyncio.CancelledError:
+            # запрос отменён сверху (клиент ушёл) — оператор тоже останавливаем
+            await _abandon(task, scope)
+            raise
+        if not done:
+            await _abandon(task, scope)
+            raise DeadlineExceeded("db") if by_request else asyncio.TimeoutError()
+        try:
+            return task.result()
+        except DBAPIError as e:
+            if scope.expired() and is_cancellation(e):
+                raise (DeadlineExceeded("db") if by_request else asyncio.TimeoutError()) from e
+            raise
+
+
+async def _abandon(task: "asyncio.Future[Any]", scope: StatementScope) -> None:
+    """Прервать оператор в БД, дать задаче завершиться (или отменить её), ошибку — проглотить."""
+    await cancel_running(scope)
+    done, _ = await asyncio.wait({task}, timeout=CANCEL_GRACE)
+    if not done:
+        task.cancel()
+        return
+    if not task.cancelled():
+        task.exception()  # помечаем извлечённой: иначе «exception was never retrieved»
+
+
+def install_cancellation(engine: AsyncEngine, *, default_timeout: float) -> None:
+    """Подключить отмену по дедлайну к движку (до первого соединения)."""
+    sync_engine = engine.sync_engine
+    dialect = sync_engine.dialect.name
+
+    if dialect == "sqlite":
+
+        @event.listens_for(sync_engine, "connect")
+        def _progress_handler(dbapi_connection, record):  # pragma: no cover
+            cell = _Cell()
+            record.info[_INFO_CELL] = cell
+
+            def _check() -> int:
+                d = cell.deadline
+                return 1 if d is not None and time.monotonic() > d else 0
+
+            if hasattr(dbapi_connection, "run_async"):
+                dbapi_connection.run_async(lambda c: c.set_progress_handler(_check, PROGRESS_OPS))
+            else:
+                dbapi_connection.set_progress_handler(_check, PROGRESS_OPS)
+
+    elif dialect == "postgresql":
+        default_ms = max(0, int(default_timeout * 1000))
+
+        @event.listens_for(sync_engine, "connect")
+        def _pg_session(dbapi_connection, record):  # pragma: no cover
+            cur = dbapi_connection.cursor()
+            try:
+                cur.execute("SELECT pg_backend_pid()")
+                record.info[_INFO_PID] = int(cur.fetchone()[0])
+                cur.execute(f"SET statement_timeout = {default_ms}")
+                record.info[_INFO_PG_TIMEOUT] = default_ms
+            finally:
+                cur.close()
+            # SET вне транзакции иначе откатится вместе с первой же транзакцией
+            dbapi_connection.commit()
+
+    else:
+        return
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _bind_deadline(conn, cursor, statement, parameters, context, executemany):  # pragma: no cover
+        scope = _scope.get()
+        info = conn.info
+        if dialect == "sqlite":
+            cell = info.get(_INFO_CELL)
+            if cell is not None:
+                cell.deadline = scope.deadline if scope is not None else None
+        elif dialect == "postgresql":
+            current = info.get(_INFO_PG_PENDING, info.get(_INFO_PG_TIMEOUT, default_ms))
+            want = default_ms if scope is None else min(default_ms, max(1, int(scope.remaining() * 1000)))
+            if not (current * _PG_SLACK <= want <= current):
+                cursor.execute(f"SET statement_timeout = {want}")
+                info[_INFO_PG_PENDING] = want
+        if scope is not None:
+            scope.dialect = dialect
+            scope.engine = engine
+            scope.driver_connection = conn.connection.driver_connection
+            scope.backend_pid = info.get(_INFO_PID)
+
+    if dialect == "postgresql":
+
+        @event.listens_for(sync_engine, "commit")
+        def _pg_commit(conn):  # pragma: no cover
+            if _INFO_PG_PENDING in conn.info:
+                conn.info[_INFO_PG_TIMEOUT] = conn.info.pop(_INFO_PG_PENDING)
+
+        @event.listens_for(sync_engine, "rollback")
+        def _pg_rollback(conn):  # pragma: no cover
+            conn.info.pop(_INFO_PG_PENDING, None)
+
+    @event.listens_for(sync_engine, "checkin")
+    def _unbind_on_checkin(dbapi_connection, record):  # pragma: no cover
+        cell = record.info.get(_INFO_CELL)
+        if cell is not None:
+            cell.deadline = None
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _unbind_deadline(conn, cursor, statement, parameters, context, executemany):  # pragma: no cover
+        _clear(conn)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _unbind_on_error(ctx):  # pragma: no cover
+        if ctx.connection is not None and not ctx.connection.invalidated:
+            _clear(ctx.connection)
+
+    def _clear(conn) -> None:
+        cell = conn.info.get(_INFO_CELL)
+        if cell is not None:
+            cell.deadline = None
+        scope = _scope.get()
+        if scope is not None:
+            scope.driver_connection = None
+            scope.backend_pid = None
+
+
+__all__ = [
+    "CANCEL_GRACE",
+    "StatementScope",
+    "statement_scope",
+    "is_cancellation",
+    "cancel_running",
+    "await_with_deadline",
+    "install_cancellation",
+]
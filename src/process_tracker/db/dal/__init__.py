@@ -3,6 +3,7 @@ from .permission_repo import PermissionRepo
 from .task_repo import TaskRepo
 from .process_repo import ProcessRepo
 from .user_repo import UserRepo
+from .tag_repo import TagRepo
 
 __all__ = [
     "RoleRepo",
@@ -10,4 +11,5 @@ __all__ = [
     "TaskRepo",
     "ProcessRepo",
     "UserRepo",
+    "TagRepo",
 ]
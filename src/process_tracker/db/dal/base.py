@@ -2,12 +2,15 @@ from __future__ import annotations
 
 import asyncio
 from contextlib import asynccontextmanager
-from typing import AsyncIterator, Callable, TypeVar, Awaitable
+from typing import Any, AsyncIterator, Callable, Optional, TypeVar, Awaitable
 
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..session import DB_CONCURRENCY_SEM
+from ..entity_cache import DTO_SOURCES, entity_cache, read_token
+from ..cancel import await_with_deadline
 from ...core.config import settings
+from ...core.deadline import budget
 
 T = TypeVar("T")
 
@@ -15,8 +18,10 @@ T = TypeVar("T")
 class BaseRepo:
     """
     Базовый репозиторий:
-    - ограничивает параллельные обращения к БД через глобальный семафор DB_CONCURRENCY_SEM
-    - оборачивает операции в asyncio.wait_for с таймаутом settings.db_query_timeout
+    - не начинает работу с БД, если дедлайн запроса уже исчерпан (_guard); число одновременных
+      операторов ограничивает admission control движка, которым оператор выполняется (db/admission.py)
+    - ограничивает операции таймаутом settings.db_query_timeout, урезанным до остатка
+      дедлайна запроса (core/deadline.py), с отменой оператора на стороне БД (db/cancel.py)
     """
 
     def __init__(self, session: AsyncSession):
@@ -25,11 +30,31 @@ class BaseRepo:
 
     @asynccontextmanager
     async def _guard(self) -> AsyncIterator[None]:
-        async with DB_CONCURRENCY_SEM:
-            yield
+        # слот admission берётся на сам оператор, когда соединение уже из пула: держать его
+        # здесь, пока сессия ждёт единственного писателя SQLite, — взаимная блокировка
+        budget(None, "db")
+        yield
 
     async def _with_timeout(self, func: Callable[[], T]) -> T:
-        return await asyncio.wait_for(asyncio.to_thread(func), timeout=self._timeout)
+        timeout = budget(self._timeout, "db")
+        return await asyncio.wait_for(asyncio.to_thread(func), timeout=timeout)
 
     async def _await_timeout(self, coro: Awaitable[T]) -> T:
-        return await asyncio.wait_for(coro, timeout=self._timeout)
+        return await await_with_deadline(coro, self._timeout)
+
+    async def _get_dto(self, kind: str, entity_id: int) -> Optional[Any]:
+        """DTO сущности по id через кэш сущностей (db/entity_cache.py); промах — один SELECT по колонкам."""
+        dto = entity_cache.get(kind, entity_id)
+        if dto is not None:
+            return dto
+        token = read_token(self.session, kind)
+        dto_cls, cols = DTO_SOURCES[kind]
+        async with self._guard():
+            res = await self._await_timeout(self.session.execute(select(*cols).where(cols[0] == entity_id)))
+            row = res.first()
+        if row is None:
+            return None
+        dto = dto_cls.from_row(row)
+        if token is not None:
+            entity_cache.put(kind, entity_id, dto, token)
+        return dto
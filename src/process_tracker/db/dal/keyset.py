@@ -0,0 +1,103 @@
+from __future__ import annotations
+"""
+Keyset-пагинация (seek method) для списков.
+
+Курсор — непрозрачная url-safe base64-строка с JSON внутри:
+  {"k": [<значение ключа сортировки>, ...], "i": <id последней строки>}
+
+Страница N+1 всегда читается одним индексным диапазоном
+`WHERE (key, id) < (:k, :i) ORDER BY key DESC, id DESC LIMIT :n`,
+поэтому стоимость не зависит от «глубины» листания (в отличие от OFFSET).
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+class InvalidCursor(ValueError):
+    """Курсор повреждён или не от этого списка."""
+
+
+def _dump(v: Any) -> Any:
+    if isinstance(v, datetime):
+        return {"dt": v.isoformat()}
+    if isinstance(v, date):
+        return {"d": v.isoformat()}
+    return v
+
+
+def _load(v: Any) -> Any:
+    if isinstance(v, dict):
+        if "dt" in v:
+            return datetime.fromisoformat(v["dt"])
+        if "d" in v:
+            return date.fromisoformat(v["d"])
+    return v
+
+
+def encode_cursor(keys: Sequence[Any], last_id: int) -> str:
+    payload = {"k": [_dump(k) for k in keys], "i": int(last_id)}
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[list[Any], int]:
+    try:
+        pad = "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode((cursor + pad).encode("ascii")))
+        return [_load(k) for k in payload["k"]], int(payload["i"])
+    except Exception as e:  # noqa: BLE001
+        raise InvalidCursor("invalid cursor") from e
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    return max(1, min(int(limit or DEFAULT_LIMIT), MAX_LIMIT))
+
+
+def seek_after(
+    key_cols: Sequence[ColumnElement],
+    id_col: ColumnElement,
+    keys: Sequence[Any],
+    last_id: int,
+    *,
+    descending: bool | Sequence[bool] = True,
+) -> ColumnElement[bool]:
+    """
+    Предикат «строго после курсора» для ORDER BY (*key_cols, id_col) [DESC].
+    Разворачиваем row-value сравнение в OR/AND — так его одинаково понимают
+    SQLite и Postgres, и оба используют составной индекс.
+    descending может быть списком — направление на каждую колонку key_cols
+    (id_col идёт в направлении последней из них).
+    """
+    cols = list(key_cols) + [id_col]
+    vals = list(keys) + [last_id]
+    if isinstance(descending, bool):
+        dirs = [descending] * len(cols)
+    else:
+        dirs = list(descending) or [True]
+        dirs += [dirs[-1]] * (len(cols) - len(dirs))
+    clauses = []
+    for n, (col, val) in enumerate(zip(cols, vals)):
+        eq = [c == v for c, v in zip(cols[:n], vals[:n])]
+        cmp = col < val if dirs[n] else col > val
+        clauses.append(and_(*eq, cmp) if eq else cmp)
+    return or_(*clauses)
+
+
+__all__ = [
+    "DEFAULT_LIMIT",
+    "MAX_LIMIT",
+    "InvalidCursor",
+    "encode_cursor",
+    "decode_cursor",
+    "clamp_limit",
+    "seek_after",
+]
@@ -0,0 +1,185 @@
+from __future__ import annotations
+"""
+Профили загрузки (loader profiles) для Task/Process.
+
+По умолчанию связи в моделях ничего не подгружают сами
+(коллекции — noload, many-to-one — raise_on_sql), поэтому каждый вызов
+явно говорит, какую «форму» данных он хочет:
+
+  list   — лента/таблица: только скалярные колонки, без description и связей
+  board  — kanban-карточка: минимальный набор для колонок доски
+  detail — карточка задачи: все колонки + process/type/assignee одним JOIN
+
+Для list/board есть ещё проекционный fast path (`*_columns`): select по
+колонкам без гидрации ORM-сущностей и identity map.
+
+Sparse fieldsets (`?fields=` / `?include=` в API): task_projection() сужает
+select до запрошенных колонок (+ ключи курсора/колонок доски) и добавляет
+outer join только запрошенных связей; shape_task_row() собирает из строки
+ответ ровно с этими ключами.
+"""
+
+from typing import Any, Iterable, Literal, Mapping, Optional, Sequence
+
+from sqlalchemy.orm import joinedload, load_only, noload, raiseload
+from sqlalchemy.orm.interfaces import ORMOption
+
+from ..models import Process, Task, TaskType, User
+
+TaskProfile = Literal["list", "board", "detail"]
+ProcessProfile = Literal["list", "detail"]
+
+TASK_PROFILES: tuple[str, ...] = ("list", "board", "detail")
+
+_TASK_COLUMNS: dict[str, tuple] = {
+    "list": (
+        Task.id,
+        Task.title,
+        Task.status,
+        Task.assignee_id,
+        Task.process_id,
+        Task.type_id,
+        Task.fields,
+        Task.start_at,
+        Task.due_at,
+        Task.updated_at,
+    ),
+    "board": (
+        Task.id,
+        Task.title,
+        Task.status,
+        Task.assignee_id,
+        Task.type_id,
+        Task.rank,
+        Task.updated_at,
+    ),
+}
+
+
+# ?fields= для задач: имя в ответе → колонка
+TASK_FIELDS: dict[str, Any] = {
+    "id": Task.id,
+    "title": Task.title,
+    "description": Task.description,
+    "status": Task.status,
+    "assignee_id": Task.assignee_id,
+    "process_id": Task.process_id,
+    "type_id": Task.type_id,
+    "fields": Task.fields,
+    "start_at": Task.start_at,
+    "due_at": Task.due_at,
+    "updated_at": Task.updated_at,
+    "rank": Task.rank,
+}
+
+# ?include= для задач: связь → (модель, FK задачи, колонки связи в ответе)
+TASK_INCLUDES: dict[str, tuple[Any, Any, tuple]] = {
+    "process": (Process, Task.process_id, (Process.id, Process.name, Process.status)),
+    "type": (TaskType, Task.type_id, (TaskType.id, TaskType.key, TaskType.title)),
+    "assignee": (User, Task.assignee_id, (User.id, User.email, User.display_name)),
+}
+
+# колонки, без которых профиль не работает: ключ курсора, группировка доски по статусу
+_TASK_REQUIRED: dict[str, tuple] = {
+    "list": (Task.id, Task.updated_at),
+    "board": (Task.id, Task.status, Task.rank),
+}
+
+_INCLUDE_SEP = "__"  # метка колонки связи: process__name
+
+
+def parse_fieldset(raw: Optional[str], allowed: Iterable[str], *, what: str = "field") -> Optional[tuple[str, ...]]:
+    """'id, title,status' → ('id', 'title', 'status'); None/пусто — не задано. ValueError — неизвестное имя."""
+    if raw is None:
+        return None
+    names = tuple(dict.fromkeys(n.strip() for n in raw.split(",") if n.strip()))
+    if not names:
+        return None
+    allowed = set(allowed)
+    unknown = [n for n in names if n not in allowed]
+    if unknown:
+        raise ValueError(f"unknown {what}: {', '.join(unknown)} (allowed: {', '.join(sorted(allowed))})")
+    return names
+
+
+def task_projection(
+    profile: TaskProfile = "list",
+    fields: Optional[Sequence[str]] = None,
+    include: Sequence[str] = (),
+) -> tuple:
+    """Колонки select(...) под ?fields= / ?include=: fields=None — весь профиль."""
+    base = task_columns(profile) if fields is None else tuple(TASK_FIELDS[f] for f in fields)
+    cols = tuple(dict.fromkeys(_TASK_REQUIRED.get(profile, (Task.id,)) + base))
+    for name in include:
+        _, _, rel_cols = TASK_INCLUDES[name]
+        cols += tuple(c.label(f"{name}{_INCLUDE_SEP}{c.key}") for c in rel_cols)
+    return cols
+
+
+def join_includes(stmt: Any, include: Sequence[str]) -> Any:
+    """Outer join только запрошенных связей (к select, построенному по task_projection)."""
+    for name in include:
+        model, fk, _ = TASK_INCLUDES[name]
+        stmt = stmt.outerjoin(model, model.id == fk)
+    return stmt
+
+
+def shape_task_row(row: Mapping[str, Any], fields: Sequence[str], include: Sequence[str] = ()) -> dict[str, Any]:
+    """Ответ по строке проекции: ключи fields (нет в выборке — None) + вложенные связи include."""
+    out = {f: row.get(f) for f in fields}
+    if "fields" in out:
+        out["fields"] = out["fields"] or {}
+    for name in include:
+        _, _, rel_cols = TASK_INCLUDES[name]
+        prefix = name + _INCLUDE_SEP
+        out[name] = {c.key: row[prefix + c.key] for c in rel_cols} if row[prefix + "id"] is not None else None
+    return out
+
+
+def task_columns(profile: TaskProfile = "list") -> tuple:
+    """Колонки для проекционного select(...) в профиле list/board."""
+    try:
+        return _TASK_COLUMNS[profile]
+    except KeyError:
+        raise ValueError(f"profile '{profile}' has no column projection") from None
+
+
+def task_options(profile: TaskProfile = "list") -> Sequence[ORMOption]:
+    """ORM-опции для select(Task) в заданном профиле."""
+    if profile == "detail":
+        return (
+            joinedload(Task.process).load_only(Process.id, Process.name, Process.status),
+            joinedload(Task.type).load_only(TaskType.id, TaskType.key, TaskType.title, TaskType.statuses),
+            # у User.roles по умолчанию selectin — карточке задачи роли исполнителя не нужны
+            joinedload(Task.assignee).load_only(User.id, User.email, User.display_name).options(
+                noload(User.roles)
+            ),
+        )
+    if profile in _TASK_COLUMNS:
+        return (load_only(*_TASK_COLUMNS[profile]), raiseload("*"))
+    raise ValueError(f"unknown task profile '{profile}'")
+
+
+def process_options(profile: ProcessProfile = "list") -> Sequence[ORMOption]:
+    """ORM-опции для select(Process): в списке связи (Process.tasks) не трогаем вовсе."""
+    if profile == "detail":
+        return ()
+    if profile == "list":
+        return (raiseload("*"),)
+    raise ValueError(f"unknown process profile '{profile}'")
+
+
+__all__ = [
+    "TaskProfile",
+    "ProcessProfile",
+    "TASK_PROFILES",
+    "TASK_FIELDS",
+    "TASK_INCLUDES",
+    "parse_fieldset",
+    "task_projection",
+    "join_includes",
+    "shape_task_row",
+    "task_columns",
+    "task_options",
+    "process_options",
+]
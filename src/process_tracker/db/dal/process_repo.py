@@ -1,30 +1,100 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import Optional, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import case, func, select
+from sqlalchemy.engine import RowMapping
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .base import BaseRepo
-from ..models import Process
+from ..entity_cache import ProcessDTO
+from .keyset import clamp_limit, decode_cursor, encode_cursor, seek_after
+from .loaders import ProcessProfile, process_options
+from ..models import DONE_STATUSES, Process, Task, utcnow
+
+# колонки строки списка процессов; они же — допустимые ?fields=
+PROCESS_FIELDS = {c.key: c for c in (Process.id, Process.name, Process.description, Process.status, Process.last_activity_at)}
+_LIST_COLUMNS = tuple(PROCESS_FIELDS.values())
+_PAGE_KEYS = (Process.id, Process.last_activity_at)  # ключ курсора — выбираются всегда
 
 
 class ProcessRepo(BaseRepo):
     def __init__(self, session: AsyncSession):
         super().__init__(session)
 
-    async def get_by_id(self, process_id: int) -> Optional[Process]:
+    async def get_by_id(self, process_id: int, *, profile: ProcessProfile = "detail") -> Optional[Process]:
         async with self._guard():
-            res = await self._await_timeout(self.session.execute(select(Process).where(Process.id == process_id)))
+            res = await self._await_timeout(
+                self.session.execute(select(Process).options(*process_options(profile)).where(Process.id == process_id))
+            )
             return res.scalars().first()
 
-    async def list(self) -> list[Process]:
+    async def get_dto(self, process_id: int) -> Optional[ProcessDTO]:
+        return await self._get_dto("processes", process_id)
+
+    async def list(self, *, profile: ProcessProfile = "list") -> list[Process]:
         async with self._guard():
             res = await self._await_timeout(
-                self.session.execute(select(Process).order_by(Process.id.desc()))
+                self.session.execute(select(Process).options(*process_options(profile)).order_by(Process.id.desc()))
             )
             return list(res.scalars().all())
 
+    async def page(
+        self,
+        *,
+        limit: int | None = None,
+        cursor: str | None = None,
+        rollups: bool = False,
+        fields: Sequence[str] | None = None,
+    ) -> tuple[list[RowMapping], Optional[str]]:
+        """
+        Страница процессов ORDER BY last_activity_at DESC, id DESC (индекс ix_processes_activity).
+        rollups=True — плюс tasks_total / tasks_done / tasks_overdue тем же запросом:
+        страница — CTE, агрегат по задачам считается только для её процессов
+        (ix_tasks_process_rollup покрывает process_id, status, due_at).
+        fields — sparse fieldset: только эти колонки (+ id, last_activity_at).
+        """
+        n = clamp_limit(limit)
+        cols = _LIST_COLUMNS if fields is None else tuple(dict.fromkeys(_PAGE_KEYS + tuple(PROCESS_FIELDS[f] for f in fields)))
+        stmt = select(*cols)
+        if cursor:
+            keys, last_id = decode_cursor(cursor)
+            stmt = stmt.where(seek_after([Process.last_activity_at], Process.id, keys, last_id))
+        stmt = stmt.order_by(Process.last_activity_at.desc(), Process.id.desc()).limit(n + 1)
+
+        if rollups:
+            page = stmt.cte("page")
+            done = Task.status.in_(DONE_STATUSES)
+            agg = (
+                select(
+                    Task.process_id.label("process_id"),
+                    func.count().label("total"),
+                    func.sum(case((done, 1), else_=0)).label("done"),
+                    func.sum(case((~done & (Task.due_at < utcnow()), 1), else_=0)).label("overdue"),
+                )
+                .where(Task.process_id.in_(select(page.c.id)))
+                .group_by(Task.process_id)
+                .subquery()
+            )
+            stmt = (
+                select(
+                    page,
+                    func.coalesce(agg.c.total, 0).label("tasks_total"),
+                    func.coalesce(agg.c.done, 0).label("tasks_done"),
+                    func.coalesce(agg.c.overdue, 0).label("tasks_overdue"),
+                )
+                .outerjoin(agg, agg.c.process_id == page.c.id)
+                .order_by(page.c.last_activity_at.desc(), page.c.id.desc())
+            )
+
+        async with self._guard():
+            res = await self._await_timeout(self.session.execute(stmt))
+            rows = list(res.mappings().all())
+        if len(rows) <= n:
+            return rows, None
+        rows = rows[:n]
+        return rows, encode_cursor([rows[-1]["last_activity_at"]], rows[-1]["id"])
+
     async def create(
         self,
         name: str,
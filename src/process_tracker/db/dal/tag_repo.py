@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from typing import AsyncIterator, Iterable, Optional, Sequence
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import BaseRepo
+from .task_repo import ID_CHUNK, _chunks
+from ..models import Tag, Task, TaskTag
+
+
+class TagRepo(BaseRepo):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session)
+
+    async def list(self) -> list[Tag]:
+        async with self._guard():
+            res = await self._await_timeout(self.session.execute(select(Tag).order_by(Tag.name)))
+            return list(res.scalars().all())
+
+    async def get_by_id(self, tag_id: int) -> Optional[Tag]:
+        async with self._guard():
+            return await self._await_timeout(self.session.get(Tag, tag_id))
+
+    async def ids_by_name(self, names: Iterable[str]) -> dict[str, int]:
+        uniq = sorted(set(names))
+        if not uniq:
+            return {}
+        async with self._guard():
+            res = await self._await_timeout(self.session.execute(select(Tag.name, Tag.id).where(Tag.name.in_(uniq))))
+            return {n: int(i) for n, i in res.all()}
+
+    async def create(self, name: str, color: str | None = None) -> Tag:
+        async with self._guard():
+            item = Tag(name=name, color=color)
+            self.session.add(item)
+            await self._await_timeout(self.session.flush())
+            return item
+
+    async def ensure(self, names: Sequence[str]) -> dict[str, int]:
+        """id меток по именам; недостающие создаются."""
+        have = await self.ids_by_name(names)
+        missing = [n for n in dict.fromkeys(names) if n not in have]
+        if missing:
+            async with self._guard():
+                res = await self._await_timeout(
+                    self.session.execute(insert(Tag).returning(Tag.name, Tag.id), [{"name": n} for n in missing])
+                )
+                have.update({n: int(i) for n, i in res.all()})
+        return have
+
+    async def update(self, tag_id: int, **values) -> int:
+        async with self._guard():
+            res = await self._await_timeout(
+                self.session.execute(update(Tag).where(Tag.id == tag_id).values(**values).returning(Tag.id))
+            )
+            row = res.first()
+            return int(row[0]) if row else 0
+
+    async def remove(self, tag_id: int) -> int:
+        async with self._guard():
+            # ON DELETE CASCADE в SQLite работает только с PRAGMA foreign_keys — чистим связи явно
+            await self._await_timeout(self.session.execute(delete(TaskTag).where(TaskTag.tag_id == tag_id)))
+            res = await self._await_timeout(
+                self.session.execute(delete(Tag).where(Tag.id == tag_id).returning(Tag.id))
+            )
+            row = res.first()
+            return int(row[0]) if row else 0
+
+    # ---- метки задач ----
+
+    async def set_task_tags(self, task_id: int, tag_ids: Iterable[int]) -> None:
+        """Заменить набор меток задачи: DELETE лишних + INSERT недостающих."""
+        want = {int(t) for t in tag_ids}
+        async with self._guard():
+            res = await self._await_timeout(
+                self.session.execute(select(TaskTag.tag_id).where(TaskTag.task_id == task_id))
+            )
+            have = {int(t) for t in res.scalars().all()}
+            if have - want:
+                await self._await_timeout(
+                    self.session.execute(
+                        delete(TaskTag).where(TaskTag.task_id == task_id, TaskTag.tag_id.in_(have - want))
+                    )
+                )
+            if want - have:
+                await self._await_timeout(
+                    self.session.execute(
+                        insert(TaskTag), [{"task_id": task_id, "tag_id": t} for t in sorted(want - have)]
+                    )
+                )
+
+    async def tags_of(self, task_ids: Iterable[int]) -> dict[int, list[str]]:
+        """{task_id: [имена меток]} пачками по ID_CHUNK."""
+        uniq = sorted({int(i) for i in task_ids})
+        out: dict[int, list[str]] = {i: [] for i in uniq}
+        async with self._guard():
+            for chunk in _chunks(uniq, ID_CHUNK):
+                res = await self._await_timeout(
+                    self.session.execute(
+                        select(TaskTag.task_id, Tag.name)
+                        .join(Tag, Tag.id == TaskTag.tag_id)
+                        .where(TaskTag.task_id.in_(chunk))
+                        .order_by(TaskTag.task_id, Tag.name)
+                    )
+                )
+                for tid, name in res.all():
+                    out[int(tid)].append(name)
+        return out
+
+    # ---- для индекса меток (services/tags_service.py) ----
+
+    async def task_states(self, task_ids: Sequence[int]) -> tuple[list[tuple], list[tuple[int, int]]]:
+        """Текущее (id, status, assignee_id) и пары (task_id, tag_id) для заданных задач."""
+        tasks: list[tuple] = []
+        pairs: list[tuple[int, int]] = []
+        async with self._guard():
+            for chunk in _chunks(sorted(set(task_ids)), ID_CHUNK):
+                res = await self._await_timeout(
+                    self.session.execute(select(Task.id, Task.status, Task.assignee_id).where(Task.id.in_(chunk)))
+                )
+                tasks.extend(tuple(r) for r in res.all())
+                res = await self._await_timeout(
+                    self.session.execute(select(TaskTag.task_id, TaskTag.tag_id).where(TaskTag.task_id.in_(chunk)))
+                )
+                pairs.extend((int(a), int(b)) for a, b in res.all())
+        return tasks, pairs
+
+    async def stream_all(self, yield_per: int = 10_000) -> AsyncIterator[tuple[str, tuple]]:
+        """
+        Все задачи ("task", (id, status, assignee_id)) и все метки ("tag", (task_id, tag_id))
+        серверным курсором — для полной перестройки индекса. Семафор не берём (долгое чтение).
+        """
+        res = await self.session.stream(
+            select(Task.id, Task.status, Task.assignee_id).execution_options(yield_per=yield_per)
+        )
+        async for row in res:
+            yield "task", tuple(row)
+        res = await self.session.stream(
+            select(TaskTag.task_id, TaskTag.tag_id).execution_options(yield_per=yield_per)
+        )
+        async for row in res:
+            yield "tag", tuple(row)
@@ -1,30 +1,387 @@
 from __future__ import annotations
 
-from typing import Optional
+from datetime import datetime
+from typing import Any, AsyncIterator, Iterable, Iterator, Mapping, Optional, Sequence
 
-from sqlalchemy import select, update, delete
+from sqlalchemy import and_, bindparam, func, literal, or_, select, text, union_all, update, delete, insert
+from sqlalchemy.engine import RowMapping
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
 
 from .base import BaseRepo
-from ..models import Task
+from ..entity_cache import DTO_SOURCES, TaskDTO, entity_cache, read_token
+from .keyset import clamp_limit, decode_cursor, encode_cursor, seek_after
+from .loaders import TaskProfile, join_includes, task_columns, task_options, task_projection
+from ..field_indexes import field_predicate
+from ..models import TASK_SPAN_END, TASK_SPAN_START, Process, Task, TaskType, User, utcnow
+from ..ranking import RANK_MAX_LEN, rank_between, spread_ranks
+from ..types import JSON_AUTO, UTCDateTime, json_merge
+
+# размер пачки для IN (...) — с запасом ниже лимита bind-параметров старых SQLite (999)
+ID_CHUNK = 500
+# строк на один INSERT/UPDATE statement в пакетных операциях
+WRITE_CHUNK = 1000
+
+# измерения фасетов панели фильтров
+FACETS = ("status", "assignee_id", "type_id", "process_id")
+
+# колонки, которые можно задать при создании/патче задачи пачкой
+_WRITABLE = (
+    "title", "description", "status", "process_id", "type_id", "assignee_id", "fields", "start_at", "due_at",
+)
+
+
+# связанные сущности карточки задачи: (имя в ?include=, вид кэша, поле задачи, модель, префикс метки колонок)
+_DETAIL_RELATED = (
+    ("process", "processes", "process_id", Process, "p_"),
+    ("type", "task_types", "type_id", TaskType, "t_"),
+    ("assignee", "users", "assignee_id", User, "u_"),
+)
+DETAIL_INCLUDES: tuple[str, ...] = tuple(r[0] for r in _DETAIL_RELATED)
+
+
+class _Prefixed:
+    """Атрибутный доступ к колонкам строки, помеченным префиксом (p_name → name)."""
+
+    __slots__ = ("_row", "_prefix")
+
+    def __init__(self, row: Any, prefix: str) -> None:
+        self._row, self._prefix = row, prefix
+
+    def __getattr__(self, name: str) -> Any:
+        return self._row[self._prefix + name]
+
+
+def _chunks(items: Sequence[Any], size: int = ID_CHUNK) -> Iterator[Sequence[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def _apply_filters(
+    stmt: Select,
+    *,
+    status: str | None = None,
+    assignee_id: int | None = None,
+    process_id: int | None = None,
+    type_id: int | None = None,
+    field_filters: Sequence[tuple[str, str, str]] = (),
+    dialect: str = "sqlite",
+) -> Select:
+    # фильтры по равенству ложатся на составные индексы ix_tasks_*_updated_id
+    if status is not None:
+        stmt = stmt.where(Task.status == status)
+    if assignee_id is not None:
+        stmt = stmt.where(Task.assignee_id == assignee_id)
+    if process_id is not None:
+        stmt = stmt.where(Task.process_id == process_id)
+    if type_id is not None:
+        stmt = stmt.where(Task.type_id == type_id)
+    # (key, op, value) по Task.fields — выражение совпадает с ix_tasks_fx_* (см. db/field_indexes.py)
+    for key, op, raw in field_filters:
+        stmt = stmt.where(field_predicate(dialect, key, op, raw))
+    return stmt
+
+
+def _board_column(type_id: int | None):
+    # задачи без типа — своя доска (type_id IS NULL), индекс ix_tasks_board тот же
+    return Task.type_id.is_(None) if type_id is None else Task.type_id == type_id
+
+
+def _paginate(stmt: Select, limit: int, cursor: str | None) -> Select:
+    if cursor:
+        keys, last_id = decode_cursor(cursor)
+        stmt = stmt.where(seek_after([Task.updated_at], Task.id, keys, last_id))
+    # +1 строка — чтобы узнать, есть ли следующая страница, без COUNT(*)
+    return stmt.order_by(Task.updated_at.desc(), Task.id.desc()).limit(limit + 1)
+
+
+def _cut_page(rows: list[Any], limit: int) -> tuple[list[Any], Optional[str]]:
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    if isinstance(last, Task):
+        return rows, encode_cursor([last.updated_at], last.id)
+    return rows, encode_cursor([last["updated_at"]], last["id"])
 
 
 class TaskRepo(BaseRepo):
     def __init__(self, session: AsyncSession):
         super().__init__(session)
 
-    async def get_by_id(self, task_id: int) -> Optional[Task]:
+    async def get_by_id(self, task_id: int, *, profile: TaskProfile = "detail") -> Optional[Task]:
         async with self._guard():
-            res = await self._await_timeout(self.session.execute(select(Task).where(Task.id == task_id)))
+            res = await self._await_timeout(
+                self.session.execute(select(Task).options(*task_options(profile)).where(Task.id == task_id))
+            )
             return res.scalars().first()
 
-    async def list(self) -> list[Task]:
+    async def get_dto(self, task_id: int) -> Optional[TaskDTO]:
+        return await self._get_dto("tasks", task_id)
+
+    async def get_detail(
+        self, task_id: int, include: Sequence[str] = DETAIL_INCLUDES
+    ) -> Optional[tuple[TaskDTO, dict[str, Any]]]:
+        """
+        Карточка задачи из кэша сущностей: (TaskDTO, {связь из include: DTO или None}).
+        Промах по задаче — один SELECT с outer join запрошенных связей, кладёт все DTO;
+        задача в кэше — связанные берутся из кэша, недостающие добираются по id.
+        """
+        related_spec = [r for r in _DETAIL_RELATED if r[0] in include]
+        task = entity_cache.get("tasks", task_id)
+        if task is None:
+            tokens = {kind: read_token(self.session, kind) for kind in ("tasks", *(r[1] for r in related_spec))}
+            cols = list(DTO_SOURCES["tasks"][1])
+            stmt_from = Task.__table__
+            for _, kind, fk, model, prefix in related_spec:
+                cols += [c.label(prefix + c.key) for c in DTO_SOURCES[kind][1]]
+                stmt_from = stmt_from.outerjoin(model.__table__, model.id == getattr(Task, fk))
+            async with self._guard():
+                res = await self._await_timeout(
+                    self.session.execute(select(*cols).select_from(stmt_from).where(Task.id == task_id))
+                )
+                row = res.mappings().first()
+            if row is None:
+                return None
+            task = TaskDTO.from_row(_Prefixed(row, ""))
+            related: dict[str, Any] = {}
+            for name, kind, _, _, prefix in related_spec:
+                dto = None
+                if row[prefix + "id"] is not None:
+                    dto = DTO_SOURCES[kind][0].from_row(_Prefixed(row, prefix))
+                    if tokens[kind] is not None:
+                        entity_cache.put(kind, dto.id, dto, tokens[kind])
+                related[name] = dto
+            if tokens["tasks"] is not None:
+                entity_cache.put("tasks", task_id, task, tokens["tasks"])
+            return task, related
+        related = {}
+        for name, kind, fk, _, _ in related_spec:
+            ref = getattr(task, fk)
+            related[name] = await self._get_dto(kind, ref) if ref is not None else None
+        return task, related
+
+    async def list(self, *, profile: TaskProfile = "list") -> list[Task]:
         async with self._guard():
             res = await self._await_timeout(
-                self.session.execute(select(Task).order_by(Task.id.desc()))
+                self.session.execute(select(Task).options(*task_options(profile)).order_by(Task.id.desc()))
             )
             return list(res.scalars().all())
 
+    async def list_page(
+        self,
+        *,
+        status: str | None = None,
+        assignee_id: int | None = None,
+        process_id: int | None = None,
+        type_id: int | None = None,
+        field_filters: Sequence[tuple[str, str, str]] = (),
+        limit: int | None = None,
+        cursor: str | None = None,
+        profile: TaskProfile = "list",
+    ) -> tuple[list[Task], Optional[str]]:
+        """
+        Страница ленты задач, ORDER BY updated_at DESC, id DESC.
+        Возвращает (items, next_cursor); next_cursor=None — это последняя страница.
+        field_filters — [(key, op, value)] по Task.fields; op из FILTER_OPS,
+        ValueError при неизвестном op или значении не того типа.
+        """
+        n = clamp_limit(limit)
+        stmt = _apply_filters(
+            select(Task).options(*task_options(profile)),
+            status=status,
+            assignee_id=assignee_id,
+            process_id=process_id,
+            type_id=type_id,
+            field_filters=field_filters,
+            dialect=self.session.get_bind().dialect.name,
+        )
+        async with self._guard():
+            res = await self._await_timeout(self.session.execute(_paginate(stmt, n, cursor)))
+            rows = list(res.scalars().all())
+        return _cut_page(rows, n)
+
+    async def list_page_rows(
+        self,
+        *,
+        status: str | None = None,
+        assignee_id: int | None = None,
+        process_id: int | None = None,
+        type_id: int | None = None,
+        field_filters: Sequence[tuple[str, str, str]] = (),
+        limit: int | None = None,
+        cursor: str | None = None,
+        profile: TaskProfile = "list",
+        fields: Sequence[str] | None = None,
+        include: Sequence[str] = (),
+    ) -> tuple[list[RowMapping], Optional[str]]:
+        """
+        То же, что list_page, но проекцией колонок профиля: без ORM-гидрации,
+        identity map и без description. Для списков/досок, где нужны только «плоские» данные.
+        fields / include — sparse fieldset (loaders.task_projection): только эти колонки и связи.
+        """
+        n = clamp_limit(limit)
+        stmt = _apply_filters(
+            join_includes(select(*task_projection(profile, fields, include)), include),
+            status=status,
+            assignee_id=assignee_id,
+            process_id=process_id,
+            type_id=type_id,
+            field_filters=field_filters,
+            dialect=self.session.get_bind().dialect.name,
+        )
+        async with self._guard():
+            res = await self._await_timeout(self.session.execute(_paginate(stmt, n, cursor)))
+            rows = list(res.mappings().all())
+        return _cut_page(rows, n)
+
+    async def range_page_rows(
+        self,
+        start: datetime,
+        end: datetime,
+        *,
+        status: str | None = None,
+        assignee_id: int | None = None,
+        process_id: int | None = None,
+        type_id: int | None = None,
+        limit: int | None = None,
+        cursor: str | None = None,
+        fields: Sequence[str] | None = None,
+        include: Sequence[str] = (),
+    ) -> tuple[list[RowMapping], Optional[str]]:
+        """
+        Задачи, чей интервал [start_at, due_at] пересекается с [start, end] (границы включительно),
+        ORDER BY конец интервала, id — для календаря и ганта.
+        Диапазон по ix_tasks_span / ix_tasks_process_span; на Postgres ещё и && по GiST.
+        ValueError — если start > end.
+        """
+        if start > end:
+            raise ValueError("'from' must not be later than 'to'")
+        n = clamp_limit(limit)
+        stmt = _apply_filters(
+            join_includes(select(*task_projection("list", fields, include)), include),
+            status=status,
+            assignee_id=assignee_id,
+            process_id=process_id,
+            type_id=type_id,
+        ).where(TASK_SPAN_END >= start, TASK_SPAN_START <= end)
+        if self.session.get_bind().dialect.name == "postgresql":
+            # то же выражение, что у ix_tasks_span_gist — иначе индекс не подхватится
+            span = func.tstzrange(TASK_SPAN_START, TASK_SPAN_END, text("'[]'"))
+            window = func.tstzrange(literal(start, UTCDateTime), literal(end, UTCDateTime), text("'[]'"))
+            stmt = stmt.where(TASK_SPAN_END.isnot(None), span.op("&&")(window))
+        if cursor:
+            keys, last_id = decode_cursor(cursor)
+            stmt = stmt.where(seek_after([TASK_SPAN_END], Task.id, keys, last_id, descending=False))
+        stmt = stmt.add_columns(TASK_SPAN_END.label("span_end")).order_by(TASK_SPAN_END, Task.id).limit(n + 1)
+        async with self._guard():
+            res = await self._await_timeout(self.session.execute(stmt))
+            rows = list(res.mappings().all())
+        if len(rows) <= n:
+            return rows, None
+        rows = rows[:n]
+        return rows, encode_cursor([rows[-1]["span_end"]], rows[-1]["id"])
+
+    async def facet_counts(
+        self,
+        *,
+        status: str | None = None,
+        assignee_id: int | None = None,
+        process_id: int | None = None,
+        type_id: int | None = None,
+        field_filters: Sequence[tuple[str, str, str]] = (),
+    ) -> dict[str, list[tuple[Any, int]]]:
+        """
+        Счётчики задач по каждому значению FACETS под текущим фильтром — одним запросом:
+        GROUP BY GROUPING SETS на Postgres, UNION ALL по GROUP BY каждого фасета на SQLite.
+        Возвращает {facet: [(value, count), ...]}, значения по убыванию count; NULL — отдельное значение.
+        """
+        dialect = self.session.get_bind().dialect.name
+        cols = [getattr(Task, f) for f in FACETS]
+
+        def filtered(*columns: Any) -> Select:
+            return _apply_filters(
+                select(*columns),
+                status=status,
+                assignee_id=assignee_id,
+                process_id=process_id,
+                type_id=type_id,
+                field_filters=field_filters,
+                dialect=dialect,
+            )
+
+        out: dict[str, list[tuple[Any, int]]] = {f: [] for f in FACETS}
+        if dialect == "postgresql":
+            # GROUPING(a, b, ...) — битовая маска: 1 у колонок, НЕ входящих в набор строки
+            stmt = filtered(*cols, func.grouping(*cols), func.count()).group_by(func.grouping_sets(*cols))
+            async with self._guard():
+                res = await self._await_timeout(self.session.execute(stmt))
+                rows = res.all()
+            width = len(FACETS)
+            for row in rows:
+                mask, n = row[width], int(row[width + 1])
+                for i, facet in enumerate(FACETS):
+                    if not mask & (1 << (width - 1 - i)):
+                        out[facet].append((row[i], n))
+                        break
+        else:
+            stmt = union_all(
+                *(
+                    filtered(literal(facet).label("facet"), col.label("value"), func.count().label("n")).group_by(col)
+                    for facet, col in zip(FACETS, cols)
+                )
+            )
+            async with self._guard():
+                res = await self._await_timeout(self.session.execute(stmt))
+                for facet, value, n in res.all():
+                    out[facet].append((value, int(n)))
+        for values in out.values():
+            values.sort(key=lambda vn: (-vn[1], vn[0] is None, str(vn[0])))
+        return out
+
+    async def rows_by_ids(self, ids: Sequence[int], *, profile: TaskProfile = "list") -> list[RowMapping]:
+        """Строки проекции профиля для заданных id — в том же порядке; отсутствующих id нет в ответе."""
+        if not ids:
+            return []
+        found: dict[int, RowMapping] = {}
+        async with self._guard():
+            for chunk in _chunks(list(ids)):
+                res = await self._await_timeout(
+                    self.session.execute(select(*task_columns(profile)).where(Task.id.in_(chunk)))
+                )
+                found.update((int(r["id"]), r) for r in res.mappings().all())
+        return [found[i] for i in ids if i in found]
+
+    async def stream_rows(
+        self,
+        *columns: Any,
+        status: str | None = None,
+        assignee_id: int | None = None,
+        process_id: int | None = None,
+        type_id: int | None = None,
+        field_filters: Sequence[tuple[str, str, str]] = (),
+        yield_per: int = WRITE_CHUNK,
+    ) -> AsyncIterator[RowMapping]:
+        """
+        Потоковое чтение задач (ORDER BY id) серверным курсором: в памяти держится
+        не больше yield_per строк, сколько бы их ни было в таблице.
+        Семафор не берём — экспорт держит соединение долго и не должен занимать слот.
+        """
+        stmt = _apply_filters(
+            select(*(columns or Task.__table__.c)),
+            status=status,
+            assignee_id=assignee_id,
+            process_id=process_id,
+            type_id=type_id,
+            field_filters=field_filters,
+            dialect=self.session.get_bind().dialect.name,
+        ).order_by(Task.id)
+        res = await self._await_timeout(
+            self.session.stream(stmt.execution_options(yield_per=yield_per))
+        )
+        async for row in res.mappings():
+            yield row
+
     async def create(
         self,
         title: str,
@@ -35,6 +392,8 @@ class TaskRepo(BaseRepo):
         type_id: int | None = None,
         assignee_id: int | None = None,
         fields: dict | None = None,
+        start_at: datetime | None = None,
+        due_at: datetime | None = None,
     ) -> Task:
         async with self._guard():
             item = Task(
@@ -45,6 +404,8 @@ class TaskRepo(BaseRepo):
                 type_id=type_id,
                 assignee_id=assignee_id,
                 fields=fields or {},
+                start_at=start_at,
+                due_at=due_at,
             )
             self.session.add(item)
             await self._await_timeout(self.session.flush())
@@ -72,29 +433,128 @@ class TaskRepo(BaseRepo):
 
     async def update_fields(self, task_id: int, fields: dict, *, replace: bool = False) -> int:
         """
-        Обновление произвольных полей задачи.
-        replace=False → merge (поверх существующих), True → полная замена.
+        Обновление произвольных полей задачи одним UPDATE.
+        replace=False → поверхностный merge в БД (db.types.json_merge), True → полная замена.
         """
+        value = fields if replace else json_merge(Task.fields, fields or {})
         async with self._guard():
-            if replace:
-                values = {"fields": fields}
-            else:
-                # merge на стороне Python (без JSONB ops для кросс-диалектности)
-                task = await self.get_by_id(task_id)
-                if not task:
-                    return 0
-                merged = dict(task.fields or {})
-                merged.update(fields or {})
-                values = {"fields": merged}
-
             res = await self._await_timeout(
                 self.session.execute(
-                    update(Task).where(Task.id == task_id).values(**values).returning(Task.id)
+                    update(Task).where(Task.id == task_id).values(fields=value).returning(Task.id)
                 )
             )
             row = res.first()
             return int(row[0]) if row else 0
 
+    async def update_fields_many(self, patches: Iterable[tuple[int, dict]]) -> int:
+        """
+        Пакетный merge полей: один подготовленный UPDATE ... WHERE id = :id,
+        исполняемый executemany по всем (task_id, patch). Патчи одной задачи
+        применяются по порядку. Возвращает число обновлённых строк.
+        """
+        params = [{"b_id": int(tid), "b_patch": patch or {}} for tid, patch in patches]
+        if not params:
+            return 0
+        tbl = Task.__table__
+        stmt = (
+            update(tbl)
+            .where(tbl.c.id == bindparam("b_id"))
+            .values(fields=json_merge(tbl.c.fields, bindparam("b_patch", type_=JSON_AUTO)), updated_at=utcnow())
+        )
+        total = 0
+        async with self._guard():
+            for chunk in _chunks(params, WRITE_CHUNK):
+                res = await self._await_timeout(self.session.execute(stmt, chunk))
+                total += max(res.rowcount or 0, 0)
+        return total
+
+    # ---- batch ----
+
+    async def create_many(self, rows: Sequence[dict]) -> list[int]:
+        """
+        Многострочный INSERT ... VALUES (...), (...) RETURNING id
+        (SQLAlchemy "insertmanyvalues"). Возвращает id в порядке входных строк.
+        """
+        if not rows:
+            return []
+        values = [
+            {
+                "title": r["title"],
+                "description": r.get("description"),
+                "status": r.get("status") or "open",
+                "process_id": r.get("process_id"),
+                "type_id": r.get("type_id"),
+                "assignee_id": r.get("assignee_id"),
+                "fields": r.get("fields") or {},
+                "start_at": r.get("start_at"),
+                "due_at": r.get("due_at"),
+            }
+            for r in rows
+        ]
+        # На SQLite sort_by_parameter_order откатывается в построчный INSERT.
+        # Там он и не нужен: rowid внутри одного INSERT выдаются по порядку VALUES,
+        # поэтому достаточно отсортировать вернувшиеся id.
+        is_sqlite = self.session.get_bind().dialect.name == "sqlite"
+        stmt = insert(Task).returning(Task.id, sort_by_parameter_order=not is_sqlite)
+        ids: list[int] = []
+        async with self._guard():
+            # пачками, чтобы таймаут db_query_timeout относился к одному statement, а не ко всей загрузке
+            for chunk in _chunks(values, WRITE_CHUNK):
+                res = await self._await_timeout(self.session.execute(stmt, chunk))
+                chunk_ids = [int(x) for x in res.scalars().all()]
+                ids.extend(sorted(chunk_ids) if is_sqlite else chunk_ids)
+        return ids
+
+    async def existing_ids(self, ids: Iterable[int]) -> set[int]:
+        """Какие из переданных id существуют (пачками по ID_CHUNK)."""
+        uniq = sorted({int(i) for i in ids})
+        out: set[int] = set()
+        async with self._guard():
+            for chunk in _chunks(uniq):
+                res = await self._await_timeout(self.session.execute(select(Task.id).where(Task.id.in_(chunk))))
+                out.update(int(x) for x in res.scalars().all())
+        return out
+
+    async def spans_by_ids(self, ids: Iterable[int]) -> dict[int, tuple[Optional[datetime], Optional[datetime]]]:
+        """{id: (start_at, due_at)} существующих задач (пачками по ID_CHUNK); нет id — нет задачи."""
+        uniq = sorted({int(i) for i in ids})
+        out: dict[int, tuple[Optional[datetime], Optional[datetime]]] = {}
+        async with self._guard():
+            for chunk in _chunks(uniq):
+                res = await self._await_timeout(
+                    self.session.execute(select(Task.id, Task.start_at, Task.due_at).where(Task.id.in_(chunk)))
+                )
+                out.update({int(r.id): (r.start_at, r.due_at) for r in res})
+        return out
+
+    async def update_many(self, rows: Sequence[dict]) -> None:
+        """
+        ORM bulk UPDATE по первичному ключу: executemany, сгруппированный
+        по набору колонок. Каждая строка — {"id": ..., <колонка>: ...}.
+        """
+        if not rows:
+            return
+        now = utcnow()
+        values = [
+            {"id": int(r["id"]), "updated_at": now, **{k: v for k, v in r.items() if k in _WRITABLE}}
+            for r in rows
+        ]
+        async with self._guard():
+            for chunk in _chunks(values, WRITE_CHUNK):
+                await self._await_timeout(self.session.execute(update(Task), chunk))
+
+    async def remove_many(self, ids: Iterable[int]) -> set[int]:
+        """DELETE ... WHERE id IN (...) пачками; возвращает реально удалённые id."""
+        uniq = sorted({int(i) for i in ids})
+        removed: set[int] = set()
+        async with self._guard():
+            for chunk in _chunks(uniq):
+                res = await self._await_timeout(
+                    self.session.execute(delete(Task).where(Task.id.in_(chunk)).returning(Task.id))
+                )
+                removed.update(int(x) for x in res.scalars().all())
+        return removed
+
     async def remove(self, task_id: int) -> int:
         async with self._guard():
             res = await self._await_timeout(
@@ -102,3 +562,191 @@ class TaskRepo(BaseRepo):
             )
             row = res.first()
             return int(row[0]) if row else 0
+
+    # ---- board ----
+
+    async def board_columns(
+        self,
+        *,
+        type_id: int | None,
+        statuses: Sequence[str],
+        limit: int | None = None,
+        cursors: Mapping[str, str] | None = None,
+        assignee_id: int | None = None,
+        process_id: int | None = None,
+        fields: Sequence[str] | None = None,
+        include: Sequence[str] = (),
+    ) -> dict[str, tuple[list[RowMapping], Optional[str]]]:
+        """
+        Колонки доски одним запросом: UNION ALL по статусам, в каждой ветке —
+        свой keyset-срез ORDER BY rank, id LIMIT n+1 по индексу ix_tasks_board.
+        cursors — {status: cursor} для догрузки отдельных колонок.
+        fields / include — sparse fieldset карточки (id, status, rank выбираются всегда).
+        """
+        if not statuses:
+            return {}
+        n = clamp_limit(limit)
+        cursors = cursors or {}
+        branches = []
+        for st in statuses:
+            stmt = _apply_filters(
+                join_includes(select(*task_projection("board", fields, include)), include).where(_board_column(type_id)),
+                status=st,
+                assignee_id=assignee_id,
+                process_id=process_id,
+            )
+            if cursors.get(st):
+                keys, last_id = decode_cursor(cursors[st])
+                stmt = stmt.where(seek_after([Task.rank], Task.id, keys, last_id, descending=False))
+            branches.append(select(stmt.order_by(Task.rank, Task.id).limit(n + 1).subquery()))
+        async with self._guard():
+            res = await self._await_timeout(self.session.execute(union_all(*branches)))
+            rows = list(res.mappings().all())
+
+        out: dict[str, tuple[list[RowMapping], Optional[str]]] = {}
+        for st in statuses:
+            col = [r for r in rows if r["status"] == st]
+            if len(col) > n:
+                col = col[:n]
+                out[st] = (col, encode_cursor([col[-1]["rank"]], col[-1]["id"]))
+            else:
+                out[st] = (col, None)
+        return out
+
+    async def board_counts(
+        self,
+        *,
+        type_id: int | None,
+        statuses: Sequence[str],
+        assignee_id: int | None = None,
+        process_id: int | None = None,
+    ) -> dict[str, int]:
+        stmt = _apply_filters(
+            select(Task.status, func.count()).where(_board_column(type_id), Task.status.in_(list(statuses))),
+            assignee_id=assignee_id,
+            process_id=process_id,
+        ).group_by(Task.status)
+        async with self._guard():
+            res = await self._await_timeout(self.session.execute(stmt))
+            return {st: int(c) for st, c in res.all()}
+
+    async def board_statuses(self, type_id: int | None) -> list[str]:
+        """Статусы, которые реально встречаются на доске (для типов без списка statuses)."""
+        async with self._guard():
+            res = await self._await_timeout(
+                self.session.execute(
+                    select(Task.status).where(_board_column(type_id)).distinct().order_by(Task.status)
+                )
+            )
+            return [str(x) for x in res.scalars().all()]
+
+    async def _neighbour(self, type_id, status, task_id, rank: str, ref_id: int, *, after: bool) -> Optional[str]:
+        """Ранг соседа карточки ref (следующей при after=True, иначе предыдущей) в колонке без task_id."""
+        if after:
+            cond = or_(Task.rank > rank, and_(Task.rank == rank, Task.id > ref_id))
+            order = (Task.rank.asc(), Task.id.asc())
+        else:
+            cond = or_(Task.rank < rank, and_(Task.rank == rank, Task.id < ref_id))
+            order = (Task.rank.desc(), Task.id.desc())
+        stmt = (
+            select(Task.rank)
+            .where(_board_column(type_id), Task.status == status, Task.id != task_id, cond)
+            .order_by(*order)
+            .limit(1)
+        )
+        res = await self._await_timeout(self.session.execute(stmt))
+        return res.scalar()
+
+    async def _edge(self, type_id, status, task_id, *, last: bool) -> Optional[str]:
+        stmt = select(Task.rank).where(_board_column(type_id), Task.status == status, Task.id != task_id)
+        stmt = stmt.order_by(Task.rank.desc(), Task.id.desc()) if last else stmt.order_by(Task.rank, Task.id)
+        res = await self._await_timeout(self.session.execute(stmt.limit(1)))
+        return res.scalar()
+
+    async def move(
+        self,
+        task_id: int,
+        *,
+        status: str | None = None,
+        after_id: int | None = None,
+        before_id: int | None = None,
+    ) -> Optional[tuple[str, str, int | None]]:
+        """
+        Переставить карточку: в колонку status (по умолчанию — текущую) после after_id
+        или перед before_id (без обоих — в конец колонки). Один UPDATE строки задачи:
+        новый ранг — строго между рангами соседей.
+        Возвращает (status, rank, type_id) или None, если задачи нет;
+        ValueError — сосед из другой колонки/доски или не найден.
+        """
+        async with self._guard():
+            res = await self._await_timeout(
+                self.session.execute(select(Task.type_id, Task.status).where(Task.id == task_id))
+            )
+            cur = res.first()
+            if cur is None:
+                return None
+            type_id, target = cur[0], status or cur[1]
+
+            for attempt in range(2):
+                ref_id = after_id if after_id is not None else before_id
+                if ref_id is not None:
+                    if ref_id == task_id:
+                        raise ValueError("cannot move a card relative to itself")
+                    res = await self._await_timeout(
+                        self.session.execute(
+                            select(Task.rank).where(
+                                Task.id == ref_id, _board_column(type_id), Task.status == target
+                            )
+                        )
+                    )
+                    ref = res.first()
+                    if ref is None:
+                        raise ValueError(f"task {ref_id} is not in column '{target}' of this board")
+                    if after_id is not None:
+                        lo, hi = ref[0], await self._neighbour(type_id, target, task_id, ref[0], ref_id, after=True)
+                    else:
+                        lo, hi = await self._neighbour(type_id, target, task_id, ref[0], ref_id, after=False), ref[0]
+                else:
+                    lo, hi = await self._edge(type_id, target, task_id, last=True), None
+                try:
+                    rank = rank_between(lo, hi)
+                    if len(rank) <= RANK_MAX_LEN:
+                        break
+                    if attempt:
+                        raise ValueError("rank is too long even after rebalancing")
+                except (ValueError, KeyError, TypeError):
+                    # одинаковые/пустые ранги соседей — раскладываем колонку заново и повторяем
+                    if attempt:
+                        raise
+                # фоновая раскладка не успела, а ранг упёрся в длину колонки — раскладываем сразу
+                await self._rebalance(type_id, target)
+
+            await self._await_timeout(
+                self.session.execute(
+                    update(Task).where(Task.id == task_id).values(status=target, rank=rank, updated_at=utcnow())
+                )
+            )
+        return target, rank, type_id
+
+    async def _rebalance(self, type_id: int | None, status: str) -> int:
+        # FOR UPDATE — на Postgres параллельный move ждёт конца раскладки; SQLite его не рендерит
+        res = await self._await_timeout(
+            self.session.execute(
+                select(Task.id)
+                .where(_board_column(type_id), Task.status == status)
+                .order_by(Task.rank.is_(None), Task.rank, Task.id)
+                .with_for_update()
+            )
+        )
+        ids = [int(x) for x in res.scalars().all()]
+        params = [{"b_id": i, "b_rank": r} for i, r in zip(ids, spread_ranks(len(ids)))]
+        tbl = Task.__table__
+        stmt = update(tbl).where(tbl.c.id == bindparam("b_id")).values(rank=bindparam("b_rank"))
+        for chunk in _chunks(params, WRITE_CHUNK):
+            await self._await_timeout(self.session.execute(stmt, chunk))
+        return len(ids)
+
+    async def rebalance_column(self, type_id: int | None, status: str) -> int:
+        """Равномерно переразложить ранги колонки, сохранив порядок (updated_at не трогаем)."""
+        async with self._guard():
+            return await self._rebalance(type_id, status)
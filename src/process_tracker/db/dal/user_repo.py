@@ -6,6 +6,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .base import BaseRepo
+from ..entity_cache import UserDTO
 from ..models import User
 
 
@@ -18,6 +19,9 @@ class UserRepo(BaseRepo):
             res = await self._await_timeout(self.session.execute(select(User).where(User.id == user_id)))
             return res.scalars().first()
 
+    async def get_dto(self, user_id: int) -> Optional[UserDTO]:
+        return await self._get_dto("users", user_id)
+
     async def get_by_email(self, email: str) -> Optional[User]:
         async with self._guard():
             res = await self._await_timeout(self.session.execute(select(User).where(User.email == email)))
@@ -0,0 +1,197 @@
+from __future__ import annotations
+"""
+Компиляция спецификации сохранённого представления (SavedView.query) в statement.
+
+Полная форма:
+  {
+    "where":    [{"field": "status", "op": "in", "value": ["open", "review"]},
+                 {"field": "fields.priority", "op": "eq", "value": "P1"}],
+    "sort":     {"field": "updated_at", "dir": "desc"},
+    "group_by": "status"
+  }
+Упрощённая форма тоже понимается: {"status": "open", "assignee_id": [1, 2]} —
+равенство / IN по фильтруемым колонкам.
+
+compile_view() делает это один раз на (view, version): получается Select с фильтрами
+и ORDER BY (group, sort, id) без курсора/LIMIT. На каждую страницу к нему
+добавляется только seek-предикат и LIMIT — keyset, как у ленты задач.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import ColumnElement
+
+from .keyset import decode_cursor, encode_cursor, seek_after
+from .loaders import task_columns
+from ..field_indexes import FILTER_OPS, field_predicate
+from ..models import Process, Task
+
+VIEW_OPS = ("eq", "ne", "in", "nin", "lt", "lte", "gt", "gte", "contains", "isnull")
+
+
+@dataclass(frozen=True)
+class _Resource:
+    columns: tuple
+    id_col: Any
+    filterable: Mapping[str, Any]
+    sortable: Mapping[str, Any]
+    groupable: Mapping[str, Any]
+    default_sort: tuple[str, str]
+
+
+_RESOURCES: dict[str, _Resource] = {
+    "tasks": _Resource(
+        columns=task_columns("list"),
+        id_col=Task.id,
+        filterable={
+            "id": Task.id, "title": Task.title, "status": Task.status,
+            "assignee_id": Task.assignee_id, "process_id": Task.process_id, "type_id": Task.type_id,
+        },
+        # created_at ставится сервером с точностью до секунды — для стабильного курсора
+        # сортируем по id, он монотонен по времени создания
+        sortable={"updated_at": Task.updated_at, "created_at": Task.id, "id": Task.id,
+                  "title": Task.title, "status": Task.status},
+        # NULL ломает сравнение в seek-предикате — «без значения» сводим к 0 (id ≥ 1)
+        groupable={"status": Task.status, "assignee_id": func.coalesce(Task.assignee_id, 0),
+                   "process_id": func.coalesce(Task.process_id, 0), "type_id": func.coalesce(Task.type_id, 0)},
+        default_sort=("updated_at", "desc"),
+    ),
+    "processes": _Resource(
+        columns=(Process.id, Process.name, Process.description, Process.status),
+        id_col=Process.id,
+        filterable={"id": Process.id, "name": Process.name, "status": Process.status},
+        sortable={"created_at": Process.id, "id": Process.id, "name": Process.name, "status": Process.status},
+        groupable={"status": Process.status},
+        default_sort=("id", "desc"),
+    ),
+}
+
+
+@dataclass(frozen=True)
+class CompiledView:
+    resource: str
+    stmt: Select                      # фильтры + ORDER BY, без курсора и LIMIT
+    key_cols: tuple                   # (group?, sort) — ключ курсора
+    directions: tuple[bool, ...]      # DESC на каждую колонку key_cols
+    id_col: Any
+    group_by: Optional[str]
+
+    def page(self, limit: int, cursor: Optional[str]) -> Select:
+        stmt = self.stmt
+        if cursor:
+            keys, last_id = decode_cursor(cursor)
+            if len(keys) != len(self.key_cols):
+                raise ValueError("cursor does not match this view")
+            stmt = stmt.where(seek_after(self.key_cols, self.id_col, keys, last_id, descending=self.directions))
+        return stmt.limit(limit + 1)
+
+    def cut(self, rows: Sequence[RowMapping], limit: int) -> tuple[list[dict[str, Any]], Optional[str]]:
+        items = [dict(r) for r in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = encode_cursor([last[f"_k{i}"] for i in range(len(self.key_cols))], last["id"])
+        for it in items:
+            for i in range(len(self.key_cols)):
+                it.pop(f"_k{i}", None)
+        return items, next_cursor
+
+
+def _where_items(query: Mapping[str, Any], res: _Resource) -> list[dict[str, Any]]:
+    if "where" in query:
+        where = query["where"]
+        if not isinstance(where, list):
+            raise ValueError("'where' must be a list")
+        return where
+    # упрощённая форма: {колонка: значение | [значения]}
+    out = []
+    for k, v in query.items():
+        if k in ("sort", "group_by"):
+            continue
+        if k not in res.filterable:
+            raise ValueError(f"unknown filter '{k}'")
+        out.append({"field": k, "op": "in" if isinstance(v, list) else "eq", "value": v})
+    return out
+
+
+def _predicate(item: Mapping[str, Any], res: _Resource, dialect: str) -> ColumnElement[bool]:
+    field, op, value = item.get("field"), item.get("op", "eq"), item.get("value")
+    if op not in VIEW_OPS:
+        raise ValueError(f"unsupported op '{op}'")
+    if isinstance(field, str) and field.startswith("fields.") and res is _RESOURCES["tasks"]:
+        # кастомные поля — тем же выражением, что и индексы ix_tasks_fx_*
+        if op not in FILTER_OPS:
+            raise ValueError(f"op '{op}' is not supported for custom fields")
+        return field_predicate(dialect, field[len("fields."):], op, str(value))
+    col = res.filterable.get(field)
+    if col is None:
+        raise ValueError(f"unknown filter field '{field}'")
+    if op == "isnull":
+        return col.is_(None) if value in (True, None, 1, "true") else col.is_not(None)
+    if op in ("in", "nin"):
+        if not isinstance(value, list):
+            raise ValueError(f"'{op}' expects a list")
+        return col.in_(value) if op == "in" else col.not_in(value)
+    if op == "contains":
+        return col.ilike(f"%{value}%")
+    return {
+        "eq": col == value, "ne": col != value,
+        "lt": col < value, "lte": col <= value, "gt": col > value, "gte": col >= value,
+    }[op]
+
+
+def compile_view(resource: str, query: Mapping[str, Any] | None, dialect: str = "sqlite") -> CompiledView:
+    """Спецификация → CompiledView. ValueError — спецификация некорректна."""
+    res = _RESOURCES.get(resource)
+    if res is None:
+        raise ValueError(f"unknown resource '{resource}'")
+    query = dict(query or {})
+
+    sort = query.get("sort") or {}
+    if isinstance(sort, str):
+        sort = {"field": sort.lstrip("-"), "dir": "desc" if sort.startswith("-") else "asc"}
+    sort_field = sort.get("field", res.default_sort[0])
+    sort_desc = str(sort.get("dir", res.default_sort[1])).lower() == "desc"
+    if sort_field not in res.sortable:
+        raise ValueError(f"cannot sort by '{sort_field}'")
+
+    group_by = query.get("group_by")
+    if group_by is not None and group_by not in res.groupable:
+        raise ValueError(f"cannot group by '{group_by}'")
+
+    key_cols: list[Any] = []
+    directions: list[bool] = []
+    if group_by:
+        key_cols.append(res.groupable[group_by])
+        directions.append(False)  # группы — по возрастанию, внутри — как задано sort
+    sort_col = res.sortable[sort_field]
+    if sort_col is not res.id_col:
+        key_cols.append(sort_col)
+        directions.append(sort_desc)
+
+    stmt = select(*res.columns, *(c.label(f"_k{i}") for i, c in enumerate(key_cols)))
+    for item in _where_items(query, res):
+        if not isinstance(item, Mapping):
+            raise ValueError("filter must be an object")
+        stmt = stmt.where(_predicate(item, res, dialect))
+
+    id_desc = directions[-1] if directions else sort_desc
+    order = [c.desc() if d else c.asc() for c, d in zip(key_cols, directions)]
+    order.append(res.id_col.desc() if id_desc else res.id_col.asc())
+    stmt = stmt.order_by(*order)
+
+    return CompiledView(
+        resource=resource,
+        stmt=stmt,
+        key_cols=tuple(key_cols),
+        directions=tuple(directions) + (id_desc,) if key_cols else (id_desc,),
+        id_col=res.id_col,
+        group_by=group_by,
+    )
+
+
+__all__ = ["VIEW_OPS", "CompiledView", "compile_view"]
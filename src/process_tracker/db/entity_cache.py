@@ -0,0 +1,342 @@
+from __future__ import annotations
+"""
+Кэш сущностей по id: неизменяемые DTO задач, процессов, типов задач и пользователей.
+
+Горячие чтения «одна сущность по id» (карточка задачи в UI, воркфлоу, вебхуки)
+берут DTO из ограниченного LRU с TTL (settings.entity_cache_size / entity_cache_ttl).
+Версия строки — updated_at: get(..., version=v) промахивается, если в кэше другая версия.
+
+Инвалидация — со стороны записи, без участия вызывающего кода:
+- do_orm_execute: UPDATE/DELETE через session.execute — id берутся из WHERE id = / id IN
+  или из параметров executemany; не удалось определить id — сбрасывается весь вид
+- after_flush: изменённые/удалённые ORM-объекты
+- after_commit: то же ещё раз — чтение, начатое до коммита, не вернёт в кэш старую строку
+- DELETE процесса / типа / пользователя обнуляет ссылки в tasks (ON DELETE SET NULL)
+  в обход ORM — поэтому сбрасывает и задачи
+
+Гонка «прочитал старое → запись инвалидировала → положил старое» закрыта токенами:
+read_token() — момент начала транзакции читающей сессии (её снимок не старше),
+put() отклоняется, если id инвалидировали позже. Сессия с незакоммиченными
+правками вида в кэш его не кладёт.
+Запись в обход SQLAlchemy (другой процесс, сырой SQL без сессии) видна не позже TTL.
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Hashable, Iterable, Mapping, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList
+
+from ..core.config import settings
+from .models import Process, Task, TaskType, User
+
+
+# ───────────────────────── DTO ─────────────────────────
+
+@dataclass(frozen=True, slots=True)
+class TaskDTO:
+    id: int
+    title: str
+    description: Optional[str]
+    status: str
+    assignee_id: Optional[int]
+    process_id: Optional[int]
+    type_id: Optional[int]
+    fields: Mapping[str, Any]  # MappingProxyType — верхний уровень только для чтения
+    start_at: Optional[datetime]
+    due_at: Optional[datetime]
+    version: Optional[datetime]
+
+    @classmethod
+    def from_row(cls, r: Any) -> "TaskDTO":
+        return cls(
+            id=r.id, title=r.title, description=r.description, status=r.status,
+            assignee_id=r.assignee_id, process_id=r.process_id, type_id=r.type_id,
+            fields=MappingProxyType(dict(r.fields or {})),
+            start_at=r.start_at, due_at=r.due_at, version=r.updated_at,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ProcessDTO:
+    id: int
+    name: str
+    description: Optional[str]
+    status: str
+    version: Optional[datetime]
+
+    @classmethod
+    def from_row(cls, r: Any) -> "ProcessDTO":
+        return cls(id=r.id, name=r.name, description=r.description, status=r.status, version=r.updated_at)
+
+
+@dataclass(frozen=True, slots=True)
+class TaskTypeDTO:
+    id: int
+    key: str
+    title: str
+    version: Optional[datetime]
+
+    @classmethod
+    def from_row(cls, r: Any) -> "TaskTypeDTO":
+        return cls(id=r.id, key=r.key, title=r.title, version=r.updated_at)
+
+
+@dataclass(frozen=True, slots=True)
+class UserDTO:
+    id: int
+    email: str
+    display_name: Optional[str]
+    version: Optional[datetime]
+
+    @classmethod
+    def from_row(cls, r: Any) -> "UserDTO":
+        return cls(id=r.id, email=r.email, display_name=r.display_name, version=r.updated_at)
+
+
+# вид кэша = имя таблицы → (класс DTO, колонки выборки; первая — id)
+DTO_SOURCES: dict[str, tuple[type, tuple]] = {
+    "tasks": (TaskDTO, (
+        Task.id, Task.title, Task.description, Task.status, Task.assignee_id, Task.process_id,
+        Task.type_id, Task.fields, Task.start_at, Task.due_at, Task.updated_at,
+    )),
+    "processes": (ProcessDTO, (Process.id, Process.name, Process.description, Process.status, Process.updated_at)),
+    "task_types": (TaskTypeDTO, (TaskType.id, TaskType.key, TaskType.title, TaskType.updated_at)),
+    "users": (UserDTO, (User.id, User.email, User.display_name, User.updated_at)),
+}
+KINDS: tuple[str, ...] = tuple(DTO_SOURCES)
+# удаление строки этих таблиц обнуляет FK в tasks на стороне БД
+_SET_NULL_PARENTS = {"processes", "task_types", "users"}
+
+
+# ───────────────────────── кэш ─────────────────────────
+
+class EntityCache:
+    TOMBSTONES_PER_ENTRY = 4  # сколько последних инвалидаций помним на одно место в кэше
+
+    def __init__(self, size: int, ttl: Optional[float]) -> None:
+        self.size = max(0, int(size))
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._seq = 0
+        # (kind, id) → seq последней инвалидации; ограничен, вытесненное поднимает _floor
+        self._tombs: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._floor = 0
+        self._kind_floor: dict[str, int] = {}
+        self.hits = self.misses = self.puts = self.stale_puts = self.invalidations = self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def token(self) -> int:
+        """Снимок «момента чтения» — берётся до запроса в БД и передаётся в put()."""
+        return self._seq
+
+    def get(self, kind: str, entity_id: int, version: Any = None) -> Any:
+        key = (kind, entity_id)
+        hit = self._data.get(key)
+        if hit is not None:
+            ts, dto = hit
+            if self.ttl is not None and time.monotonic() - ts > self.ttl:
+                del self._data[key]
+            elif version is not None and dto.version != version:
+                del self._data[key]
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return dto
+        self.misses += 1
+        return None
+
+    def put(self, kind: str, entity_id: int, dto: Any, token: int) -> bool:
+        """Положить DTO, прочитанный после token(); False — за это время id инвалидировали."""
+        if not self.enabled:
+            return False
+        key = (kind, entity_id)
+        last = self._tombs.get(key)
+        if (last if last is not None else self._floor) > token or self._kind_floor.get(kind, 0) > token:
+            self.stale_puts += 1
+            return False
+        self._data[key] = (time.monotonic(), dto)
+        self._data.move_to_end(key)
+        self.puts += 1
+        while len(self._data) > self.size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def invalidate(self, kind: str, ids: Iterable[int]) -> None:
+        limit = max(self.size, 1) * self.TOMBSTONES_PER_ENTRY
+        for entity_id in ids:
+            self._seq += 1
+            key = (kind, entity_id)
+            self._data.pop(key, None)
+            self._tombs[key] = self._seq
+            self._tombs.move_to_end(key)
+            self.invalidations += 1
+        while len(self._tombs) > limit:
+            _, seq = self._tombs.popitem(last=False)
+            self._floor = max(self._floor, seq)
+
+    def invalidate_kind(self, kind: str) -> None:
+        self._seq += 1
+        self._kind_floor[kind] = self._seq
+        for key in [k for k in self._data if k[0] == kind]:
+            del self._data[key]
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        for kind in KINDS:
+            self.invalidate_kind(kind)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "capacity": self.size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "puts": self.puts,
+            "stale_puts": self.stale_puts,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
+
+
+entity_cache = EntityCache(settings.entity_cache_size, settings.entity_cache_ttl)
+
+
+# ───────────────────────── хуки записи ─────────────────────────
+
+_PENDING = "entity_cache_pending"  # session.info: {kind: set(id) | None} — до коммита
+_TOKEN = "entity_cache_token"      # session.info: token() на начало транзакции
+
+
+def read_token(session: Any, kind: str) -> Optional[int]:
+    """Токен для put() после чтения в этой сессии; None — класть в кэш нельзя (свои незакоммиченные правки)."""
+    info = session.info
+    if kind in info.get(_PENDING, {}):
+        return None
+    if session.in_transaction() and _TOKEN in info:
+        return info[_TOKEN]
+    return entity_cache.token()
+
+
+def _bind_values(bp: BindParameter, params: Any) -> Optional[list[Any]]:
+    rows = params if isinstance(params, list) else [params] if isinstance(params, dict) else []
+    if rows and any(bp.key in r for r in rows):
+        out: list[Any] = []
+        for r in rows:
+            v = r.get(bp.key)
+            out.extend(v if isinstance(v, (list, tuple, set)) else [v])
+        return out
+    if bp.callable is not None:
+        return None
+    v = bp.value
+    return list(v) if isinstance(v, (list, tuple, set)) else [v]
+
+
+def _ids_from_where(clause: Any, params: Any) -> Optional[set[int]]:
+    """id из `id = :x` / `id IN (...)` в WHERE (в том числе внутри AND); None — не определить."""
+    if isinstance(clause, BooleanClauseList) and clause.operator is operators.and_:
+        for sub in clause.clauses:
+            got = _ids_from_where(sub, params)
+            if got is not None:
+                return got
+        return None
+    if (
+        isinstance(clause, BinaryExpression)
+        and getattr(clause.left, "key", None) == "id"
+        and clause.operator in (operators.eq, operators.in_op)
+        and isinstance(clause.right, BindParameter)
+    ):
+        values = _bind_values(clause.right, params)
+        if values is not None and all(isinstance(v, int) for v in values):
+            return set(values)
+    return None
+
+
+def _mark(session: Session, kind: str, ids: Optional[Iterable[int]]) -> None:
+    """Инвалидировать сейчас и запомнить до коммита (ids=None — весь вид)."""
+    pending = session.info.setdefault(_PENDING, {})
+    if ids is None:
+        entity_cache.invalidate_kind(kind)
+        pending[kind] = None
+        return
+    ids = set(ids)
+    entity_cache.invalidate(kind, ids)
+    if pending.get(kind, set()) is not None:
+        pending.setdefault(kind, set()).update(ids)
+
+
+@event.listens_for(Session, "after_begin")
+def _on_begin(session: Session, _tx, _conn) -> None:
+    session.info[_TOKEN] = entity_cache.token()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_execute(state) -> None:
+    if not (state.is_update or state.is_delete):
+        return
+    table = getattr(state.statement, "table", None)
+    kind = getattr(table, "name", None)
+    if kind not in KINDS:
+        return
+    params = state.parameters
+    ids = _ids_from_where(state.statement.whereclause, params)
+    if ids is None and state.statement.whereclause is None and isinstance(params, list) and params and all("id" in p for p in params):
+        ids = {p["id"] for p in params}  # ORM bulk UPDATE по первичному ключу
+    _mark(state.session, kind, ids)
+    if state.is_delete and kind in _SET_NULL_PARENTS:
+        _mark(state.session, "tasks", None)
+
+
+@event.listens_for(Session, "after_flush")
+def _on_flush(session: Session, _ctx) -> None:
+    deleted_parent = False
+    for obj in list(session.dirty) + list(session.deleted):
+        kind = getattr(getattr(obj, "__table__", None), "name", None)
+        if kind in KINDS and getattr(obj, "id", None) is not None:
+            _mark(session, kind, [obj.id])
+            deleted_parent = deleted_parent or (obj in session.deleted and kind in _SET_NULL_PARENTS)
+    if deleted_parent:
+        _mark(session, "tasks", None)
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session: Session) -> None:
+    session.info.pop(_TOKEN, None)
+    for kind, ids in session.info.pop(_PENDING, {}).items():
+        if ids is None:
+            entity_cache.invalidate_kind(kind)
+        else:
+            entity_cache.invalidate(kind, ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_rollback(session: Session) -> None:
+    # данные в БД не поменялись; записи уже выброшены при execute/flush
+    session.info.pop(_TOKEN, None)
+    session.info.pop(_PENDING, None)
+
+
+__all__ = [
+    "TaskDTO",
+    "ProcessDTO",
+    "TaskTypeDTO",
+    "UserDTO",
+    "DTO_SOURCES",
+    "KINDS",
+    "EntityCache",
+    "entity_cache",
+    "read_token",
+]
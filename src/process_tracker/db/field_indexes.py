@@ -0,0 +1,294 @@
+from __future__ import annotations
+"""
+Индексы по кастомным ключам Task.fields, объявленные в TaskType.default_fields.
+
+Объявление — флаг `indexed` в описании поля:
+    default_fields = {
+        "priority": {"type": "string", "default": "P2", "indexed": true},
+        "due_at":   {"type": "datetime", "indexed": true},
+        "estimate": {"type": "number", "indexed": true},
+    }
+
+По объединению таких ключей из всех TaskType поддерживаются expression-индексы
+`ix_tasks_fx_<key>_<kind>` на tasks:
+  - SQLite:     json_extract(fields, '$.key'), для number — CAST(... AS REAL),
+                для date/datetime — julianday(...), чтобы сравнение было типизированным
+  - PostgreSQL: btree по (fields ->> 'key') с приведением типа + общий GIN (jsonb_path_ops)
+
+Фильтры ленты задач (`field_predicate`) строятся тем же `field_expr`, поэтому
+выражение в WHERE совпадает с выражением индекса и планировщик его подхватывает.
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Any, Mapping, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.sql.elements import ColumnElement
+
+from .models import Task, TaskType
+
+INDEX_PREFIX = "ix_tasks_fx_"
+GIN_INDEX = "ix_tasks_fields_gin"
+PG_TS_FUNC = "pt_json_ts"
+
+FIELD_KINDS = ("string", "number", "date", "datetime", "bool")
+FILTER_OPS = ("eq", "ne", "lt", "lte", "gt", "gte")
+
+# ключ уходит литералом в DDL/SQL (параметр в выражении индекса не сматчится) — только безопасные имена
+_KEY_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]{0,62}$")
+_KIND_ALIASES = {
+    "str": "string", "text": "string", "select": "string",
+    "int": "number", "integer": "number", "float": "number", "numeric": "number",
+    "boolean": "bool", "checkbox": "bool",
+}
+
+# key -> kind по всем TaskType; обновляется sync_field_indexes()
+_KINDS: dict[str, str] = {}
+
+
+@dataclass(frozen=True)
+class FieldIndexSpec:
+    key: str
+    kind: str
+
+    @property
+    def index_name(self) -> str:
+        return f"{INDEX_PREFIX}{self.key.lower()}_{self.kind}"
+
+
+def normalize_kind(kind: Optional[str]) -> str:
+    k = (kind or "string").strip().lower()
+    k = _KIND_ALIASES.get(k, k)
+    if k not in FIELD_KINDS:
+        raise ValueError(f"unsupported field type '{kind}'")
+    return k
+
+
+def validate_key(key: str) -> str:
+    if not _KEY_RE.match(key or ""):
+        raise ValueError(f"field key '{key}' cannot be indexed: use [A-Za-z0-9_], up to 63 chars")
+    return key
+
+
+def specs_from_default_fields(default_fields: Mapping[str, Any] | None) -> list[FieldIndexSpec]:
+    """Индексируемые ключи одного TaskType. ValueError — если объявление некорректно."""
+    out: list[FieldIndexSpec] = []
+    for key, spec in (default_fields or {}).items():
+        if isinstance(spec, Mapping) and spec.get("indexed"):
+            out.append(FieldIndexSpec(validate_key(key), normalize_kind(spec.get("type"))))
+    return out
+
+
+def kind_for(key: str) -> Optional[str]:
+    return _KINDS.get(key)
+
+
+# ───────────────────────── выражения ─────────────────────────
+
+def field_expr(dialect: str, key: str, kind: str, column: Any = None) -> ColumnElement:
+    """
+    Типизированное выражение значения fields[key].
+    column=None → неквалифицированная колонка `fields` (для DDL индекса).
+    """
+    validate_key(key)
+    col = column if column is not None else sa.column("fields")
+    if dialect == "postgresql":
+        raw = col.op("->>")(sa.literal_column(f"'{key}'"))
+        if kind == "number":
+            return sa.cast(raw, sa.Numeric)
+        if kind in ("date", "datetime"):
+            return sa.func.pt_json_ts(raw, type_=sa.DateTime(timezone=True))
+        if kind == "bool":
+            return sa.cast(raw, sa.Boolean)
+        return raw
+    # SQLite (json1) и совместимые
+    raw = sa.func.json_extract(col, sa.literal_column(f"'$.{key}'"))
+    if kind == "number":
+        return sa.cast(raw, sa.Float)
+    if kind in ("date", "datetime"):
+        return sa.func.julianday(raw, type_=sa.Float)
+    return raw
+
+
+def parse_datetime(raw: str) -> datetime:
+    try:
+        dt = datetime.fromisoformat(raw)
+    except ValueError:
+        dt = datetime.combine(date.fromisoformat(raw), datetime.min.time())
+    # без зоны трактуем как UTC — так же, как julianday() в SQLite
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def coerce_value(dialect: str, kind: str, raw: str) -> Any:
+    """Строка из query → значение того же типа, что и field_expr. ValueError при мусоре."""
+    if kind == "number":
+        return float(raw)
+    if kind in ("date", "datetime"):
+        dt = parse_datetime(raw)
+        if dialect == "postgresql":
+            return dt
+        # julian day number, как у julianday()
+        return dt.timestamp() / 86400.0 + 2440587.5
+    if kind == "bool":
+        val = raw.strip().lower() in ("1", "true", "yes", "on")
+        return val if dialect == "postgresql" else int(val)
+    return raw
+
+
+def field_predicate(dialect: str, key: str, op: str, raw: str) -> ColumnElement[bool]:
+    """
+    Условие для WHERE по fields[key]. Тип сравнения берётся из объявления в TaskType;
+    необъявленный ключ сравнивается как строка (без индекса).
+    """
+    if op not in FILTER_OPS:
+        raise ValueError(f"unsupported filter op '{op}'")
+    kind = kind_for(key) or "string"
+    expr = field_expr(dialect, key, kind, Task.fields)
+    val = coerce_value(dialect, kind, raw)
+    if op == "eq":
+        return expr == val
+    if op == "ne":
+        return expr != val
+    if op == "lt":
+        return expr < val
+    if op == "lte":
+        return expr <= val
+    if op == "gt":
+        return expr > val
+    return expr >= val
+
+
+# ───────────────────────── DDL / синхронизация ─────────────────────────
+
+def _compile(conn: AsyncConnection, expr: ColumnElement) -> str:
+    return str(expr.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+
+
+async def _existing_index_names(conn: AsyncConnection) -> set[str]:
+    if conn.dialect.name == "postgresql":
+        sql = "SELECT indexname FROM pg_indexes WHERE tablename = 'tasks'"
+    else:
+        sql = "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'tasks'"
+    res = await conn.execute(sa.text(sql))
+    return {str(r[0]) for r in res if str(r[0]).startswith(INDEX_PREFIX)}
+
+
+async def sync_field_indexes(conn: AsyncConnection) -> list[FieldIndexSpec]:
+    """
+    Привести набор ix_tasks_fx_* к объявлениям во всех TaskType:
+    создать недостающие, удалить устаревшие. Идемпотентно; вызывается
+    из init_db() и после изменения типов задач.
+    """
+    dialect = conn.dialect.name
+    rows = (await conn.execute(sa.select(TaskType.default_fields).order_by(TaskType.id))).scalars().all()
+
+    kinds: dict[str, str] = {}
+    wanted: dict[str, FieldIndexSpec] = {}
+    for default_fields in rows:
+        try:
+            specs = specs_from_default_fields(default_fields)
+        except ValueError:
+            continue  # некорректное объявление не должно валить старт
+        for spec in specs:
+            kinds.setdefault(spec.key, spec.kind)  # при конфликте типов побеждает более ранний TaskType
+            if kinds[spec.key] == spec.kind:
+                wanted[spec.index_name] = spec
+
+    if dialect == "postgresql":
+        # каст text → timestamptz не IMMUTABLE, а в индексе нужен immutable — оборачиваем
+        await conn.execute(sa.text(
+            f"CREATE OR REPLACE FUNCTION {PG_TS_FUNC}(text) RETURNS timestamptz "
+            "LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$ SELECT $1::timestamptz $$"
+        ))
+        await conn.execute(sa.text(
+            f"CREATE INDEX IF NOT EXISTS {GIN_INDEX} ON tasks USING gin (fields jsonb_path_ops)"
+        ))
+
+    existing = await _existing_index_names(conn)
+    for name in sorted(existing - set(wanted)):
+        await conn.execute(sa.text(f"DROP INDEX IF EXISTS {name}"))
+    for name, spec in sorted(wanted.items()):
+        if name in existing:
+            continue
+        expr = _compile(conn, field_expr(dialect, spec.key, spec.kind))
+        await conn.execute(sa.text(f"CREATE INDEX IF NOT EXISTS {name} ON tasks (({expr}))"))
+
+    _KINDS.clear()
+    _KINDS.update(kinds)
+    return list(wanted.values())
+
+
+async def backfill_due_dates(conn: AsyncConnection) -> int:
+    """
+    Перенести срок из fields.due_at (строка, как писали до появления колонки Task.due_at)
+    в типизированную колонку и убрать ключ из fields, чтобы не было двух расходящихся копий.
+    Непарсящиеся значения остаются в fields как есть. Возвращает число перенесённых задач.
+    """
+    dialect = conn.dialect.name
+    raw = field_expr(dialect, "due_at", "string", Task.fields)
+    rows = (await conn.execute(sa.select(Task.id, raw).where(Task.due_at.is_(None), raw.isnot(None)))).all()
+    params = []
+    for task_id, value in rows:
+        try:
+            params.append({"b_id": task_id, "b_due": parse_datetime(str(value))})
+        except ValueError:
+            continue
+    if not params:
+        return 0
+    tbl = Task.__table__
+    if dialect == "postgresql":
+        fields = tbl.c.fields.op("-")(sa.literal_column("'due_at'"))
+    else:
+        fields = sa.func.json_remove(tbl.c.fields, sa.literal_column("'$.due_at'"))
+    stmt = (
+        sa.update(tbl)
+        .where(tbl.c.id == sa.bindparam("b_id"))
+        .values(due_at=sa.bindparam("b_due", type_=tbl.c.due_at.type), fields=fields)
+    )
+    await conn.execute(stmt, params)
+    return len(params)
+
+
+_SPAN_CHECK = "start_at IS NULL OR due_at IS NULL OR start_at <= due_at"  # как ck_tasks_span в models
+
+
+async def ensure_span_check(conn: AsyncConnection) -> None:
+    """
+    ck_tasks_span на БД, созданных до появления start_at/due_at: create_all их таблицу
+    не трогает, а _add_missing_columns добавляет только колонки.
+    - PostgreSQL: ADD CONSTRAINT ... NOT VALID (новые записи проверяются, старые — нет)
+    - SQLite: ALTER TABLE ADD CONSTRAINT нет — те же условия триггерами BEFORE INSERT/UPDATE
+    """
+    if conn.dialect.name == "postgresql":
+        has = await conn.execute(sa.text("SELECT 1 FROM pg_constraint WHERE conname = 'ck_tasks_span'"))
+        if has.first() is None:
+            await conn.execute(sa.text(f"ALTER TABLE tasks ADD CONSTRAINT ck_tasks_span CHECK ({_SPAN_CHECK}) NOT VALID"))
+        return
+    ddl = (await conn.execute(sa.text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'tasks'"))).scalar()
+    if not ddl or "ck_tasks_span" in ddl:
+        return
+    for name, when in (("ins", "INSERT"), ("upd", "UPDATE OF start_at, due_at")):
+        await conn.execute(sa.text(
+            f"CREATE TRIGGER IF NOT EXISTS trg_tasks_span_{name} BEFORE {when} ON tasks "
+            "WHEN NEW.start_at IS NOT NULL AND NEW.due_at IS NOT NULL AND NEW.start_at > NEW.due_at "
+            "BEGIN SELECT RAISE(ABORT, 'CHECK constraint failed: ck_tasks_span'); END"
+        ))
+
+
+__all__ = [
+    "FIELD_KINDS",
+    "FILTER_OPS",
+    "FieldIndexSpec",
+    "specs_from_default_fields",
+    "kind_for",
+    "field_expr",
+    "field_predicate",
+    "coerce_value",
+    "parse_datetime",
+    "sync_field_indexes",
+    "backfill_due_dates",
+    "ensure_span_check",
+]
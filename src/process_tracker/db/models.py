@@ -1,21 +1,25 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional, List
 
 from sqlalchemy import (
+    BigInteger,
     String,
     Text,
     Boolean,
     DateTime,
+    CheckConstraint,
     ForeignKey,
     UniqueConstraint,
     Index,
     func,
+    text,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
-from .types import JSON_AUTO as JSON
+from .ranking import initial_rank
+from .types import JSON_AUTO as JSON, UTCDateTime
 
 # ───────────────────────── Base / Mixins ─────────────────────────
 
@@ -23,6 +27,10 @@ class Base(DeclarativeBase):
     pass
 
 
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class TimestampMixin:
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
@@ -49,13 +57,11 @@ class User(TimestampMixin, Base):
         secondary="user_roles", back_populates="users", lazy="selectin"
     )
 
+    # коллекции-«обратки» не грузим никогда: профили см. db/dal/loaders.py
     tasks_assigned: Mapped[List["Task"]] = relationship(
-        back_populates="assignee", lazy="selectin"
+        back_populates="assignee", lazy="noload"
     )
 
-    __table_args__ = (
-        Index("ix_users_email", "email"),
-    )
 
 
 class Role(TimestampMixin, Base):
@@ -67,7 +73,7 @@ class Role(TimestampMixin, Base):
     description: Mapped[Optional[str]] = mapped_column(Text)
 
     users: Mapped[List[User]] = relationship(
-        secondary="user_roles", back_populates="roles", lazy="selectin"
+        secondary="user_roles", back_populates="roles", lazy="noload"
     )
     permissions: Mapped[List["Permission"]] = relationship(
         secondary="role_permissions", back_populates="roles", lazy="selectin"
@@ -83,7 +89,7 @@ class Permission(TimestampMixin, Base):
     description: Mapped[Optional[str]] = mapped_column(Text)
 
     roles: Mapped[List[Role]] = relationship(
-        secondary="role_permissions", back_populates="permissions", lazy="selectin"
+        secondary="role_permissions", back_populates="permissions", lazy="noload"
     )
 
 
@@ -129,8 +135,16 @@ class Process(TimestampMixin, Base):
     name: Mapped[str] = mapped_column(String(200), unique=True, index=True)
     description: Mapped[Optional[str]] = mapped_column(Text)
     status: Mapped[str] = mapped_column(String(32), default="active")
+    # последняя активность: правка процесса (ORM) или любая запись в его задачах (триггеры db/activity.py);
+    # nullable только ради ALTER TABLE ADD COLUMN — NULL заполняют бэкфилл и триггер на INSERT
+    last_activity_at: Mapped[Optional[datetime]] = mapped_column(UTCDateTime, default=utcnow, onupdate=utcnow)
 
-    tasks: Mapped[List["Task"]] = relationship(back_populates="process", lazy="selectin")
+    tasks: Mapped[List["Task"]] = relationship(back_populates="process", lazy="noload")
+
+    # список процессов: ORDER BY last_activity_at DESC, id DESC (keyset)
+    __table_args__ = (
+        Index("ix_processes_activity", "last_activity_at", "id"),
+    )
 
 
 class TaskType(TimestampMixin, Base):
@@ -151,7 +165,7 @@ class Task(TimestampMixin, Base):
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     title: Mapped[str] = mapped_column(String(300), index=True)
     description: Mapped[Optional[str]] = mapped_column(Text)
-    status: Mapped[str] = mapped_column(String(32), default="open", index=True)
+    status: Mapped[str] = mapped_column(String(32), default="open")
 
     process_id: Mapped[Optional[int]] = mapped_column(ForeignKey("processes.id", ondelete="SET NULL"))
     type_id: Mapped[Optional[int]] = mapped_column(ForeignKey("task_types.id", ondelete="SET NULL"))
@@ -159,13 +173,83 @@ class Task(TimestampMixin, Base):
 
     fields: Mapped[dict] = mapped_column(JSON, default=dict)  # произвольные поля по TaskType
 
-    process: Mapped[Optional[Process]] = relationship(back_populates="tasks", lazy="selectin")
-    type: Mapped[Optional[TaskType]] = relationship(lazy="selectin")
-    assignee: Mapped[Optional[User]] = relationship(back_populates="tasks_assigned", lazy="selectin")
+    # ручной порядок карточек на доске: дробный лексикографический ранг (db/ranking.py)
+    rank: Mapped[Optional[str]] = mapped_column(String(64), default=initial_rank)
+
+    # календарь/гант: типизированные даты (раньше due_at жил строкой в fields);
+    # интервал задачи — см. TASK_SPAN_* ниже
+    start_at: Mapped[Optional[datetime]] = mapped_column(UTCDateTime)
+    due_at: Mapped[Optional[datetime]] = mapped_column(UTCDateTime)
+
+    # Ключ keyset-пагинации (updated_at, id): заполняется сразу при вставке
+    # и на стороне Python, чтобы формат значений в SQLite был единым.
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, onupdate=utcnow, nullable=False
+    )
+
+    # связи грузятся только явно, через профили (db/dal/loaders.py)
+    process: Mapped[Optional[Process]] = relationship(back_populates="tasks", lazy="raise_on_sql")
+    type: Mapped[Optional[TaskType]] = relationship(lazy="raise_on_sql")
+    assignee: Mapped[Optional[User]] = relationship(back_populates="tasks_assigned", lazy="raise_on_sql")
 
+    # Составные индексы под ленту задач: фильтр + ORDER BY updated_at DESC, id DESC
     __table_args__ = (
-        Index("ix_tasks_status", "status"),
-        Index("ix_tasks_title", "title"),
+        Index("ix_tasks_updated_id", "updated_at", "id"),
+        Index("ix_tasks_status_updated_id", "status", "updated_at", "id"),
+        Index("ix_tasks_assignee_updated_id", "assignee_id", "updated_at", "id"),
+        Index("ix_tasks_process_updated_id", "process_id", "updated_at", "id"),
+        Index("ix_tasks_type_updated_id", "type_id", "updated_at", "id"),
+        # колонка доски: WHERE type_id = ? AND status = ? ORDER BY rank, id
+        Index("ix_tasks_board", "type_id", "status", "rank", "id"),
+        # сводки по процессам (open/done/overdue): агрегат только по индексу, без чтения строк
+        Index("ix_tasks_process_rollup", "process_id", "status", "due_at"),
+        CheckConstraint("start_at IS NULL OR due_at IS NULL OR start_at <= due_at", name="ck_tasks_span"),
+    )
+
+
+# Статусы «задача закрыта» — сводки процессов
+DONE_STATUSES: tuple[str, ...] = ("done", "closed", "resolved", "complete")
+
+
+# Интервал задачи на календаре/ганте: если задана одна дата — это точка.
+# Запрос «пересекается с [from, to]» = SPAN_END >= from AND SPAN_START <= to;
+# выражения совпадают с выражениями индексов ниже, поэтому планировщик их подхватывает.
+TASK_SPAN_START = func.coalesce(Task.start_at, Task.due_at)
+TASK_SPAN_END = func.coalesce(Task.due_at, Task.start_at)
+
+# btree (оба диалекта): диапазон и ORDER BY по (концу интервала, id), начало проверяется прямо по индексу
+Index("ix_tasks_span", TASK_SPAN_END, Task.id, TASK_SPAN_START)
+Index("ix_tasks_process_span", Task.process_id, TASK_SPAN_END, Task.id, TASK_SPAN_START)
+# Postgres: GiST по диапазону — пересечение (&&) без перебора «будущих» задач
+Index(
+    "ix_tasks_span_gist",
+    func.tstzrange(TASK_SPAN_START, TASK_SPAN_END, text("'[]'")),
+    postgresql_using="gist",
+    postgresql_where=TASK_SPAN_END.isnot(None),
+).ddl_if(dialect="postgresql")
+
+
+# ───────────────────────── Tags ─────────────────────────
+
+class Tag(TimestampMixin, Base):
+    __tablename__ = "tags"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(64), unique=True, index=True)
+    color: Mapped[Optional[str]] = mapped_column(String(16))
+
+
+class TaskTag(Base):
+    """
+    Метка на задаче. Комбинированные фильтры по меткам («A AND B AND NOT C») считаются
+    не JOIN'ами, а по битмапам в памяти (services/tags_service.py); таблица — источник истины.
+    """
+    __tablename__ = "task_tags"
+    task_id: Mapped[int] = mapped_column(ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    tag_id: Mapped[int] = mapped_column(ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_task_tags_tag", "tag_id", "task_id"),
     )
 
 
@@ -197,8 +281,42 @@ class FormSubmission(TimestampMixin, Base):
     created_by_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"))
     submitted_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
 
-    form: Mapped[FormDef] = relationship(lazy="selectin")
-    created_by: Mapped[Optional[User]] = relationship(lazy="selectin")
+    form: Mapped[FormDef] = relationship(lazy="raise_on_sql")
+    created_by: Mapped[Optional[User]] = relationship(lazy="raise_on_sql")
+
+
+# ───────────────────────── Views ─────────────────────────
+
+class SavedView(TimestampMixin, Base):
+    """
+    Сохранённое представление: ресурс + спецификация запроса (фильтры/сортировка/группировка)
+    + раскладка UI. version растёт при каждом изменении — по ней кэшируется
+    скомпилированный statement и результаты (см. db/dal/view_query.py).
+    """
+    __tablename__ = "saved_views"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(128))
+    resource: Mapped[str] = mapped_column(String(16))                    # tasks | processes
+    query: Mapped[dict] = mapped_column(JSON, default=dict)
+    layout: Mapped[str] = mapped_column(String(16), default="list")      # list|kanban|calendar|gantt
+    meta: Mapped[dict] = mapped_column(JSON, default=dict)
+    version: Mapped[int] = mapped_column(default=1, nullable=False)
+
+
+# ───────────────────────── Stats ─────────────────────────
+
+class TaskCounter(Base):
+    """
+    Предрасчитанные счётчики для дашборда: задачи по dim = total/status/process/assignee
+    (key — значение измерения, '' — не задано) и dim = processes.
+    Ведутся триггерами БД в той же транзакции, что и запись (см. db/stats.py).
+    """
+    __tablename__ = "task_counters"
+
+    dim: Mapped[str] = mapped_column(String(16), primary_key=True)
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    n: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
 
 
 __all__ = [
@@ -214,7 +332,14 @@ __all__ = [
     "Process",
     "TaskType",
     "Task",
+    # Tags
+    "Tag",
+    "TaskTag",
     # Forms
     "FormDef",
     "FormSubmission",
+    # Views
+    "SavedView",
+    # Stats
+    "TaskCounter",
 ]
@@ -11,8 +11,12 @@ from .models import (  # noqa: F401
     TaskType,
     Task,
     Process,
+    Tag,
+    TaskTag,
     FormDef,
     FormSubmission,
+    SavedView,
+    TaskCounter,
 )
 
 __all__ = [
@@ -25,6 +29,10 @@ __all__ = [
     "TaskType",
     "Task",
     "Process",
+    "Tag",
+    "TaskTag",
     "FormDef",
     "FormSubmission",
+    "SavedView",
+    "TaskCounter",
 ]
@@ -0,0 +1,126 @@
+from __future__ import annotations
+"""
+Лексикографические дробные ранги для ручного порядка карточек (Task.rank).
+
+Ранг — строка из цифр base36 (0-9a-z): порядок строк совпадает с порядком
+чисел 0.xxxx, поэтому между любыми двумя рангами всегда есть третий, и
+перенос карточки — это UPDATE одной строки, без сдвига соседей.
+Только нижний регистр — чтобы порядок совпадал при любой collation.
+
+- rank_between(lo, hi): ранг строго между соседями (None — край колонки)
+- initial_rank(): ранг новой задачи — по времени создания, в конце колонки
+- spread_ranks(n): n равномерных рангов одной длины — для ребалансировки,
+  когда многократные вставки в одно место удлинили строки
+"""
+
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+_INDEX = {c: i for i, c in enumerate(DIGITS)}
+
+RANK_MAX_LEN = 64          # длина колонки Task.rank
+REBALANCE_LEN = 24         # длиннее — колонку пора ребалансировать
+
+# ранги новых задач: "y" + микросекунды от 2020-01-01 (10 знаков base36 ≈ 114 лет).
+# Ребалансировка раскладывает ранги ниже "y", так что новые задачи остаются в конце.
+_INITIAL_PREFIX = "y"
+_EPOCH_US = 1_577_836_800_000_000
+_INITIAL_WIDTH = 10
+
+
+def _encode(n: int, width: int) -> str:
+    out = []
+    for _ in range(width):
+        n, d = divmod(n, BASE)
+        out.append(DIGITS[d])
+    return "".join(reversed(out))
+
+
+def is_valid_rank(rank: str) -> bool:
+    return bool(rank) and len(rank) <= RANK_MAX_LEN and rank[-1] != "0" and all(c in _INDEX for c in rank)
+
+
+def rank_between(lo: str | None, hi: str | None) -> str:
+    """
+    Кратчайший ранг r: lo < r < hi (None — без ограничения с этой стороны).
+    Результат никогда не оканчивается на "0" — иначе под ним не осталось бы места.
+    ValueError, если lo >= hi или между ними рангов нет (hi = lo + "0…0": такие hi
+    сами по себе не выдаются, но могут остаться в старых данных) — колонку пора ребалансировать.
+    """
+    lo = lo or ""
+    if hi is not None and lo >= hi:
+        raise ValueError(f"no rank between {lo!r} and {hi!r}")
+    out: list[str] = []
+    i = 0
+    while True:
+        if hi is not None and i >= len(hi):
+            # out уже равен hi: всё, что длиннее, сортируется выше hi
+            raise ValueError(f"no rank between {lo!r} and {hi!r}")
+        a = _INDEX[lo[i]] if i < len(lo) else 0
+        b = _INDEX[hi[i]] if hi is not None else BASE
+        if a == b:
+            out.append(DIGITS[a])
+            i += 1
+            continue
+        mid = (a + b) // 2
+        if mid > a:
+            out.append(DIGITS[mid])
+            return "".join(out)
+        # соседние цифры: берём цифру lo, дальше верхней границы больше нет
+        out.append(DIGITS[a])
+        hi = None
+        i += 1
+
+
+def initial_rank() -> str:
+    us = max(0, time.time_ns() // 1000 - _EPOCH_US)
+    if us % BASE == 0:
+        us += 1  # ранг не должен оканчиваться на "0" (см. rank_between)
+    return _INITIAL_PREFIX + _encode(us, _INITIAL_WIDTH)
+
+
+def spread_ranks(n: int) -> list[str]:
+    """n возрастающих рангов одинаковой длины, равномерно ниже префикса новых задач."""
+    if n <= 0:
+        return []
+    top = _INDEX[_INITIAL_PREFIX]
+    width = 1
+    while top * BASE ** (width - 1) < 4 * (n + 1):
+        width += 1
+    space = top * BASE ** (width - 1)
+    out = []
+    for i in range(n):
+        k = (i + 1) * space // (n + 1)
+        if k % BASE == 0:
+            k += 1  # шаг ≥ 4 — порядок не нарушится
+        out.append(_encode(k, width))
+    return out
+
+
+async def backfill_ranks(conn: AsyncConnection) -> int:
+    """
+    Задачам без ранга (строки, созданные до появления колонки) — ранг по id:
+    "y" + id в 10 знаков + "1", ниже рангов новых задач. Цифры 0-9 — тоже цифры base36;
+    завершающая "1" — чтобы ранг не оканчивался на "0" (id вида 10, 20, … иначе оканчивались бы).
+    """
+    if conn.dialect.name == "postgresql":
+        expr = "'y' || lpad(id::text, 10, '0') || '1'"
+    else:
+        expr = "'y' || printf('%010d', id) || '1'"
+    res = await conn.execute(text(f"UPDATE tasks SET rank = {expr} WHERE rank IS NULL"))
+    return max(res.rowcount or 0, 0)
+
+
+__all__ = [
+    "RANK_MAX_LEN",
+    "REBALANCE_LEN",
+    "is_valid_rank",
+    "rank_between",
+    "initial_rank",
+    "spread_ranks",
+    "backfill_ranks",
+]
@@ -0,0 +1,258 @@
+from __future__ import annotations
+"""
+Полнотекстовый поиск по задачам, процессам, формам и шаблонам.
+
+Один индекс на все сущности:
+  - SQLite:     FTS5-таблица search_fts(title, body), rowid = ref_id * 8 + код сущности
+                (удаление/обновление документа — по rowid, без скана индекса)
+  - PostgreSQL: search_docs(kind, ref_id, title, body, tsv) c tsvector (title — вес A,
+                body — вес B) и GIN-индексом
+
+Синхронизация на записи — триггерами в БД на tasks/processes/form_defs: их видят
+и ORM, и bulk executemany, и COPY. Шаблоны живут в памяти процесса (routes/templates),
+их документы пишутся явно через index_document()/remove_document() и чистятся при старте.
+
+Запрос: слова из q → префиксный поиск по каждому (AND), ранжирование bm25 / ts_rank_cd.
+"""
+
+import re
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+SEARCH_KINDS: tuple[str, ...] = ("task", "process", "form", "template")
+_KIND_CODE = {"task": 1, "process": 2, "form": 3, "template": 4}
+_CODE_KIND = {v: k for k, v in _KIND_CODE.items()}
+# сущности без таблицы в БД — их документы не переживают рестарт
+_IN_MEMORY_KINDS = ("template",)
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_TERMS = 8
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# (kind, таблица, выражение title, выражение body)
+_SOURCES = (
+    ("task", "tasks", "title", "description"),
+    ("process", "processes", "name", "description"),
+    ("form", "form_defs", "title", "key"),
+)
+
+
+def _is_pg(conn_or_session: Any) -> bool:
+    bind = conn_or_session.get_bind() if isinstance(conn_or_session, AsyncSession) else conn_or_session
+    return bind.dialect.name == "postgresql"
+
+
+def query_terms(q: str) -> list[str]:
+    """Слова запроса (без операторов FTS — пользовательский ввод в синтаксис не попадает)."""
+    return [w.lower() for w in _WORD_RE.findall(q or "")][:MAX_TERMS]
+
+
+# ───────────────────────── DDL ─────────────────────────
+
+def _sqlite_ddl() -> list[str]:
+    ddl = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5("
+        "title, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    ]
+    for kind, table, title, body in _SOURCES:
+        code = _KIND_CODE[kind]
+        row = f"new.id * 8 + {code}, coalesce(new.{title}, ''), coalesce(new.{body}, '')"
+        ddl += [
+            f"CREATE TRIGGER IF NOT EXISTS trg_search_{table}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO search_fts(rowid, title, body) VALUES ({row}); END",
+            f"CREATE TRIGGER IF NOT EXISTS trg_search_{table}_au AFTER UPDATE OF {title}, {body} ON {table} BEGIN "
+            f"DELETE FROM search_fts WHERE rowid = old.id * 8 + {code}; "
+            f"INSERT INTO search_fts(rowid, title, body) VALUES ({row}); END",
+            f"CREATE TRIGGER IF NOT EXISTS trg_search_{table}_ad AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM search_fts WHERE rowid = old.id * 8 + {code}; END",
+        ]
+    return ddl
+
+
+def _pg_ddl() -> list[str]:
+    ddl = [
+        "CREATE TABLE IF NOT EXISTS search_docs ("
+        " kind varchar(16) NOT NULL, ref_id bigint NOT NULL,"
+        " title text NOT NULL DEFAULT '', body text NOT NULL DEFAULT '',"
+        " tsv tsvector GENERATED ALWAYS AS ("
+        "  setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', body), 'B')"
+        " ) STORED,"
+        " PRIMARY KEY (kind, ref_id))",
+        "CREATE INDEX IF NOT EXISTS ix_search_docs_tsv ON search_docs USING gin (tsv)",
+    ]
+    for kind, table, title, body in _SOURCES:
+        ddl += [
+            f"CREATE OR REPLACE FUNCTION pt_search_{table}() RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN "
+            f"IF TG_OP = 'DELETE' THEN DELETE FROM search_docs WHERE kind = '{kind}' AND ref_id = OLD.id; RETURN OLD; END IF; "
+            f"INSERT INTO search_docs(kind, ref_id, title, body) "
+            f"VALUES ('{kind}', NEW.id, coalesce(NEW.{title}, ''), coalesce(NEW.{body}, '')) "
+            f"ON CONFLICT (kind, ref_id) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body; "
+            f"RETURN NEW; END $$",
+            f"DROP TRIGGER IF EXISTS trg_search_{table} ON {table}",
+            f"CREATE TRIGGER trg_search_{table} AFTER INSERT OR DELETE OR UPDATE OF {title}, {body} "
+            f"ON {table} FOR EACH ROW EXECUTE FUNCTION pt_search_{table}()",
+        ]
+    return ddl
+
+
+async def _backfill(conn: AsyncConnection) -> None:
+    """Заполнить индекс из исходных таблиц (первый запуск на существующей БД или rebuild)."""
+    for kind, table, title, body in _SOURCES:
+        if _is_pg(conn):
+            await conn.execute(text(
+                f"INSERT INTO search_docs(kind, ref_id, title, body) "
+                f"SELECT '{kind}', id, coalesce({title}, ''), coalesce({body}, '') FROM {table} "
+                f"ON CONFLICT (kind, ref_id) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body"
+            ))
+        else:
+            code = _KIND_CODE[kind]
+            await conn.execute(text(
+                f"INSERT OR REPLACE INTO search_fts(rowid, title, body) "
+                f"SELECT id * 8 + {code}, coalesce({title}, ''), coalesce({body}, '') FROM {table}"
+            ))
+
+
+async def ensure_search_schema(conn: AsyncConnection) -> None:
+    """
+    Идемпотентно: таблица индекса + триггеры. Если индекс только что создан
+    (пуст), а данные уже есть — заполняем его из исходных таблиц.
+    """
+    pg = _is_pg(conn)
+    index_table = "search_docs" if pg else "search_fts"
+    existed = await _table_exists(conn, index_table)
+    for stmt in (_pg_ddl() if pg else _sqlite_ddl()):
+        await conn.execute(text(stmt))
+    if not existed:
+        await _backfill(conn)
+    # документы in-memory сущностей от прошлого процесса больше ни на что не указывают
+    for kind in _IN_MEMORY_KINDS:
+        if pg:
+            await conn.execute(text("DELETE FROM search_docs WHERE kind = :k"), {"k": kind})
+        else:
+            await conn.execute(text("DELETE FROM search_fts WHERE rowid % 8 = :c"), {"c": _KIND_CODE[kind]})
+
+
+async def _table_exists(conn: AsyncConnection, name: str) -> bool:
+    if _is_pg(conn):
+        res = await conn.execute(text("SELECT to_regclass(:n) IS NOT NULL"), {"n": name})
+    else:
+        res = await conn.execute(text("SELECT count(*) FROM sqlite_master WHERE name = :n"), {"n": name})
+    return bool(res.scalar())
+
+
+_ready: set[str] = set()  # БД, где индекс уже найден (отсутствие перепроверяем — его может создать init_db)
+
+
+async def has_search_index(session: AsyncSession) -> bool:
+    """Есть ли таблица индекса (SQLite без FTS5 — нет: init_db проглатывает ошибку DDL)."""
+    key = str(session.get_bind().url)
+    if key in _ready:
+        return True
+    if await _table_exists(session, "search_docs" if _is_pg(session) else "search_fts"):
+        _ready.add(key)
+        return True
+    return False
+
+
+async def rebuild_search_index(conn: AsyncConnection) -> None:
+    """Полная пересборка (после ручных правок БД в обход триггеров)."""
+    if _is_pg(conn):
+        await conn.execute(text("DELETE FROM search_docs WHERE kind <> 'template'"))
+    else:
+        await conn.execute(text("DELETE FROM search_fts WHERE rowid % 8 <> :c"), {"c": _KIND_CODE["template"]})
+    await _backfill(conn)
+
+
+# ───────────────────────── явная индексация ─────────────────────────
+
+async def index_document(session: AsyncSession, kind: str, ref_id: int, title: str, body: str = "") -> None:
+    """Upsert документа для сущностей без триггеров (шаблоны). Коммит — на вызывающем."""
+    if kind not in _KIND_CODE:
+        raise ValueError(f"unknown search kind '{kind}'")
+    if _is_pg(session):
+        await session.execute(
+            text(
+                "INSERT INTO search_docs(kind, ref_id, title, body) VALUES (:k, :i, :t, :b) "
+                "ON CONFLICT (kind, ref_id) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body"
+            ),
+            {"k": kind, "i": ref_id, "t": title or "", "b": body or ""},
+        )
+    else:
+        await session.execute(
+            text("INSERT OR REPLACE INTO search_fts(rowid, title, body) VALUES (:r, :t, :b)"),
+            {"r": ref_id * 8 + _KIND_CODE[kind], "t": title or "", "b": body or ""},
+        )
+
+
+async def remove_document(session: AsyncSession, kind: str, ref_id: int) -> None:
+    if _is_pg(session):
+        await session.execute(text("DELETE FROM search_docs WHERE kind = :k AND ref_id = :i"), {"k": kind, "i": ref_id})
+    else:
+        await session.execute(text("DELETE FROM search_fts WHERE rowid = :r"), {"r": ref_id * 8 + _KIND_CODE[kind]})
+
+
+# ───────────────────────── запрос ─────────────────────────
+
+async def search(
+    session: AsyncSession,
+    q: str,
+    *,
+    kinds: Optional[Sequence[str]] = None,
+    limit: int = DEFAULT_LIMIT,
+) -> list[dict[str, Any]]:
+    """
+    Найти документы: каждое слово q — префикс (AND), сортировка по релевантности
+    (совпадение в title весит больше, чем в body). [{kind, id, title, score}].
+    """
+    terms = query_terms(q)
+    if not terms:
+        return []
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    kinds = [k for k in (kinds or SEARCH_KINDS) if k in _KIND_CODE]
+    if not kinds:
+        return []
+
+    if _is_pg(session):
+        tsq = " & ".join(f"{t}:*" for t in terms)
+        res = await session.execute(
+            text(
+                "SELECT kind, ref_id, title, ts_rank_cd(tsv, query) AS score "
+                "FROM search_docs, to_tsquery('simple', :q) AS query "
+                "WHERE tsv @@ query AND kind = ANY(:kinds) "
+                "ORDER BY score DESC, ref_id DESC LIMIT :n"
+            ),
+            {"q": tsq, "kinds": list(kinds), "n": limit},
+        )
+        return [{"kind": k, "id": int(i), "title": t, "score": float(s)} for k, i, t, s in res.all()]
+
+    match = " AND ".join(f'"{t}"*' for t in terms)
+    codes = ", ".join(str(_KIND_CODE[k]) for k in kinds)
+    # bm25: чем меньше, тем лучше; веса колонок title/body — 10:1
+    res = await session.execute(
+        text(
+            "SELECT rowid, title, bm25(search_fts, 10.0, 1.0) AS score FROM search_fts "
+            f"WHERE search_fts MATCH :m AND rowid % 8 IN ({codes}) "
+            "ORDER BY score LIMIT :n"
+        ),
+        {"m": match, "n": limit},
+    )
+    return [
+        {"kind": _CODE_KIND[rowid % 8], "id": rowid // 8, "title": title, "score": -float(score)}
+        for rowid, title, score in res.all()
+    ]
+
+
+__all__ = [
+    "SEARCH_KINDS",
+    "query_terms",
+    "ensure_search_schema",
+    "has_search_index",
+    "rebuild_search_index",
+    "index_document",
+    "remove_document",
+    "search",
+]
@@ -49,6 +49,8 @@ async def seed_rbac(session: AsyncSession) -> None:
     }
     for code, perm_codes in roles.items():
         role, _ = await _get_or_create(session, Role, {"code": code}, {"title": code.title()})
+        # явная загрузка коллекции: в async-сессии неявный lazy load невозможен
+        await session.refresh(role, attribute_names=["permissions"])
         role.permissions[:] = [perm_objs[c] for c in perm_codes if c in perm_objs]
 
     await session.commit()
@@ -1,14 +1,15 @@
 from __future__ import annotations
 
-import asyncio
 from typing import AsyncIterator
 
-from sqlalchemy import event
 from sqlalchemy.engine.url import make_url
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 
 from ..core.config import settings
 from .models import Base  # noqa: F401  — чтобы metadata была загружена
+from .admission import install_admission
+from .cancel import install_cancellation
+from .sqlite import create_sqlite_engines, make_sessionmaker
 
 ENGINE_URL = settings.db_url_resolved
 _url = make_url(ENGINE_URL)
@@ -20,7 +21,7 @@ engine_kwargs: dict = dict(
     pool_pre_ping=True,
 )
 
-# Для SQLite оставим дефолтный пул. Для других — настраиваем при наличии параметров.
+# Для SQLite пулы задаёт db/sqlite.py. Для других — настраиваем при наличии параметров.
 if not _is_sqlite:
     if hasattr(settings, "db_pool_size"):
         engine_kwargs["pool_size"] = getattr(settings, "db_pool_size")
@@ -29,30 +30,31 @@ if not _is_sqlite:
     if hasattr(settings, "db_pool_recycle"):
         engine_kwargs["pool_recycle"] = getattr(settings, "db_pool_recycle")
 
-engine = create_async_engine(ENGINE_URL, **engine_kwargs)
+if _is_sqlite:
+    # профиль PRAGMA на каждое соединение; для файла — писатель (очередь на 1 соединение) + пул читателей
+    engine, read_engine = create_sqlite_engines(ENGINE_URL, echo=settings.db_echo)
+else:
+    engine = create_async_engine(ENGINE_URL, **engine_kwargs)
+    read_engine = engine
 
+# дедлайн запроса доходит до БД: progress handler/interrupt SQLite, statement_timeout/pg_cancel_backend
+for _e in {engine, read_engine}:
+    install_cancellation(_e, default_timeout=settings.db_query_timeout)
 
-@event.listens_for(engine.sync_engine, "connect")
-def _set_sqlite_pragma(dbapi_connection, _):  # pragma: no cover
-    if _is_sqlite:
-        try:
-            cur = dbapi_connection.cursor()
-            cur.execute("PRAGMA foreign_keys=ON")
-            cur.close()
-        except Exception:
-            pass
+# admission control (db/admission.py): свой лимит у писателя и у пула читателей
+if read_engine is engine:
+    install_admission(engine)
+else:
+    install_admission(engine, role="writer")
+    install_admission(read_engine, role="reader")
 
-
-AsyncSessionLocal = async_sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
-
-DB_CONCURRENCY_SEM = asyncio.Semaphore(max(1, getattr(settings, "db_max_concurrency", 10)))
+AsyncSessionLocal = make_sessionmaker(engine, read_engine)
+# сессии, которые пишут: чтения перед записью — в той же транзакции писателя (db/sqlite.py)
+AsyncWriteSessionLocal = make_sessionmaker(engine, read_engine, write=True)
 
 
 async def get_session() -> AsyncIterator[AsyncSession]:
-    async with DB_CONCURRENCY_SEM:
-        async with AsyncSessionLocal() as session:
-            yield session
+    # параллелизм ограничивается на каждом операторе (события движка → db/admission.py),
+    # а не на всё время жизни сессии
+    async with AsyncSessionLocal() as session:
+        yield session
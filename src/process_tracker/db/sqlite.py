@@ -0,0 +1,297 @@
+from __future__ import annotations
+"""
+Production-режим SQLite: профиль PRAGMA, один писатель + пул читателей, повтор на SQLITE_BUSY.
+
+- профиль PRAGMA ставится на КАЖДОЕ новое соединение (synchronous, busy_timeout, cache_size —
+  настройки соединения, а не файла: раньше init_db выставлял их одному соединению)
+- все записи идут через единственное соединение писателя (пул на 1 соединение = очередь
+  ожидания, pool_timeout = sqlite_writer_wait); транзакция писателя открывается BEGIN IMMEDIATE —
+  блокировка берётся сразу, а не при первом INSERT посреди транзакции, где SQLITE_BUSY уже
+  нельзя просто повторить
+- очередь к писателю не вложена в ограничитель параллельности: admission control
+  (db/admission.py) берёт слот на оператор уже после выдачи соединения, поэтому сессия,
+  держащая писателя, не ждёт слот, занятый сессиями в очереди к нему же
+- чтения идут в пул соединений с query_only=ON (WAL: читатели не ждут писателя)
+- маршрутизацию делает RoutingSession.get_bind: flush и DML — писатель; после первой
+  записи транзакция сессии «прилипает» к писателю (читает свои незакоммиченные изменения)
+- сессии, которые пишут (мутирующие запросы API, сервисы записи), открываются фабрикой
+  make_sessionmaker(..., write=True): все их операторы, включая чтения ДО первой записи, идут
+  в писателя — «прочитал-решил-записал» (соседи при переносе карточки, проверка id в пачке)
+  остаётся одной транзакцией, а не чтением из чужого снимка
+- SQLITE_BUSY на BEGIN IMMEDIATE (писатель другого процесса: CLI-импорт, UI) повторяется
+  ограниченное число раз с экспоненциальной паузой сверх busy_timeout самого SQLite
+"""
+
+import asyncio
+import re
+import time
+from typing import Any, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+
+from ..core.config import settings
+from .admission import install_admission
+
+_WRITER_FLAG = "_sqlite_writer"
+_WRITE_SESSION = "_sqlite_write_session"  # info сессии записи: писатель с первого оператора
+_READ_SQL = re.compile(r"^\s*(select|explain)\b", re.I)
+_CTE_WRITE = re.compile(r"\b(insert|update|delete|replace)\b", re.I)
+
+
+def pragma_profile(*, read_only: bool = False) -> dict[str, Any]:
+    """PRAGMA нового соединения; query_only — последним (journal_mode выше — запись в файл)."""
+    prof: dict[str, Any] = {
+        "foreign_keys": "ON",
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": int(settings.sqlite_busy_timeout_ms),
+        "cache_size": -int(settings.sqlite_cache_size_kib),  # отрицательное — в КиБ
+        "mmap_size": int(settings.sqlite_mmap_size),
+        "temp_store": "MEMORY",
+    }
+    if read_only:
+        prof["query_only"] = "ON"
+    return prof
+
+
+def apply_pragmas(dbapi_connection, pragmas: dict[str, Any]) -> None:
+    cur = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            try:
+                cur.execute(f"PRAGMA {name}={value}")
+            except Exception:
+                # например, journal_mode на :memory: — остальное всё равно ставим
+                pass
+    finally:
+        cur.close()
+
+
+def is_file_database(url: str) -> bool:
+    """Разделять писателя и читателей имеет смысл только для файловой БД (не :memory:)."""
+    u = make_url(url)
+    db = u.database or ""
+    return u.get_backend_name().startswith("sqlite") and db not in ("", ":memory:") and "mode=memory" not in str(u)
+
+
+def is_busy(exc: BaseException) -> bool:
+    orig = getattr(exc, "orig", exc)
+    name = getattr(orig, "sqlite_errorname", "") or ""
+    if name.startswith(("SQLITE_BUSY", "SQLITE_LOCKED")):
+        return True
+    msg = str(orig).lower()
+    return "database is locked" in msg or "database is busy" in msg
+
+
+def _install_busy_retry(engine: AsyncEngine, retries: int, base_delay: float = 0.05) -> None:
+    """Транзакции писателя — BEGIN IMMEDIATE с ограниченным повтором на SQLITE_BUSY."""
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _manual_begin(dbapi_connection, _):  # pragma: no cover
+        # pysqlite сам открывает транзакцию лишь перед DML; BEGIN ставим сами (см. _begin_immediate)
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def _begin_immediate(conn):  # pragma: no cover
+        delay = base_delay
+        for attempt in range(retries + 1):
+            try:
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+                return
+            except OperationalError as e:
+                if attempt >= retries or not is_busy(e):
+                    raise
+            # обработчик события синхронный, но вызван из greenlet SQLAlchemy — спим, не блокируя цикл
+            await_only(asyncio.sleep(delay))
+            delay = min(delay * 2, 1.0)
+
+
+def _is_read(clause: Any) -> bool:
+    if clause is None:
+        return False
+    if getattr(clause, "is_select", False):
+        return getattr(clause, "_for_update_arg", None) is None
+    sql = getattr(clause, "text", None)
+    if isinstance(sql, str):
+        if _READ_SQL.match(sql):
+            return True
+        return sql.lstrip()[:4].lower() == "with" and not _CTE_WRITE.search(sql)
+    return False
+
+
+class RoutingSession(Session):
+    """
+    Синхронная сессия под AsyncSession: запись — в писателя, чтение — в пул читателей.
+    Движки задаются подклассом (routing_session_class); get_bind() без аргументов — писатель
+    (так его зовут ради диалекта), но транзакцию к писателю это не привязывает.
+    """
+
+    writer: Any = None
+    reader: Any = None
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        if self.info.get(_WRITE_SESSION) or self.info.get(_WRITER_FLAG):
+            return self.writer
+        if self._flushing or (clause is not None and not _is_read(clause)):
+            self.info[_WRITER_FLAG] = True
+            return self.writer
+        if clause is None:
+            return self.writer
+        return self.reader
+
+    def connection(self, *args, **kw):
+        # «сырое» соединение сессии берут для записи (импорт, DDL индексов) — только писатель
+        self.info[_WRITER_FLAG] = True
+        return super().connection(*args, **kw)
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _unstick(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_WRITER_FLAG, None)
+
+
+def routing_session_class(writer: AsyncEngine, reader: AsyncEngine) -> type[RoutingSession]:
+    return type("SQLiteRoutingSession", (RoutingSession,), {"writer": writer.sync_engine, "reader": reader.sync_engine})
+
+
+def create_sqlite_engines(
+    url: str,
+    *,
+    echo: bool = False,
+    single_writer: Optional[bool] = None,
+    readers: Optional[int] = None,
+) -> tuple[AsyncEngine, AsyncEngine]:
+    """
+    (писатель, читатели). Без single_writer или для :memory: — один движок в обеих ролях,
+    только с профилем PRAGMA.
+    """
+    single_writer = settings.sqlite_single_writer if single_writer is None else single_writer
+    readers = max(1, int(settings.sqlite_read_pool_size if readers is None else readers))
+    wait = float(settings.sqlite_writer_wait)
+
+    if not (single_writer and is_file_database(url)):
+        engine = create_async_engine(url, echo=echo, future=True, pool_pre_ping=True)
+        event.listen(engine.sync_engine, "connect", lambda c, _: apply_pragmas(c, pragma_profile()))
+        return engine, engine
+
+    writer = create_async_engine(
+        url, echo=echo, future=True,
+        pool_size=1, max_overflow=0, pool_timeout=wait,
+        # транзакцию до возврата в пул закрывает сама Session/Connection (COMMIT или ROLLBACK)
+        pool_reset_on_return=None,
+    )
+    event.listen(writer.sync_engine, "connect", lambda c, _: apply_pragmas(c, pragma_profile()))
+    _install_busy_retry(writer, int(settings.sqlite_busy_retries))
+
+    reader = create_async_engine(
+        url, echo=echo, future=True,
+        pool_size=readers, max_overflow=0, pool_timeout=wait,
+        # pysqlite не открывает транзакцию под SELECT, а писать query_only не даст —
+        # ROLLBACK при возврате в пул был бы лишним обращением к потоку aiosqlite
+        pool_reset_on_return=None,
+    )
+    event.listen(reader.sync_engine, "connect", lambda c, _: apply_pragmas(c, pragma_profile(read_only=True)))
+    return writer, reader
+
+
+def make_sessionmaker(
+    writer: AsyncEngine, reader: AsyncEngine, *, write: bool = False
+) -> async_sessionmaker[AsyncSession]:
+    """write=True — фабрика сессий записи: все операторы идут в писателя (см. модуль)."""
+    if writer is reader:
+        return async_sessionmaker(bind=writer, class_=AsyncSession, expire_on_commit=False)
+    return async_sessionmaker(
+        bind=writer,
+        class_=AsyncSession,
+        sync_session_class=routing_session_class(writer, reader),
+        expire_on_commit=False,
+        info={_WRITE_SESSION: True} if write else None,
+    )
+
+
+# ───────────────────────── бенчмарк записи ─────────────────────────
+
+async def bench_writes(path: str, *, production: bool, writers: int = 16, ops: int = 50) -> dict[str, Any]:
+    """
+    Пропускная способность записи на отдельном файле: `writers` корутин по `ops` транзакций,
+    похожих на создание задачи — чтение, три INSERT (задача, событие, activity) и UPDATE
+    горячей строки счётчика (как триггеры task_counters), затем COMMIT.
+    production=False — прежняя конфигурация: общий пул с pre-ping, PRAGMA только foreign_keys;
+    production=True — как в приложении: писатель + читатели и admission control на операторах.
+
+    Результат зависит от диска: выигрыш synchronous=NORMAL (меньше fsync на COMMIT) виден
+    только там, где fsync дорог; на диске с fsync ~0.1 мс режимы в пределах шума — путь
+    к файлу задают на том диске, где будет работать БД (cli bench-sqlite --dir).
+    """
+    url = f"sqlite+aiosqlite:///{path}"
+    if production:
+        writer, reader = create_sqlite_engines(url, single_writer=True)
+        install_admission(writer, role="writer")
+        install_admission(reader, role="reader")
+    else:
+        writer = reader = create_async_engine(url, future=True, pool_pre_ping=True)
+        event.listen(writer.sync_engine, "connect", lambda c, _: apply_pragmas(c, {"foreign_keys": "ON"}))
+    Local = make_sessionmaker(writer, reader)
+
+    async with writer.begin() as conn:
+        await conn.execute(text("DROP TABLE IF EXISTS bench_rows"))
+        await conn.execute(text("DROP TABLE IF EXISTS bench_counter"))
+        await conn.execute(text("CREATE TABLE bench_rows (id INTEGER PRIMARY KEY, k INTEGER NOT NULL, payload TEXT)"))
+        await conn.execute(text("CREATE TABLE bench_counter (id INTEGER PRIMARY KEY, n INTEGER NOT NULL)"))
+        await conn.execute(text("INSERT INTO bench_counter (id, n) VALUES (1, 0)"))
+    if not production:
+        # как делал init_db: WAL в файле ставится один раз
+        async with writer.connect() as conn:
+            await conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+    done = errors = 0
+    payload = "x" * 200
+
+    async def worker() -> None:
+        nonlocal done, errors
+        for _ in range(ops):
+            try:
+                async with Local() as s:
+                    k = (await s.execute(text("SELECT COALESCE(MAX(k), 0) FROM bench_rows"))).scalar_one()
+                    for _ in range(3):
+                        await s.execute(text("INSERT INTO bench_rows (k, payload) VALUES (:k, :p)"), {"k": k + 1, "p": payload})
+                    await s.execute(text("UPDATE bench_counter SET n = n + 1 WHERE id = 1"))
+                    await s.commit()
+                done += 1
+            except OperationalError as e:
+                if not is_busy(e):
+                    raise
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(writers)))
+    elapsed = time.perf_counter() - started
+
+    await writer.dispose()
+    if reader is not writer:
+        await reader.dispose()
+    return {
+        "mode": "production" if production else "baseline",
+        "writers": writers,
+        "committed": done,
+        "busy_errors": errors,
+        "seconds": round(elapsed, 3),
+        "tx_per_sec": round(done / elapsed, 1) if elapsed else None,
+    }
+
+
+__all__ = [
+    "pragma_profile",
+    "apply_pragmas",
+    "is_busy",
+    "RoutingSession",
+    "create_sqlite_engines",
+    "make_sessionmaker",
+    "bench_writes",
+]
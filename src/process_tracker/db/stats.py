@@ -0,0 +1,178 @@
+from __future__ import annotations
+"""
+Счётчики дашборда в task_counters (модель TaskCounter).
+
+Измерения:
+  total     ('')            — всего задач
+  status    (<status>)      — задач в статусе
+  process   (<id> | '')     — задач в процессе / без процесса
+  assignee  (<id> | '')     — задач у исполнителя / без исполнителя
+  processes ('')            — всего процессов
+
+Инкременты делают триггеры на tasks/processes — в той же транзакции, что и сама
+запись (ORM, bulk executemany, COPY — без разницы). Чтение сводки — один SELECT
+по маленькой таблице, без сканов tasks. reconcile_counters() пересчитывает всё
+через GROUP BY и чинит расхождения (после ручных правок в обход триггеров и т.п.).
+"""
+
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+DIMS: tuple[str, ...] = ("total", "status", "process", "assignee", "processes")
+
+# (dim, выражение ключа по строке tasks — без префикса new./old.)
+_TASK_DIMS_SQLITE = (
+    ("status", "{r}.status"),
+    ("process", "coalesce({r}.process_id, '')"),
+    ("assignee", "coalesce({r}.assignee_id, '')"),
+)
+_TASK_DIMS_PG = (
+    ("status", "{r}.status"),
+    ("process", "coalesce({r}.process_id::text, '')"),
+    ("assignee", "coalesce({r}.assignee_id::text, '')"),
+)
+_UPSERT = "INSERT INTO task_counters(dim, key, n) VALUES {values} " \
+          "ON CONFLICT(dim, key) DO UPDATE SET n = task_counters.n + excluded.n"
+
+# фактические значения — тот же набор измерений одним запросом
+_ACTUAL_SQL = """
+SELECT 'total' AS dim, '' AS key, count(*) AS n FROM tasks
+UNION ALL SELECT 'status', status, count(*) FROM tasks GROUP BY status
+UNION ALL SELECT 'process', coalesce(CAST(process_id AS VARCHAR(64)), ''), count(*) FROM tasks GROUP BY process_id
+UNION ALL SELECT 'assignee', coalesce(CAST(assignee_id AS VARCHAR(64)), ''), count(*) FROM tasks GROUP BY assignee_id
+UNION ALL SELECT 'processes', '', count(*) FROM processes
+"""
+
+
+def _is_pg(conn: Any) -> bool:
+    bind = conn.get_bind() if isinstance(conn, AsyncSession) else conn
+    return bind.dialect.name == "postgresql"
+
+
+def _rows(dims, r: str, sign: int) -> str:
+    return ", ".join(f"('{dim}', {expr.format(r=r)}, {sign})" for dim, expr in dims)
+
+
+def _sqlite_ddl() -> list[str]:
+    d = _TASK_DIMS_SQLITE
+    ddl = [
+        "CREATE TRIGGER IF NOT EXISTS trg_counters_tasks_ai AFTER INSERT ON tasks BEGIN "
+        + _UPSERT.format(values="('total', '', 1), " + _rows(d, "new", 1)) + "; END",
+        "CREATE TRIGGER IF NOT EXISTS trg_counters_tasks_ad AFTER DELETE ON tasks BEGIN "
+        + _UPSERT.format(values="('total', '', -1), " + _rows(d, "old", -1)) + "; END",
+        "CREATE TRIGGER IF NOT EXISTS trg_counters_processes_ai AFTER INSERT ON processes BEGIN "
+        + _UPSERT.format(values="('processes', '', 1)") + "; END",
+        "CREATE TRIGGER IF NOT EXISTS trg_counters_processes_ad AFTER DELETE ON processes BEGIN "
+        + _UPSERT.format(values="('processes', '', -1)") + "; END",
+    ]
+    # по триггеру на измерение: пишем, только если значение действительно поменялось
+    for (dim, expr), col in zip(d, ("status", "process_id", "assignee_id")):
+        ddl.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_counters_tasks_au_{dim} AFTER UPDATE OF {col} ON tasks "
+            f"WHEN old.{col} IS NOT new.{col} BEGIN "
+            + _UPSERT.format(values=f"('{dim}', {expr.format(r='old')}, -1), ('{dim}', {expr.format(r='new')}, 1)")
+            + "; END"
+        )
+    return ddl
+
+
+def _pg_ddl() -> list[str]:
+    d = _TASK_DIMS_PG
+    upd = " ".join(
+        f"IF OLD.{col} IS DISTINCT FROM NEW.{col} THEN "
+        + _UPSERT.format(values=f"('{dim}', {expr.format(r='OLD')}, -1), ('{dim}', {expr.format(r='NEW')}, 1)")
+        + "; END IF;"
+        for (dim, expr), col in zip(d, ("status", "process_id", "assignee_id"))
+    )
+    return [
+        "CREATE OR REPLACE FUNCTION pt_task_counters() RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN "
+        "IF TG_OP = 'INSERT' THEN "
+        + _UPSERT.format(values="('total', '', 1), " + _rows(d, "NEW", 1)) + "; RETURN NEW; "
+        "ELSIF TG_OP = 'DELETE' THEN "
+        + _UPSERT.format(values="('total', '', -1), " + _rows(d, "OLD", -1)) + "; RETURN OLD; "
+        "END IF; " + upd + " RETURN NEW; END $$",
+        "DROP TRIGGER IF EXISTS trg_counters_tasks ON tasks",
+        "CREATE TRIGGER trg_counters_tasks AFTER INSERT OR DELETE OR UPDATE OF status, process_id, assignee_id "
+        "ON tasks FOR EACH ROW EXECUTE FUNCTION pt_task_counters()",
+        "CREATE OR REPLACE FUNCTION pt_process_counters() RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN "
+        "IF TG_OP = 'INSERT' THEN " + _UPSERT.format(values="('processes', '', 1)") + "; RETURN NEW; END IF; "
+        + _UPSERT.format(values="('processes', '', -1)") + "; RETURN OLD; END $$",
+        "DROP TRIGGER IF EXISTS trg_counters_processes ON processes",
+        "CREATE TRIGGER trg_counters_processes AFTER INSERT OR DELETE ON processes "
+        "FOR EACH ROW EXECUTE FUNCTION pt_process_counters()",
+    ]
+
+
+async def ensure_counter_triggers(conn: AsyncConnection) -> None:
+    """Идемпотентно ставит триггеры; на пустых счётчиках и непустой БД — сразу сверка."""
+    for stmt in (_pg_ddl() if _is_pg(conn) else _sqlite_ddl()):
+        await conn.execute(text(stmt))
+    has_counters = (await conn.execute(text("SELECT 1 FROM task_counters LIMIT 1"))).first()
+    if not has_counters:
+        await reconcile_counters(conn)
+
+
+async def reconcile_counters(conn: AsyncConnection) -> int:
+    """
+    Привести task_counters к фактическим COUNT(*). Возвращает число исправленных строк.
+    На Postgres на время сверки блокируем запись в tasks/processes (SHARE), иначе
+    инкремент параллельной транзакции между GROUP BY и правкой потерялся бы.
+    """
+    if _is_pg(conn):
+        await conn.execute(text("LOCK TABLE tasks, processes IN SHARE MODE"))
+    actual = {(d, str(k)): int(n) for d, k, n in (await conn.execute(text(_ACTUAL_SQL))).all()}
+    stored = {(d, k): int(n) for d, k, n in (await conn.execute(text("SELECT dim, key, n FROM task_counters"))).all()}
+
+    fixes = [
+        {"d": d, "k": k, "n": actual.get((d, k), 0)}
+        for d, k in set(actual) | set(stored)
+        if actual.get((d, k), 0) != stored.get((d, k))
+    ]
+    if fixes:
+        await conn.execute(
+            text(
+                "INSERT INTO task_counters(dim, key, n) VALUES (:d, :k, :n) "
+                "ON CONFLICT(dim, key) DO UPDATE SET n = excluded.n"
+            ),
+            fixes,
+        )
+    # строки с нулём не нужны ни сводке, ни следующей сверке
+    await conn.execute(text("DELETE FROM task_counters WHERE n = 0"))
+    return len(fixes)
+
+
+async def read_counters(session: AsyncSession | AsyncConnection) -> dict[tuple[str, str], int]:
+    res = await session.execute(text("SELECT dim, key, n FROM task_counters WHERE n <> 0"))
+    return {(d, k): int(n) for d, k, n in res.all()}
+
+
+def summarize(counters: dict[tuple[str, str], int]) -> dict[str, Any]:
+    """{(dim, key): n} → сводка для API/дашборда. Ключ '' (не задано) отдаём как "none"."""
+    out: dict[str, Any] = {
+        "total": counters.get(("total", ""), 0),
+        "processes": counters.get(("processes", ""), 0),
+        "by_status": {},
+        "by_process": {},
+        "by_assignee": {},
+    }
+    for (dim, key), n in counters.items():
+        bucket = out.get(f"by_{dim}")
+        if isinstance(bucket, dict):
+            bucket[key or "none"] = n
+    return out
+
+
+async def read_summary(session: AsyncSession | AsyncConnection) -> dict[str, Any]:
+    return summarize(await read_counters(session))
+
+
+__all__ = [
+    "DIMS",
+    "ensure_counter_triggers",
+    "reconcile_counters",
+    "read_counters",
+    "read_summary",
+    "summarize",
+]
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from datetime import timezone
+
 import sqlalchemy as sa
 from sqlalchemy import JSON, Text
 from sqlalchemy.dialects.postgresql import JSONB
@@ -32,3 +34,89 @@ def strip_postgres_jsonb_cast(expr: sa.sql.elements.TextClause | None):
     except Exception:
         pass
     return expr
+
+
+# ───────────────────────── Атомарный merge JSON-полей ─────────────────────────
+
+class json_merge(sa.sql.functions.FunctionElement):
+    """
+    json_merge(column, patch) — слияние JSON-объекта `patch` поверх значения колонки
+    прямо в UPDATE, без чтения строки в Python (и без гонки «прочитал-склеил-записал»).
+    Семантика одна на всех диалектах — ровно прежний dict.update:
+      - ключ верхнего уровня из patch заменяет значение целиком (вложенные объекты не сливаются)
+      - null в patch записывается как null (ключ не удаляется)
+    Реализации:
+      - SQLite     → пересборка объекта через json_each/json_group_object
+                     (json_patch не подходит: RFC 7396 сливает вложенные объекты рекурсивно
+                     и удаляет ключи со значением null)
+      - PostgreSQL → coalesce(col, '{}') || patch
+    """
+    type = JSON()
+    name = "json_merge"
+    inherit_cache = True
+
+    def __init__(self, target, patch) -> None:
+        if not isinstance(patch, sa.sql.ClauseElement):
+            patch = sa.type_coerce(patch, JSON_AUTO)
+        super().__init__(target, patch)
+
+
+def _json_merge_args(element, compiler, **kw) -> tuple[str, str]:
+    target, patch = list(element.clauses)
+    return compiler.process(target, **kw), compiler.process(patch, **kw)
+
+
+# JSON-текст значения из json_each: подтип JSON теряется в подзапросе, а true/false
+# json_each отдаёт как 1/0 — собираем текст сами и разбираем json() уже в агрегате
+_SQLITE_JSON_VALUE = (
+    "CASE type WHEN 'true' THEN 'true' WHEN 'false' THEN 'false' WHEN 'null' THEN 'null' "
+    "WHEN 'text' THEN json_quote(value) ELSE CAST(value AS TEXT) END"
+)
+
+
+@compiles(json_merge, "sqlite")
+def _compile_json_merge_sqlite(element, compiler, **kw) -> str:  # pragma: no cover
+    target, patch = _json_merge_args(element, compiler, **kw)
+    patch2 = compiler.process(list(element.clauses)[1], **kw)  # patch нужен дважды — второй bind
+    return (
+        "(SELECT json_group_object(k, json(v)) FROM ("
+        f"SELECT key AS k, {_SQLITE_JSON_VALUE} AS v FROM json_each(coalesce({target}, '{{}}')) "
+        f"WHERE key NOT IN (SELECT key FROM json_each({patch})) "
+        f"UNION ALL SELECT key, {_SQLITE_JSON_VALUE} FROM json_each({patch2})))"
+    )
+
+
+@compiles(json_merge, "postgresql")
+def _compile_json_merge_pg(element, compiler, **kw) -> str:  # pragma: no cover
+    target, patch = _json_merge_args(element, compiler, **kw)
+    return f"(coalesce({target}, '{{}}'::jsonb) || CAST({patch} AS JSONB))"
+
+
+@compiles(json_merge)
+def _compile_json_merge_default(element, compiler, **kw) -> str:  # pragma: no cover
+    raise sa.exc.CompileError(f"json_merge is not supported for dialect '{compiler.dialect.name}'")
+
+
+# ───────────────────────── Время в UTC ─────────────────────────
+
+class UTCDateTime(sa.types.TypeDecorator):
+    """
+    DateTime, который всегда пишет и читает UTC.
+    SQLite хранит DateTime строкой без смещения, поэтому значения в разных зонах
+    там сравнивались бы как строки «как есть» — приводим к UTC на входе
+    (в том числе параметры WHERE). Время без зоны трактуется как UTC.
+    """
+    impl = sa.DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
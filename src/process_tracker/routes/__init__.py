@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
 from typing import Sequence
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
 
+from ..core.async_utils import BackgroundTasks
 from ..core.config import settings
+from ..core.deadline import DeadlineExceeded
+from ..db.admission import AdmissionRejected
+from .deadline import DeadlineMiddleware, RouteDeadlines
 from .rate_limit import rate_limit
+from .response_cache import ResponseCache, ResponseCacheMiddleware
 
 # опциональные guard'ы (если есть реальная security)
 try:
@@ -20,8 +27,26 @@ except Exception:
 API_PREFIX = "/api/v1"
 
 
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    # фоновые задачи приложения живут ровно столько, сколько сервер
+    from ..services.stats_service import run_reconciler, run_stats_watcher
+    from ..core.cache import run_cache_invalidator
+    from ..services.board_service import run_board_rebalancer
+    from ..services.tags_service import run_tag_indexer
+    from ..services.suggest_service import run_suggest_indexer
+    async with BackgroundTasks() as bg:
+        bg.create(run_stats_watcher(), name="stats-watcher")
+        bg.create(run_reconciler(), name="stats-reconciler")
+        bg.create(run_cache_invalidator(), name="cache-invalidator")
+        bg.create(run_board_rebalancer(), name="board-rebalancer")
+        bg.create(run_tag_indexer(), name="tag-indexer")
+        bg.create(run_suggest_indexer(), name="suggest-indexer")
+        yield
+
+
 def build_api() -> FastAPI:
-    app = FastAPI(title="Process Tracker API", version="0.1.0")
+    app = FastAPI(title="Process Tracker API", version="0.1.0", lifespan=_lifespan)
 
     # CORS
     origins: Sequence[str] = settings.cors_origins or []
@@ -34,9 +59,29 @@ def build_api() -> FastAPI:
             allow_headers=["*"],
         )
 
+    # кэш ответов маршрутов с @cache_response (внутри gzip: уже сжатое GZip пропускает)
+    response_cache = ResponseCache(settings.response_cache_size, settings.response_cache_ttl)
+    app.state.response_cache = response_cache  # для /stats/cache
+    if settings.response_cache_size > 0:
+        app.add_middleware(ResponseCacheMiddleware, cache=response_cache)
+
     # gzip
     app.add_middleware(GZipMiddleware, minimum_size=1024)
 
+    # дедлайн запроса (routes/deadline.py) — снаружи всего, включая кэш и тело потоковых ответов
+    deadlines = RouteDeadlines(settings.request_deadline_default)
+    app.add_middleware(DeadlineMiddleware, deadlines=deadlines)
+
+    # БД перегружена (db/admission.py) — 503, клиент повторит позже
+    @app.exception_handler(AdmissionRejected)
+    async def _db_overloaded(_request: Request, exc: AdmissionRejected):
+        return JSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": "1"})
+
+    # бюджет запроса исчерпан (core/deadline.py) — 504, работа дальше не продолжается
+    @app.exception_handler(DeadlineExceeded)
+    async def _deadline_exceeded(_request: Request, exc: DeadlineExceeded):
+        return JSONResponse({"detail": str(exc)}, status_code=504)
+
     # system
     @app.get("/", tags=["system"])
     async def root():
@@ -55,6 +100,8 @@ def build_api() -> FastAPI:
                 tags=list(tags),
                 dependencies=[Depends(rate_limit)] + (guards or []),
             )
+            response_cache.register(API_PREFIX, router)
+            deadlines.register(API_PREFIX, router)
         except Exception:
             # модуль/роутер может отсутствовать — пропускаем тихо
             pass
@@ -66,6 +113,9 @@ def build_api() -> FastAPI:
     from .processes import router as processes_router
     add(processes_router, "processes")
 
+    from .users import router as users_router
+    add(users_router, "users")
+
     from .forms import router as forms_router
     add(forms_router, "forms")
 
@@ -95,6 +145,12 @@ def build_api() -> FastAPI:
     from .views import router as views_router
     add(views_router, "views")
 
+    from .board import router as board_router
+    add(board_router, "board")
+
+    from .tags import router as tags_router
+    add(tags_router, "tags")
+
     from .files import router as files_router
     add(files_router, "files")
 
@@ -104,6 +160,12 @@ def build_api() -> FastAPI:
     from .audit import router as audit_router
     add(audit_router, "audit")
 
+    from .search import router as search_router
+    add(search_router, "search")
+
+    from .stats import router as stats_router
+    add(stats_router, "stats")
+
     # auth — без общего префикса (он прилепится include_router-ом)
     from .auth import router as auth_router
     add(auth_router, "auth")
@@ -112,6 +174,7 @@ def build_api() -> FastAPI:
     try:
         from .events import router as events_router
         app.include_router(events_router, prefix=API_PREFIX, tags=["events"])
+        deadlines.register(API_PREFIX, events_router)
     except Exception:
         pass
 
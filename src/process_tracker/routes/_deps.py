@@ -1,15 +1,20 @@
 from __future__ import annotations
 
 from typing import AsyncGenerator, Iterable, Optional
-from fastapi import Depends, Header, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..db.session import AsyncSessionLocal
+from ..db.session import AsyncSessionLocal, AsyncWriteSessionLocal
 
 # --- DB session --------------------------------------------------------------
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with AsyncSessionLocal() as s:
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    # мутирующий запрос читает и пишет в одной транзакции писателя; чтения — в пул читателей
+    factory = AsyncSessionLocal if request.method in SAFE_METHODS else AsyncWriteSessionLocal
+    async with factory() as s:
         yield s
 
 
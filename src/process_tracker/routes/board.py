@@ -0,0 +1,134 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status as http_status
+from pydantic import BaseModel, model_validator
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.dal.keyset import InvalidCursor
+from ..db.dal.loaders import TASK_FIELDS, TASK_INCLUDES, parse_fieldset
+from ..services.board_service import BoardService
+from ._deps import get_db, CurrentUser, require_perm
+
+router = APIRouter(prefix="/board", tags=["board"])
+
+BOARD_LIMIT = 20
+BOARD_MAX_LIMIT = 100
+
+
+class BoardCard(BaseModel):
+    # с ?fields= / ?include= — только запрошенные ключи (+ id, status, rank)
+    id: int
+    title: Optional[str] = None
+    description: Optional[str] = None
+    status: str
+    assignee_id: int | None = None
+    process_id: int | None = None
+    type_id: int | None = None
+    fields: Optional[dict] = None
+    start_at: Optional[datetime] = None
+    due_at: Optional[datetime] = None
+    rank: Optional[str] = None
+    updated_at: Optional[datetime] = None
+    process: Optional[dict] = None
+    type: Optional[dict] = None
+    assignee: Optional[dict] = None
+
+
+class BoardColumn(BaseModel):
+    status: str
+    items: List[BoardCard]
+    next_cursor: Optional[str] = None
+    count: Optional[int] = None  # только при ?counts=true
+
+
+class BoardOut(BaseModel):
+    type_id: int | None = None
+    columns: List[BoardColumn]
+
+
+class MoveIn(BaseModel):
+    task_id: int
+    status: Optional[str] = None     # колонка назначения; по умолчанию — текущая
+    after_id: Optional[int] = None   # поставить после этой карточки
+    before_id: Optional[int] = None  # ...или перед этой; без обоих — в конец колонки
+
+    @model_validator(mode="after")
+    def _one_anchor(self):
+        if self.after_id is not None and self.before_id is not None:
+            raise ValueError("use either after_id or before_id")
+        return self
+
+
+class MoveOut(BaseModel):
+    id: int
+    status: str
+    rank: str
+    type_id: int | None = None
+
+
+def _column_cursors(request: Request) -> dict[str, str]:
+    """Курсоры отдельных колонок: `cursor.<status>=...` (next_cursor этой колонки)."""
+    return {
+        name[len("cursor."):]: value
+        for name, value in request.query_params.multi_items()
+        if name.startswith("cursor.") and value
+    }
+
+
+@router.get("", response_model=BoardOut, response_model_exclude_unset=True)
+async def get_board(
+    request: Request,
+    type_id: Optional[int] = Query(None, description="доска типа задач; без него — задачи без типа"),
+    status: Optional[List[str]] = Query(None, description="колонки; по умолчанию — TaskType.statuses"),
+    limit: int = Query(BOARD_LIMIT, ge=1, le=BOARD_MAX_LIMIT, description="карточек на колонку"),
+    assignee_id: Optional[int] = Query(None),
+    process_id: Optional[int] = Query(None),
+    counts: bool = Query(False, description="посчитать карточки в колонках"),
+    fields: Optional[str] = Query(None, description="через запятую: поля карточки, напр. id,title"),
+    include: Optional[str] = Query(None, description="через запятую: связи process, type, assignee"),
+    db: AsyncSession = Depends(get_db),
+    user=CurrentUser,  # type: ignore
+):
+    """
+    Вся доска за один запрос: по колонке на статус, в каждой — первые `limit`
+    карточек по рангу и next_cursor. Догрузка колонки — тот же запрос
+    с `status=<колонка>&cursor.<колонка>=<next_cursor>`.
+    """
+    require_perm(user, "task.read")
+    try:
+        only = parse_fieldset(fields, TASK_FIELDS)
+        rels = parse_fieldset(include, TASK_INCLUDES, what="include") or ()
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
+    try:
+        return await BoardService(db).board(
+            type_id=type_id,
+            statuses=status,
+            limit=limit,
+            cursors=_column_cursors(request),
+            assignee_id=assignee_id,
+            process_id=process_id,
+            with_counts=counts,
+            fields=only,
+            include=rels,
+        )
+    except KeyError:
+        raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="task type not found")
+    except InvalidCursor:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail="invalid cursor")
+
+
+@router.post("/move", response_model=MoveOut)
+async def move_card(body: MoveIn, db: AsyncSession = Depends(get_db), user=CurrentUser):  # type: ignore
+    """Перенос карточки между/внутри колонок — UPDATE одной строки (status + rank)."""
+    require_perm(user, "task.update")
+    try:
+        moved = await BoardService(db).move(
+            body.task_id, status=body.status, after_id=body.after_id, before_id=body.before_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_409_CONFLICT, detail=str(e))
+    if moved is None:
+        raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="task not found")
+    return moved
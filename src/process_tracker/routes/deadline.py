@@ -0,0 +1,84 @@
+from __future__ import annotations
+"""
+Дедлайн HTTP-запроса (core/deadline.py): откуда он берётся для маршрутов API.
+
+    @router.get("/search")
+    @with_deadline(5)          # интерактивный маршрут — короче общего умолчания
+    async def search(...): ...
+
+    @router.get("/export")
+    @with_deadline(None)       # поток: без умолчания (остаётся только заголовок клиента)
+    async def export(...): ...
+
+- бюджет = меньшее из X-Request-Deadline клиента и умолчания маршрута
+  (или settings.request_deadline_default, если маршрут его не объявил)
+- middleware ставит дедлайн в contextvar на весь запрос, включая тело StreamingResponse;
+  BaseRepo, core/async_utils.wait_for/retry и исходящие HTTP берут из него остаток
+- исчерпанный бюджет — DeadlineExceeded, build_api отвечает 504
+"""
+
+from typing import Any, Callable, Optional
+
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..core.deadline import HEADER, deadline_scope, parse_header
+
+_DEADLINE_ATTR = "__request_deadline__"
+_UNSET = object()
+
+
+def with_deadline(seconds: Optional[float]) -> Callable:
+    """Умолчание дедлайна маршрута (сек); None — без умолчания."""
+
+    def deco(fn: Callable) -> Callable:
+        setattr(fn, _DEADLINE_ATTR, seconds)
+        return fn
+
+    return deco
+
+
+class RouteDeadlines:
+    """Таблица маршрутов с @with_deadline; наполняется в build_api через register()."""
+
+    def __init__(self, default: Optional[float] = None) -> None:
+        self.default = default if default and default > 0 else None
+        self._routes: list[tuple[Any, frozenset[str], Optional[float]]] = []  # (regex пути, методы, умолчание)
+
+    def register(self, prefix: str, router: Any) -> None:
+        """Запомнить маршруты роутера с @with_deadline (путь — с префиксом подключения)."""
+        for r in router.routes:
+            seconds = getattr(getattr(r, "endpoint", None), _DEADLINE_ATTR, _UNSET)
+            if isinstance(r, APIRoute) and seconds is not _UNSET:
+                regex, _, _ = compile_path(prefix + r.path)
+                self._routes.append((regex, frozenset(r.methods or ()), seconds))
+
+    def match(self, method: str, path: str) -> Optional[float]:
+        for regex, methods, seconds in self._routes:
+            if method in methods and regex.match(path):
+                return seconds
+        return self.default
+
+
+class DeadlineMiddleware:
+    """ASGI-middleware: дедлайн запроса = min(X-Request-Deadline, умолчание маршрута)."""
+
+    def __init__(self, app: ASGIApp, deadlines: RouteDeadlines) -> None:
+        self.app = app
+        self.deadlines = deadlines
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        seconds = self.deadlines.match(scope["method"], scope["path"])
+        asked = parse_header(Headers(scope=scope).get(HEADER))
+        if asked is not None:
+            seconds = asked if seconds is None else min(seconds, asked)
+        with deadline_scope(seconds):
+            await self.app(scope, receive, send)
+
+
+__all__ = ["with_deadline", "RouteDeadlines", "DeadlineMiddleware"]
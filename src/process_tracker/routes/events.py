@@ -5,6 +5,8 @@ from typing import AsyncGenerator, Optional
 from fastapi import APIRouter, Query
 from fastapi.responses import StreamingResponse
 
+from .deadline import with_deadline
+
 router = APIRouter(tags=["events"])
 
 # Попытка взять реальный bus; иначе — локальная очередь
@@ -56,5 +58,6 @@ async def _event_stream(topic: Optional[str]) -> AsyncGenerator[bytes, None]:
             pass
 
 @router.get("/events/stream")
+@with_deadline(None)  # поток: живёт дольше общего умолчания
 async def sse_stream(topic: Optional[str] = Query(None)):
     return StreamingResponse(_event_stream(topic), media_type="text/event-stream")
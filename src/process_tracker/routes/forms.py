@@ -2,20 +2,27 @@ from __future__ import annotations
 
 from typing import Any, List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..db.session import AsyncSessionLocal
+from ..core.events import events
+from ..db.session import AsyncSessionLocal, AsyncWriteSessionLocal
 from ..db.models import FormDef
+from ..services.export_service import MEDIA_TYPES, ExportFormat, export_submissions
+from ._deps import SAFE_METHODS, CurrentUser, require_perm
+from .deadline import with_deadline
+from .response_cache import cache_response
 
 router = APIRouter(prefix="/forms", tags=["forms"])
 
 
 # --- DI session --------------------------------------------------------------
-async def get_session() -> AsyncSession:
-    async with AsyncSessionLocal() as s:
+async def get_session(request: Request) -> AsyncSession:
+    factory = AsyncSessionLocal if request.method in SAFE_METHODS else AsyncWriteSessionLocal
+    async with factory() as s:
         yield s
 
 
@@ -40,6 +47,7 @@ class FormDefOut(BaseModel):
 
 # --- Routes -----------------------------------------------------------------
 @router.get("/defs", response_model=List[FormDefOut])
+@cache_response("forms")
 async def list_defs(session: AsyncSession = Depends(get_session)):
     res = await session.execute(select(FormDef).order_by(FormDef.id.desc()))
     items = list(res.scalars().all())
@@ -66,12 +74,14 @@ async def create_def(payload: FormDefIn, session: AsyncSession = Depends(get_ses
         item.meta = payload.meta or {}
         await session.commit()
         await session.refresh(item)
+        await events.publish({"type": "form_def_updated", "key": item.key})
         return FormDefOut.from_orm_row(item)
 
     item = FormDef(key=payload.key, title=payload.title, schema=payload.schema, meta=payload.meta or {})
     session.add(item)
     await session.commit()
     await session.refresh(item)
+    await events.publish({"type": "form_def_created", "key": item.key})
     return FormDefOut.from_orm_row(item)
 
 
@@ -87,6 +97,7 @@ async def update_def(key: str, payload: FormDefIn, session: AsyncSession = Depen
     item.meta = payload.meta or {}
     await session.commit()
     await session.refresh(item)
+    await events.publish({"type": "form_def_updated", "key": item.key, "old_key": key})
     return FormDefOut.from_orm_row(item)
 
 
@@ -98,3 +109,20 @@ async def delete_def(key: str, session: AsyncSession = Depends(get_session)):
         return
     await session.delete(item)
     await session.commit()
+    await events.publish({"type": "form_def_deleted", "key": key})
+
+
+@router.get("/submissions/export")
+@with_deadline(None)  # поток: живёт дольше общего умолчания
+async def export_submissions_route(
+    format: ExportFormat = Query("ndjson"),
+    form_key: str | None = Query(None, description="Только ответы этой формы"),
+    user=CurrentUser,  # type: ignore
+):
+    """Все ответы форм потоком (NDJSON/CSV), память не зависит от объёма."""
+    require_perm(user, "form.read")
+    return StreamingResponse(
+        export_submissions(format, form_key=form_key),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="form_submissions.{format}"'},
+    )
@@ -1,11 +1,25 @@
 from __future__ import annotations
-from typing import List, Optional
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status as http_status
 from pydantic import BaseModel, Field
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..core.async_utils import single_flight
+from ..core.events import events
 from ..db.models import Process
+from ..db.dal.keyset import DEFAULT_LIMIT, MAX_LIMIT, InvalidCursor
+from ..db.dal.loaders import parse_fieldset
+from ..db.dal.process_repo import PROCESS_FIELDS, ProcessRepo
+from ..services.suggest_service import SUGGEST_LIMIT, SUGGEST_MAX_LIMIT, suggest
+from ..services.import_service import (
+    IMPORT_CHUNK,
+    ImportFormat,
+    detect_format,
+    get_import_job,
+    spool_upload,
+    start_import_job,
+)
 from ._deps import get_db, CurrentUser, require_perm
 
 router = APIRouter(prefix="/processes", tags=["processes"])
@@ -17,21 +31,85 @@ class ProcessIn(BaseModel):
     status: str = "active"
 
 
+class ProcessRollupOut(BaseModel):
+    open: int
+    done: int
+    overdue: int  # не закрыта и due_at в прошлом
+
+
 class ProcessOut(BaseModel):
     id: int
     name: str
     description: Optional[str] = None
     status: str
+    last_activity_at: Optional[datetime] = None
+    tasks: Optional[ProcessRollupOut] = None  # только с ?with=rollups
+
+
+class ProcessItemOut(BaseModel):
+    # с ?fields= — только запрошенные ключи (+ tasks при ?with=rollups)
+    id: int
+    name: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+    last_activity_at: Optional[datetime] = None
+    tasks: Optional[ProcessRollupOut] = None
 
 
-@router.get("", response_model=List[ProcessOut])
-async def list_processes(db: AsyncSession = Depends(get_db), user=CurrentUser):  # type: ignore
+class ProcessPage(BaseModel):
+    items: List[ProcessItemOut]
+    next_cursor: Optional[str] = None  # None — дальше страниц нет
+
+
+@router.get("", response_model=ProcessPage, response_model_exclude_unset=True)
+@single_flight
+async def list_processes(
+    with_: Optional[Literal["rollups"]] = Query(None, alias="with", description="rollups — счётчики задач процесса"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="next_cursor из предыдущей страницы"),
+    fields: Optional[str] = Query(None, description="через запятую: только эти поля, напр. id,name"),
+    db: AsyncSession = Depends(get_db),
+    user=CurrentUser,  # type: ignore
+):
+    """Процессы по последней активности (своей или любой из задач), keyset-пагинация."""
     require_perm(user, "process.read")
-    rows = (await db.execute(select(Process))).scalars().all()
-    return [
-        ProcessOut(id=r.id, name=r.name, description=r.description, status=r.status)
-        for r in rows
-    ]
+    rollups = with_ == "rollups"
+    try:
+        only = parse_fieldset(fields, PROCESS_FIELDS)
+        rows, next_cursor = await ProcessRepo(db).page(limit=limit, cursor=cursor, rollups=rollups, fields=only)
+    except InvalidCursor:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail="invalid cursor")
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
+    keys = tuple(dict.fromkeys(("id", *only))) if only is not None else tuple(PROCESS_FIELDS)
+    items = []
+    for r in rows:
+        item = {k: r[k] for k in keys}
+        if rollups or only is None:
+            item["tasks"] = ProcessRollupOut(
+                open=r["tasks_total"] - r["tasks_done"],
+                done=r["tasks_done"],
+                overdue=r["tasks_overdue"],
+            ) if rollups else None
+        items.append(ProcessItemOut(**item))
+    return ProcessPage(items=items, next_cursor=next_cursor)
+
+
+class ProcessSuggestOut(BaseModel):
+    id: int
+    name: str
+    status: str
+
+
+@router.get("/suggest", response_model=List[ProcessSuggestOut])
+async def suggest_processes(
+    prefix: str = Query("", max_length=200),
+    limit: int = Query(SUGGEST_LIMIT, ge=1, le=SUGGEST_MAX_LIMIT),
+    user=CurrentUser,  # type: ignore
+):
+    """Подсказки по началу названия (или любого слова в нём); из индекса в памяти."""
+    require_perm(user, "process.read")
+    return await suggest("processes", prefix, limit)
 
 
 @router.post("", response_model=ProcessOut)
@@ -41,4 +119,38 @@ async def create_process(body: ProcessIn, db: AsyncSession = Depends(get_db), us
     db.add(obj)
     await db.commit()
     await db.refresh(obj)
-    return ProcessOut(id=obj.id, name=obj.name, description=obj.description, status=obj.status)
+    await events.publish({"type": "process_created", "id": obj.id, "name": obj.name})
+    return ProcessOut(
+        id=obj.id, name=obj.name, description=obj.description, status=obj.status,
+        last_activity_at=obj.last_activity_at,
+    )
+
+
+# --- import ------------------------------------------------------------------
+
+@router.post("/import", status_code=http_status.HTTP_202_ACCEPTED)
+async def import_processes(
+    file: UploadFile = File(...),
+    format: Optional[ImportFormat] = Query(None, description="ndjson|csv; по умолчанию — по расширению"),
+    chunk_size: int = Query(IMPORT_CHUNK, ge=1, le=10_000),
+    start_chunk: int = Query(0, ge=0, description="resume_from прошлого запуска"),
+    user=CurrentUser,  # type: ignore
+):
+    """Загрузка файла и фоновый импорт; прогресс — GET /processes/import/{job_id}."""
+    require_perm(user, "process.create")
+    try:
+        fmt = detect_format(file.filename, format)
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
+    path = await spool_upload(file, suffix=f".{fmt}")
+    job = start_import_job(path, "processes", fmt, chunk_size=chunk_size, start_chunk=start_chunk)
+    return job.to_dict()
+
+
+@router.get("/import/{job_id}")
+async def import_processes_status(job_id: str, user=CurrentUser):  # type: ignore
+    require_perm(user, "process.create")
+    job = get_import_job(job_id)
+    if not job or job.kind != "processes":
+        raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="import job not found")
+    return job.to_dict()
@@ -0,0 +1,208 @@
+from __future__ import annotations
+"""
+Кэш готовых ответов для «справочных» GET-эндпоинтов (типы задач, формы, шаблоны, блюпринты).
+
+Маршрут объявляет политику декоратором, build_api регистрирует такие маршруты при подключении роутера:
+
+    @router.get("", response_model=...)
+    @cache_response("task_types")
+    async def list_task_types(...): ...
+
+- тело хранится готовыми байтами: как есть и сжатое gzip — повторная сериализация
+  и сжатие не делаются; GZipMiddleware уже сжатый ответ пропускает без изменений
+- сильный ETag (хэш тела), If-None-Match → 304 без тела
+- инвалидация — поколениями ресурсов core/cache.py: событие шины (task_type_*, form_*,
+  template_*, blueprint_*) двигает поколение, запись с другим поколением — промах.
+  Поколения снимаются ДО вызова обработчика: ответ, собранный параллельно с записью,
+  при следующем запросе уже не найдётся. TTL — только страховка
+- ключ: путь + query + заголовки авторизации (ответ одного пользователя другому не отдаётся);
+  кэшируются только 200 без Set-Cookie, остальные ответы проходят как есть
+"""
+
+import gzip
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Sequence
+
+from fastapi.routing import APIRoute
+from starlette.routing import compile_path
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..core.cache import LRUCache, generation
+
+# заголовки, от которых зависит ответ (кто спрашивает)
+DEFAULT_VARY = ("authorization", "cookie", "x-user-perms")
+GZIP_MIN_SIZE = 1024  # как у GZipMiddleware в build_api
+_POLICY_ATTR = "__response_cache__"
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    resources: tuple[str, ...]
+    ttl: Optional[float] = None
+    vary: tuple[str, ...] = DEFAULT_VARY
+
+
+@dataclass(frozen=True)
+class _Entry:
+    generations: tuple[int, ...]
+    headers: tuple[tuple[bytes, bytes], ...]  # без content-length / content-encoding / etag / x-ratelimit-*
+    body: bytes
+    body_gz: Optional[bytes]
+    etag: bytes
+    etag_gz: bytes
+    expires_at: Optional[float] = None
+
+
+def cache_response(*resources: str, ttl: Optional[float] = None, vary: Sequence[str] = DEFAULT_VARY) -> Callable:
+    """Политика кэша маршрута: ресурсы, от которых зависит ответ, и необязательный TTL (сек)."""
+    policy = CachePolicy(tuple(resources), ttl, tuple(h.lower() for h in vary))
+
+    def deco(fn: Callable) -> Callable:
+        setattr(fn, _POLICY_ATTR, policy)
+        return fn
+
+    return deco
+
+
+def _etag(body: bytes, suffix: str = "") -> bytes:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}{suffix}"'.encode()
+
+
+def _matches(if_none_match: Optional[str], *etags: bytes) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    sent = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return any(e.decode() in sent for e in etags)
+
+
+class ResponseCache:
+    """Хранилище ответов + таблица маршрутов с политикой; наполняется в build_api через register()."""
+
+    def __init__(self, size: int = 512, ttl: Optional[float] = None) -> None:
+        self.entries = LRUCache(size)
+        self.ttl = ttl
+        self._routes: list[tuple[Any, CachePolicy]] = []  # (regex полного пути, политика)
+        self.hits = self.misses = self.not_modified = 0
+
+    def register(self, prefix: str, router: Any) -> None:
+        """Запомнить GET-маршруты роутера с @cache_response (путь — с префиксом подключения)."""
+        for r in router.routes:
+            policy = getattr(getattr(r, "endpoint", None), _POLICY_ATTR, None)
+            if isinstance(r, APIRoute) and policy is not None and "GET" in r.methods:
+                regex, _, _ = compile_path(prefix + r.path)
+                self._routes.append((regex, policy))
+
+    def match(self, path: str) -> Optional[CachePolicy]:
+        for regex, policy in self._routes:
+            if regex.match(path):
+                return policy
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries._data),
+            "capacity": self.entries.size,
+            "routes": len(self._routes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class ResponseCacheMiddleware:
+    """ASGI-middleware: отдаёт ответы маршрутов с политикой cache_response() из ResponseCache."""
+
+    def __init__(self, app: ASGIApp, cache: ResponseCache) -> None:
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        policy = self.cache.match(scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+        cache = self.cache
+
+        headers = Headers(scope=scope)
+        key = (
+            scope["path"],
+            scope.get("query_string", b""),
+            tuple(headers.get(h, "") for h in policy.vary),
+        )
+        gens = tuple(generation(r) for r in policy.resources)
+        accepts_gzip = "gzip" in headers.get("accept-encoding", "")
+
+        entry: Optional[_Entry] = cache.entries.get(key)
+        if entry is not None and (
+            entry.generations != gens or (entry.expires_at is not None and time.monotonic() > entry.expires_at)
+        ):
+            entry = None
+        if entry is not None:
+            cache.hits += 1
+            await self._send(entry, headers, accepts_gzip, send)
+            return
+        cache.misses += 1
+
+        # промах: ответ обработчика собираем целиком, кладём в кэш и отдаём как из кэша
+        start: dict[str, Any] = {}
+        chunks: list[bytes] = []
+
+        async def capture(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        body = b"".join(chunks)
+        raw_headers = list(start.get("headers", []))
+        names = {k.lower() for k, _ in raw_headers}
+        status = start.get("status", 500)
+        if status != 200 or b"set-cookie" in names or b"content-encoding" in names:
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+        ttl = policy.ttl if policy.ttl is not None else cache.ttl
+        entry = self._entry(gens, raw_headers, body, time.monotonic() + ttl if ttl else None)
+        cache.entries.put(key, entry)
+        await self._send(entry, headers, accepts_gzip, send)
+
+    @staticmethod
+    def _entry(gens: tuple[int, ...], raw_headers: list, body: bytes, expires_at: Optional[float]) -> _Entry:
+        skip = {b"content-length", b"content-encoding", b"etag"}
+        # X-RateLimit-* относятся к конкретному запросу, а не к ответу
+        kept = tuple((k, v) for k, v in raw_headers if k.lower() not in skip and not k.lower().startswith(b"x-ratelimit"))
+        body_gz = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_SIZE else None
+        return _Entry(gens, kept, body, body_gz, _etag(body), _etag(body, "-gzip"), expires_at)
+
+    async def _send(self, entry: _Entry, req: Headers, accepts_gzip: bool, send: Send) -> None:
+        use_gz = accepts_gzip and entry.body_gz is not None
+        body, etag = (entry.body_gz, entry.etag_gz) if use_gz else (entry.body, entry.etag)
+        out = MutableHeaders(raw=list(entry.headers))
+        out["etag"] = etag.decode()
+        out["cache-control"] = "private, no-cache"  # клиент хранит, но каждый раз сверяет ETag
+        out.add_vary_header("Accept-Encoding")
+        if _matches(req.get("if-none-match"), entry.etag, entry.etag_gz):
+            self.cache.not_modified += 1
+            del out["content-type"]
+            await send({"type": "http.response.start", "status": 304, "headers": out.raw})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        if use_gz:
+            out["content-encoding"] = "gzip"
+        out["content-length"] = str(len(body))
+        await send({"type": "http.response.start", "status": 200, "headers": out.raw})
+        await send({"type": "http.response.body", "body": body})
+
+
+__all__ = ["CachePolicy", "cache_response", "ResponseCache", "ResponseCacheMiddleware", "DEFAULT_VARY"]
@@ -0,0 +1,56 @@
+from __future__ import annotations
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.search import SEARCH_KINDS, has_search_index, search
+from ._deps import get_db, CurrentUser, require_perm
+from .deadline import with_deadline
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+# какое право нужно, чтобы видеть документы этого типа в выдаче
+_KIND_PERMS = {"task": "task.read", "process": "process.read", "form": "form.read", "template": "template.read"}
+
+
+class SearchHit(BaseModel):
+    kind: str
+    id: int
+    title: str
+    score: float
+
+
+class SearchOut(BaseModel):
+    q: str
+    items: List[SearchHit]
+
+
+@router.get("", response_model=SearchOut)
+@with_deadline(5.0)  # подсказки при наборе: устаревший ответ никому не нужен
+async def search_all(
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Optional[List[str]] = Query(None, description=f"Фильтр по типам: {', '.join(SEARCH_KINDS)}"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    user=CurrentUser,  # type: ignore
+):
+    """
+    Поиск для командной палитры и фильтров: слова q ищутся как префиксы
+    по title/description задач, имени процессов, заголовкам форм и шаблонов.
+    503 — индекса нет (SQLite без FTS5: init_db пропускает его схему).
+    """
+    kinds = [k for k in (kind or SEARCH_KINDS) if k in _KIND_PERMS]
+    allowed = []
+    for k in kinds:
+        try:
+            require_perm(user, _KIND_PERMS[k])
+            allowed.append(k)
+        except HTTPException:
+            continue  # без права на тип — просто не показываем его документы
+    if not allowed:
+        return SearchOut(q=q, items=[])
+    if not await has_search_index(db):
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="full-text search is not available")
+    hits = await search(db, q, kinds=allowed, limit=limit)
+    return SearchOut(q=q, items=[SearchHit(**h) for h in hits])
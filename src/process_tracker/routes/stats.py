@@ -0,0 +1,49 @@
+from __future__ import annotations
+from typing import Any, Dict
+from fastapi import APIRouter, Depends, Request
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.async_utils import single_flight, singleflight
+from ..db.admission import admission_stats
+from ..db.entity_cache import entity_cache
+from ..db.stats import read_summary
+from ._deps import get_db, CurrentUser, require_perm
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+
+class StatsSummary(BaseModel):
+    total: int
+    processes: int
+    by_status: Dict[str, int]
+    by_process: Dict[str, int]   # "none" — задачи без процесса
+    by_assignee: Dict[str, int]  # "none" — без исполнителя
+
+
+@router.get("/summary", response_model=StatsSummary)
+@single_flight
+async def stats_summary(db: AsyncSession = Depends(get_db), user=CurrentUser):  # type: ignore
+    """Сводка для дашборда: один SELECT по task_counters, без сканов tasks.
+    Изменения приходят дельтами событием task_stats (SSE/WS)."""
+    require_perm(user, "task.read")
+    return StatsSummary(**await read_summary(db))
+
+
+@router.get("/cache")
+async def stats_cache(request: Request, user=CurrentUser) -> Dict[str, Any]:  # type: ignore
+    """Счётчики кэшей: сущностей (db/entity_cache.py), ответов (routes/response_cache.py), single-flight."""
+    require_perm(user, "task.read")
+    responses = getattr(request.app.state, "response_cache", None)
+    return {
+        "entities": entity_cache.stats(),
+        "responses": responses.stats() if responses else None,
+        "single_flight": singleflight.stats(),
+    }
+
+
+@router.get("/db")
+async def stats_db(user=CurrentUser) -> Dict[str, Any]:  # type: ignore
+    """Admission control БД (db/admission.py): лимит, в работе, очередь, ожидание слота, отказы."""
+    require_perm(user, "task.read")
+    return {"admission": admission_stats()}
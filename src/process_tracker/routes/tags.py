@@ -0,0 +1,123 @@
+from __future__ import annotations
+import re
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status as http_status
+from pydantic import BaseModel, Field
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..services.tags_service import TagsService
+from ._deps import get_db, CurrentUser, require_perm
+from .tasks import TaskOut
+
+router = APIRouter(prefix="/tags", tags=["tags"])
+
+# кавычки и скобки — синтаксис выражений фильтра
+_NAME_PATTERN = r'^[^"()\s](?:[^"()]*[^"()\s])?$'
+_NAME_RE = re.compile(_NAME_PATTERN)
+
+
+class TagIn(BaseModel):
+    name: str = Field(..., max_length=64, pattern=_NAME_PATTERN)
+    color: Optional[str] = Field(default=None, max_length=16)
+
+
+class TagPatch(BaseModel):
+    name: Optional[str] = Field(default=None, max_length=64, pattern=_NAME_PATTERN)
+    color: Optional[str] = Field(default=None, max_length=16)
+
+
+class TagOut(BaseModel):
+    id: int
+    name: str
+    color: Optional[str] = None
+    tasks: int = 0  # задач с этой меткой (по индексу)
+
+
+class TaskTagsIn(BaseModel):
+    tags: List[str] = Field(default_factory=list, max_length=100)
+
+
+class TaskTagsOut(BaseModel):
+    task_id: int
+    tags: List[str]
+
+
+class TaggedTaskOut(TaskOut):
+    tags: List[str] = []
+
+
+class TaggedTaskPage(BaseModel):
+    total: int
+    items: List[TaggedTaskOut]
+    next_cursor: Optional[str] = None
+
+
+@router.get("", response_model=List[TagOut])
+async def list_tags(db: AsyncSession = Depends(get_db), user=CurrentUser):  # type: ignore
+    require_perm(user, "task.read")
+    return await TagsService(db).list()
+
+
+@router.post("", response_model=TagOut, status_code=http_status.HTTP_201_CREATED)
+async def create_tag(body: TagIn, db: AsyncSession = Depends(get_db), user=CurrentUser):  # type: ignore
+    require_perm(user, "task.update")
+    try:
+        return await TagsService(db).create(body.name, body.color)
+    except IntegrityError:
+        raise HTTPException(status_code=http_status.HTTP_409_CONFLICT, detail="tag already exists")
+
+
+@router.get("/tasks", response_model=TaggedTaskPage)
+async def tasks_by_tags(
+    q: str = Query(..., min_length=1, max_length=1000, description='например: urgent AND (backend OR "api v2") AND NOT status:done'),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor из предыдущей страницы"),
+    db: AsyncSession = Depends(get_db),
+    user=CurrentUser,  # type: ignore
+):
+    """
+    Задачи по булеву выражению над метками: AND / OR / NOT, скобки, "метка с пробелами",
+    а также status:<статус> и assignee:<id|none>. Соседние термы без оператора — AND.
+    Выражение считается по битмапам в памяти; страница (ORDER BY id DESC) гидрируется из БД.
+    """
+    require_perm(user, "task.read")
+    try:
+        return await TagsService(db).query(q, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.put("/tasks/{task_id}", response_model=TaskTagsOut)
+async def set_task_tags(task_id: int, body: TaskTagsIn, db: AsyncSession = Depends(get_db), user=CurrentUser):  # type: ignore
+    """Заменить набор меток задачи; неизвестные метки создаются."""
+    require_perm(user, "task.update")
+    for name in body.tags:
+        if len(name) > 64 or not _NAME_RE.match(name):
+            raise HTTPException(status_code=http_status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"invalid tag name '{name}'")
+    try:
+        tags = await TagsService(db).set_task_tags(task_id, body.tags)
+    except IntegrityError:
+        raise HTTPException(status_code=http_status.HTTP_409_CONFLICT, detail="concurrent tag update, retry")
+    if tags is None:
+        raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="task not found")
+    return TaskTagsOut(task_id=task_id, tags=tags)
+
+
+@router.patch("/{tag_id}", response_model=TagOut)
+async def update_tag(tag_id: int, body: TagPatch, db: AsyncSession = Depends(get_db), user=CurrentUser):  # type: ignore
+    require_perm(user, "task.update")
+    try:
+        tag = await TagsService(db).update(tag_id, body.model_dump(exclude_unset=True))
+    except IntegrityError:
+        raise HTTPException(status_code=http_status.HTTP_409_CONFLICT, detail="tag already exists")
+    if tag is None:
+        raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="tag not found")
+    return tag
+
+
+@router.delete("/{tag_id}", status_code=http_status.HTTP_204_NO_CONTENT)
+async def delete_tag(tag_id: int, db: AsyncSession = Depends(get_db), user=CurrentUser):  # type: ignore
+    require_perm(user, "task.update")
+    if not await TagsService(db).delete(tag_id):
+        raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="tag not found")
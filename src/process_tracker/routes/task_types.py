@@ -1,12 +1,16 @@
 from __future__ import annotations
 from typing import List
-from fastapi import APIRouter, Depends
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel, Field, field_validator
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..core.events import events
 from ..db.models import TaskType
+from ..db.field_indexes import specs_from_default_fields, sync_field_indexes
+from ..services.suggest_service import SUGGEST_LIMIT, SUGGEST_MAX_LIMIT, suggest
 from ._deps import get_db, CurrentUser, require_perm
+from .response_cache import cache_response
 
 router = APIRouter(prefix="/task-types", tags=["task-types"])
 
@@ -18,12 +22,20 @@ class TaskTypeIn(BaseModel):
     statuses: list[str] | None = None
     permissions: list[str] | None = None
 
+    @field_validator("default_fields")
+    @classmethod
+    def _check_indexed(cls, v: dict | None) -> dict | None:
+        # {"estimate": {"type": "number", "indexed": true}} — ключ/тип должны годиться для индекса
+        specs_from_default_fields(v)
+        return v
+
 
 class TaskTypeOut(TaskTypeIn):
     id: int
 
 
 @router.get("", response_model=List[TaskTypeOut])
+@cache_response("task_types")
 async def list_task_types(db: AsyncSession = Depends(get_db), user=CurrentUser):  # type: ignore
     require_perm(user, "task_type.read")
     rows = (await db.execute(select(TaskType))).scalars().all()
@@ -40,6 +52,23 @@ async def list_task_types(db: AsyncSession = Depends(get_db), user=CurrentUser):
     ]
 
 
+class TaskTypeSuggestOut(BaseModel):
+    id: int
+    key: str
+    title: str
+
+
+@router.get("/suggest", response_model=List[TaskTypeSuggestOut])
+async def suggest_task_types(
+    prefix: str = Query("", max_length=200),
+    limit: int = Query(SUGGEST_LIMIT, ge=1, le=SUGGEST_MAX_LIMIT),
+    user=CurrentUser,  # type: ignore
+):
+    """Подсказки по началу key / title; из индекса в памяти."""
+    require_perm(user, "task_type.read")
+    return await suggest("task_types", prefix, limit)
+
+
 @router.post("", response_model=TaskTypeOut)
 async def create_task_type(body: TaskTypeIn, db: AsyncSession = Depends(get_db), user=CurrentUser):  # type: ignore
     require_perm(user, "task_type.create")
@@ -52,7 +81,12 @@ async def create_task_type(body: TaskTypeIn, db: AsyncSession = Depends(get_db),
     )
     db.add(obj)
     await db.commit()
+    if specs_from_default_fields(obj.default_fields):
+        # новый индексируемый ключ → expression-индекс по tasks.fields
+        await sync_field_indexes(await db.connection())
+        await db.commit()
     await db.refresh(obj)
+    await events.publish({"type": "task_type_created", "id": obj.id, "key": obj.key})
     return TaskTypeOut(
         id=obj.id,
         key=obj.key,
@@ -1,26 +1,86 @@
 from __future__ import annotations
-from typing import List, Optional
-from fastapi import APIRouter, Depends
-from pydantic import BaseModel, Field
-from sqlalchemy import select
+from datetime import datetime, timezone
+from typing import Any, Iterable, List, Literal, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status as http_status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..core.async_utils import single_flight
+from ..core.events import events
 from ..db.models import Task
+from ..db.dal.loaders import TASK_FIELDS, TASK_INCLUDES, parse_fieldset, shape_task_row
+from ..db.dal.task_repo import DETAIL_INCLUDES, TaskRepo
+from ..services.task_service import TaskService
+from ..services.export_service import MEDIA_TYPES, ExportFormat, export_tasks
+from ..services.facets_service import task_facets
+from ..services.import_service import (
+    IMPORT_CHUNK,
+    ImportFormat,
+    detect_format,
+    get_import_job,
+    spool_upload,
+    start_import_job,
+)
+from ..db.dal.keyset import DEFAULT_LIMIT, MAX_LIMIT, InvalidCursor
+from ..db.field_indexes import FILTER_OPS, coerce_value, kind_for, validate_key
 from ._deps import get_db, CurrentUser, require_perm
+from .deadline import with_deadline
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
 
-class TaskIn(BaseModel):
+def _as_utc(v: Optional[datetime]) -> Optional[datetime]:
+    if v is None:
+        return None
+    return v.replace(tzinfo=timezone.utc) if v.tzinfo is None else v.astimezone(timezone.utc)
+
+
+class _TaskDates(BaseModel):
+    # даты календаря/ганта — колонки Task.start_at/due_at; без зоны — UTC
+    start_at: Optional[datetime] = None
+    due_at: Optional[datetime] = None
+
+    @field_validator("start_at", "due_at")
+    @classmethod
+    def _utc(cls, v: Optional[datetime]) -> Optional[datetime]:
+        return _as_utc(v)
+
+    @model_validator(mode="after")
+    def _ordered(self):
+        if self.start_at and self.due_at and self.start_at > self.due_at:
+            raise ValueError("start_at must not be later than due_at")
+        return self
+
+
+class TaskIn(_TaskDates):
     title: str = Field(..., min_length=1)
     description: Optional[str] = None
     status: str = "open"
     process_id: int | None = None
     type_id: int | None = None
     assignee_id: int | None = None
-    # дополнительные удобные поля, которые положим в fields
+    # дополнительное удобное поле, которое положим в fields
     priority: str | None = None
-    due_at: str | None = None
+
+
+class TaskPatch(_TaskDates):
+    title: Optional[str] = Field(default=None, min_length=1)
+    description: Optional[str] = None
+    status: Optional[str] = None
+    process_id: int | None = None
+    type_id: int | None = None
+    assignee_id: int | None = None
+    priority: str | None = None
+    fields: Optional[dict] = None  # merge поверх существующих
+
+
+def _fields_from(body: TaskIn | TaskPatch) -> dict:
+    fields = dict(getattr(body, "fields", None) or {})
+    if body.priority is not None:
+        fields["priority"] = body.priority
+    return fields
 
 
 class TaskOut(BaseModel):
@@ -32,35 +92,271 @@ class TaskOut(BaseModel):
     process_id: int | None = None
     type_id: int | None = None
     fields: dict
+    start_at: Optional[datetime] = None
+    due_at: Optional[datetime] = None
+
+
+class TaskSparseOut(BaseModel):
+    """Задача в ленте/карточке: с ?fields= / ?include= в ответе только запрошенные ключи."""
+
+    id: int
+    title: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+    assignee_id: int | None = None
+    process_id: int | None = None
+    type_id: int | None = None
+    fields: Optional[dict] = None
+    start_at: Optional[datetime] = None
+    due_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    rank: Optional[str] = None
+    process: Optional[dict] = None
+    type: Optional[dict] = None
+    assignee: Optional[dict] = None
+
+
+class TaskPage(BaseModel):
+    items: List[TaskSparseOut]
+    next_cursor: Optional[str] = None  # None — дальше страниц нет
+
+
+# ключи ответа без ?fields= — как у TaskOut
+TASK_OUT_FIELDS: tuple[str, ...] = tuple(TaskOut.model_fields)
+# карточка собирается из TaskDTO — ранга там нет
+_DETAIL_FIELDS: tuple[str, ...] = tuple(f for f in TASK_FIELDS if f != "rank")
+_FIELDS_QUERY = Query(None, description="через запятую: только эти поля задачи, напр. id,title,status")
+_INCLUDE_QUERY = Query(None, description="через запятую: связи process, type, assignee")
+
+
+def _fieldset(
+    fields: Optional[str], include: Optional[str], *, allowed: Iterable[str] = TASK_FIELDS
+) -> tuple[Optional[tuple[str, ...]], tuple[str, ...]]:
+    """?fields= / ?include= → (поля или None — по умолчанию, связи); id есть всегда, неизвестное имя — 400."""
+    try:
+        only = parse_fieldset(fields, allowed)
+        rels = parse_fieldset(include, TASK_INCLUDES, what="include") or ()
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return (tuple(dict.fromkeys(("id", *only))) if only is not None else None), rels
+
+
+def _field_filters(request: Request) -> list[tuple[str, str, str]]:
+    """
+    Фильтры по Task.fields из query: `f.<key>=v` (равенство) или `f.<key>.<op>=v`,
+    op ∈ eq/ne/lt/lte/gt/gte. Например: ?f.priority=P1&f.estimate.lt=8
+    """
+    out: list[tuple[str, str, str]] = []
+    for name, value in request.query_params.multi_items():
+        if not name.startswith("f."):
+            continue
+        key, _, op = name[2:].partition(".")
+        op = op or "eq"
+        try:
+            if op not in FILTER_OPS:
+                raise ValueError(f"unsupported filter op '{op}'")
+            validate_key(key)
+            # значение проверяем сразу: у потокового экспорта ошибка посреди ответа уже не станет 400
+            coerce_value("", kind_for(key) or "string", value)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=http_status.HTTP_400_BAD_REQUEST, detail=f"invalid field filter '{name}': {e}"
+            )
+        out.append((key, op, value))
+    return out
+
+
+@router.get("", response_model=TaskPage, response_model_exclude_unset=True)
+@single_flight  # всплеск одинаковых обновлений ленты после события — один запрос
+async def list_tasks(
+    request: Request,
+    status: Optional[str] = Query(None),
+    assignee_id: Optional[int] = Query(None),
+    process_id: Optional[int] = Query(None),
+    type_id: Optional[int] = Query(None),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="next_cursor из предыдущей страницы"),
+    fields: Optional[str] = _FIELDS_QUERY,
+    include: Optional[str] = _INCLUDE_QUERY,
+    db: AsyncSession = Depends(get_db),
+    user=CurrentUser,  # type: ignore
+):
+    require_perm(user, "task.read")
+    field_filters = _field_filters(request)
+    only, rels = _fieldset(fields, include)
+    try:
+        # проекционный fast path: без ORM-сущностей и без description; ?fields= сужает select
+        rows, next_cursor = await TaskRepo(db).list_page_rows(
+            status=status,
+            assignee_id=assignee_id,
+            process_id=process_id,
+            type_id=type_id,
+            field_filters=field_filters,
+            limit=limit,
+            cursor=cursor,
+            fields=only,
+            include=rels,
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail="invalid cursor")
+    except ValueError as e:
+        # ключ не годится для фильтра или значение не того типа (число/дата)
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return TaskPage(
+        items=[TaskSparseOut(**shape_task_row(r, only or TASK_OUT_FIELDS, rels)) for r in rows],
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/export")
+@with_deadline(None)  # поток: живёт дольше общего умолчания
+async def export_tasks_route(
+    request: Request,
+    format: ExportFormat = Query("ndjson"),
+    status: Optional[str] = Query(None),
+    assignee_id: Optional[int] = Query(None),
+    process_id: Optional[int] = Query(None),
+    type_id: Optional[int] = Query(None),
+    user=CurrentUser,  # type: ignore
+):
+    """
+    Выгрузка задач потоком (NDJSON/CSV) с фильтрами как у ленты.
+    Объявлен до /{task_id}, иначе "export" уйдёт в path-параметр.
+    """
+    require_perm(user, "task.read")
+    field_filters = _field_filters(request)
+    return StreamingResponse(
+        export_tasks(
+            format,
+            status=status,
+            assignee_id=assignee_id,
+            process_id=process_id,
+            type_id=type_id,
+            field_filters=field_filters,
+        ),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'},
+    )
 
 
-@router.get("", response_model=List[TaskOut])
-async def list_tasks(db: AsyncSession = Depends(get_db), user=CurrentUser):  # type: ignore
+@router.get("/range", response_model=TaskPage, response_model_exclude_unset=True)
+async def list_tasks_in_range(
+    from_: datetime = Query(..., alias="from", description="начало окна (ISO 8601; без зоны — UTC)"),
+    to: datetime = Query(..., description="конец окна, включительно"),
+    status: Optional[str] = Query(None),
+    assignee_id: Optional[int] = Query(None),
+    process_id: Optional[int] = Query(None),
+    type_id: Optional[int] = Query(None),
+    limit: int = Query(MAX_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="next_cursor из предыдущей страницы"),
+    fields: Optional[str] = _FIELDS_QUERY,
+    include: Optional[str] = _INCLUDE_QUERY,
+    db: AsyncSession = Depends(get_db),
+    user=CurrentUser,  # type: ignore
+):
+    """
+    Календарь/гант: задачи, чей интервал [start_at, due_at] пересекается с [from, to].
+    Задача с одной датой — точка. Порядок — по концу интервала, затем id.
+    """
     require_perm(user, "task.read")
-    rows = (await db.execute(select(Task))).scalars().all()
-    return [
-        TaskOut(
-            id=r.id,
-            title=r.title,
-            description=r.description,
-            status=r.status,
-            assignee_id=r.assignee_id,
-            process_id=r.process_id,
-            type_id=r.type_id,
-            fields=r.fields or {},
+    only, rels = _fieldset(fields, include)
+    try:
+        rows, next_cursor = await TaskRepo(db).range_page_rows(
+            _as_utc(from_),
+            _as_utc(to),
+            status=status,
+            assignee_id=assignee_id,
+            process_id=process_id,
+            type_id=type_id,
+            limit=limit,
+            cursor=cursor,
+            fields=only,
+            include=rels,
         )
-        for r in rows
-    ]
+    except InvalidCursor:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail="invalid cursor")
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return TaskPage(
+        items=[TaskSparseOut(**shape_task_row(r, only or TASK_OUT_FIELDS, rels)) for r in rows],
+        next_cursor=next_cursor,
+    )
+
+
+class FacetValue(BaseModel):
+    value: Any = None  # None — «не задано» (без исполнителя/типа/процесса)
+    count: int
+
+
+class TaskFacetsOut(BaseModel):
+    total: int
+    facets: dict[str, List[FacetValue]]
+
+
+@router.get("/facets", response_model=TaskFacetsOut)
+async def task_facets_route(
+    request: Request,
+    status: Optional[str] = Query(None),
+    assignee_id: Optional[int] = Query(None),
+    process_id: Optional[int] = Query(None),
+    type_id: Optional[int] = Query(None),
+    db: AsyncSession = Depends(get_db),
+    user=CurrentUser,  # type: ignore
+):
+    """
+    Счётчики для панели фильтров: по status, assignee_id, type_id, process_id
+    под тем же фильтром, что у ленты (включая f.*), одним запросом; кэшируется до события task_*.
+    """
+    require_perm(user, "task.read")
+    field_filters = _field_filters(request)
+    try:
+        return await task_facets(
+            db,
+            status=status,
+            assignee_id=assignee_id,
+            process_id=process_id,
+            type_id=type_id,
+            field_filters=field_filters,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/{task_id}", response_model=TaskSparseOut, response_model_exclude_unset=True)
+async def get_task(
+    task_id: int,
+    fields: Optional[str] = _FIELDS_QUERY,
+    include: Optional[str] = Query(None, description="через запятую: process, type, assignee; по умолчанию — все"),
+    db: AsyncSession = Depends(get_db),
+    user=CurrentUser,  # type: ignore
+):
+    require_perm(user, "task.read")
+    only, rels = _fieldset(fields, include, allowed=_DETAIL_FIELDS)
+    if include is None:
+        rels = DETAIL_INCLUDES
+    # горячее чтение: DTO из кэша сущностей, промах — один SELECT с join (db/entity_cache.py)
+    got = await TaskRepo(db).get_detail(task_id, include=rels)
+    if not got:
+        raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="task not found")
+    obj, rel = got
+    row = {f: getattr(obj, f) for f in _DETAIL_FIELDS if f != "updated_at"}
+    row["fields"] = dict(obj.fields)
+    row["updated_at"] = obj.version
+    out: dict[str, Any] = {f: row[f] for f in (only or TASK_OUT_FIELDS)}
+    p, t, a = rel.get("process"), rel.get("type"), rel.get("assignee")
+    if "process" in rels:
+        out["process"] = {"id": p.id, "name": p.name, "status": p.status} if p else None
+    if "type" in rels:
+        out["type"] = {"id": t.id, "key": t.key, "title": t.title} if t else None
+    if "assignee" in rels:
+        out["assignee"] = {"id": a.id, "email": a.email, "display_name": a.display_name} if a else None
+    return TaskSparseOut(**out)
 
 
 @router.post("", response_model=TaskOut)
 async def create_task(body: TaskIn, db: AsyncSession = Depends(get_db), user=CurrentUser):  # type: ignore
     require_perm(user, "task.create")
-    fields = {}
-    if body.priority is not None:
-        fields["priority"] = body.priority
-    if body.due_at is not None:
-        fields["due_at"] = body.due_at
+    fields = _fields_from(body)
 
     obj = Task(
         title=body.title,
@@ -70,10 +366,13 @@ async def create_task(body: TaskIn, db: AsyncSession = Depends(get_db), user=Cur
         type_id=body.type_id,
         assignee_id=body.assignee_id,
         fields=fields,
+        start_at=body.start_at,
+        due_at=body.due_at,
     )
     db.add(obj)
     await db.commit()
     await db.refresh(obj)
+    await events.publish({"type": "task_created", "id": obj.id, "title": obj.title})
     return TaskOut(
         id=obj.id,
         title=obj.title,
@@ -83,4 +382,123 @@ async def create_task(body: TaskIn, db: AsyncSession = Depends(get_db), user=Cur
         process_id=obj.process_id,
         type_id=obj.type_id,
         fields=obj.fields or {},
+        start_at=obj.start_at,
+        due_at=obj.due_at,
     )
+
+
+# --- batch -------------------------------------------------------------------
+
+MAX_BATCH_OPS = 50_000
+
+
+class TaskBatchOp(BaseModel):
+    op: Literal["create", "patch", "delete"]
+    id: int | None = None            # для patch/delete
+    ref: str | None = None           # клиентская метка — вернётся в результате как есть
+    data: dict[str, Any] | None = None  # TaskIn для create, TaskPatch для patch
+
+
+class TaskBatchIn(BaseModel):
+    ops: List[TaskBatchOp] = Field(..., min_length=1, max_length=MAX_BATCH_OPS)
+
+
+class TaskBatchItemOut(BaseModel):
+    index: int
+    op: str
+    ref: str | None = None
+    ok: bool
+    id: int | None = None
+    error: str | None = None
+
+
+class TaskBatchOut(BaseModel):
+    ok: int
+    failed: int
+    items: List[TaskBatchItemOut]
+
+
+def _normalize_op(op: TaskBatchOp) -> dict[str, Any]:
+    """TaskBatchOp → операция для TaskService.apply_batch; ValueError — ошибка элемента."""
+    if op.op == "create":
+        body = TaskIn.model_validate(op.data or {})
+        values = body.model_dump(exclude={"priority"})
+        values["fields"] = _fields_from(body)
+        return {"op": "create", "values": values}
+    if op.id is None:
+        raise ValueError("id is required")
+    if op.op == "delete":
+        return {"op": "delete", "id": op.id}
+    patch = TaskPatch.model_validate(op.data or {})
+    values = patch.model_dump(exclude_unset=True, exclude={"priority", "fields"})
+    fields = _fields_from(patch)
+    if fields:
+        values["fields"] = fields
+    if not values:
+        raise ValueError("empty patch")
+    return {"op": "patch", "id": op.id, "values": values}
+
+
+@router.post(":batch", response_model=TaskBatchOut)
+async def batch_tasks(body: TaskBatchIn, db: AsyncSession = Depends(get_db), user=CurrentUser):  # type: ignore
+    """
+    Пакетные create/patch/delete в одной транзакции: multi-row INSERT,
+    bulk UPDATE по PK и DELETE ... IN (...). Ошибки валидации — по элементам,
+    ошибка БД (FK и т.п.) откатывает всю пачку (409).
+    """
+    kinds = {op.op for op in body.ops}
+    for kind, perm in (("create", "task.create"), ("patch", "task.update"), ("delete", "task.delete")):
+        if kind in kinds:
+            require_perm(user, perm)
+
+    items: list[Optional[TaskBatchItemOut]] = [None] * len(body.ops)
+    valid: list[tuple[int, dict[str, Any]]] = []
+    for i, op in enumerate(body.ops):
+        try:
+            valid.append((i, _normalize_op(op)))
+        except (ValidationError, ValueError) as e:
+            msg = e.errors()[0]["msg"] if isinstance(e, ValidationError) else str(e)
+            items[i] = TaskBatchItemOut(index=i, op=op.op, ref=op.ref, ok=False, id=op.id, error=msg)
+
+    try:
+        results = await TaskService(db).apply_batch([norm for _, norm in valid])
+    except IntegrityError as e:
+        raise HTTPException(status_code=http_status.HTTP_409_CONFLICT, detail=f"batch rejected: {e.orig}")
+
+    for (i, _), res in zip(valid, results):
+        op = body.ops[i]
+        items[i] = TaskBatchItemOut(index=i, op=op.op, ref=op.ref, **res)
+
+    done = [x for x in items if x is not None]
+    ok = sum(1 for x in done if x.ok)
+    return TaskBatchOut(ok=ok, failed=len(done) - ok, items=done)
+
+
+# --- import ------------------------------------------------------------------
+
+@router.post("/import", status_code=http_status.HTTP_202_ACCEPTED)
+async def import_tasks(
+    file: UploadFile = File(...),
+    format: Optional[ImportFormat] = Query(None, description="ndjson|csv; по умолчанию — по расширению"),
+    chunk_size: int = Query(IMPORT_CHUNK, ge=1, le=10_000),
+    start_chunk: int = Query(0, ge=0, description="resume_from прошлого запуска"),
+    user=CurrentUser,  # type: ignore
+):
+    """Загрузка файла и фоновый импорт; прогресс — GET /tasks/import/{job_id}."""
+    require_perm(user, "task.create")
+    try:
+        fmt = detect_format(file.filename, format)
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
+    path = await spool_upload(file, suffix=f".{fmt}")
+    job = start_import_job(path, "tasks", fmt, chunk_size=chunk_size, start_chunk=start_chunk)
+    return job.to_dict()
+
+
+@router.get("/import/{job_id}")
+async def import_tasks_status(job_id: str, user=CurrentUser):  # type: ignore
+    require_perm(user, "task.create")
+    job = get_import_job(job_id)
+    if not job or job.kind != "tasks":
+        raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="import job not found")
+    return job.to_dict()
@@ -6,6 +6,11 @@ from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel, Field
 
+from ..core.events import events
+from ..db.session import AsyncSessionLocal, AsyncWriteSessionLocal
+from ..db.search import has_search_index, index_document, remove_document, search
+from .response_cache import cache_response
+
 router = APIRouter(tags=["templates"])
 
 # --- сервис (фоллбек) ---
@@ -59,16 +64,46 @@ class TemplateOut(BaseModel):
     visibility: str = "private"
     created_at: Optional[datetime] = None
 
+# один экземпляр на процесс: у фоллбека хранилище в памяти экземпляра
+_SERVICE: Optional[TemplatesService] = None
+
+
 def _svc() -> TemplatesService:
-    return TemplatesService()
+    global _SERVICE
+    if _SERVICE is None:
+        _SERVICE = TemplatesService()
+    return _SERVICE
+
+
+async def _reindex(item: dict | None, template_id: int) -> None:
+    # шаблоны не в БД — триггеров нет, документ поиска пишем сами
+    async with AsyncWriteSessionLocal() as s:
+        if not await has_search_index(s):
+            return
+        if item is None:
+            await remove_document(s, "template", template_id)
+        else:
+            await index_document(s, "template", int(item["id"]), item.get("title") or "", item.get("key") or "")
+        await s.commit()
+    # все записи шаблонов проходят здесь — отсюда и событие (кэш ответов списка)
+    await events.publish({"type": "template_deleted" if item is None else "template_saved", "id": template_id})
 
 # --- Handlers ---
 @router.get("/templates", response_model=List[TemplateOut])
+@cache_response("templates")
 async def list_templates(q: Optional[str] = Query(None), svc: TemplatesService = Depends(_svc)):
     items = await svc.list()
     if q:
-        ql = q.lower()
-        items = [x for x in items if ql in x.get("key", "").lower() or ql in x.get("title", "").lower()]
+        # полнотекстовый индекс (префиксы слов, ранжирование) вместо подстроки по всем элементам
+        async with AsyncSessionLocal() as s:
+            hits = await search(s, q, kinds=["template"], limit=100) if await has_search_index(s) else None
+        if hits is None:
+            # сборка без FTS5 — индекса нет, ищем подстрокой, как раньше
+            ql = q.lower()
+            items = [x for x in items if ql in x.get("key", "").lower() or ql in x.get("title", "").lower()]
+        else:
+            by_id = {int(x["id"]): x for x in items}
+            items = [by_id[h["id"]] for h in hits if h["id"] in by_id]
     return [TemplateOut.model_validate(i) for i in items]
 
 @router.get("/templates/{template_id}", response_model=TemplateOut)
@@ -82,12 +117,14 @@ async def get_template(template_id: int, svc: TemplatesService = Depends(_svc)):
 @router.post("/templates", response_model=TemplateOut, status_code=status.HTTP_201_CREATED)
 async def create_template(body: TemplateIn, svc: TemplatesService = Depends(_svc)):
     i = await svc.create(body.key, body.title, body.form_schema, body.workflow_def, body.visibility)
+    await _reindex(i, int(i["id"]))
     return TemplateOut.model_validate(i)
 
 @router.patch("/templates/{template_id}", response_model=TemplateOut)
 async def patch_template(template_id: int, body: TemplatePatch, svc: TemplatesService = Depends(_svc)):
     try:
         i = await svc.update(template_id, {k: v for k, v in body.model_dump(exclude_none=True).items()})
+        await _reindex(i, template_id)
         return TemplateOut.model_validate(i)
     except KeyError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="template not found")
@@ -97,4 +134,5 @@ async def delete_template(template_id: int, svc: TemplatesService = Depends(_svc
     ok = await svc.delete(template_id)
     if not ok:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="template not found")
+    await _reindex(None, template_id)
     return
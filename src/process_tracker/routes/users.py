@@ -2,9 +2,12 @@ from __future__ import annotations
 from typing import List, Optional
 from datetime import datetime
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, status
 from pydantic import BaseModel, Field
 
+from ..services import suggest_service
+from ._deps import CurrentUser, require_perm
+
 # EmailStr → мягкая зависимость
 try:
     from pydantic import EmailStr as _EmailStr  # type: ignore
@@ -46,20 +49,40 @@ class UserOut(BaseModel):
     created_at: Optional[datetime] = None
 
 
+class UserSuggestOut(BaseModel):
+    id: int
+    email: str
+    name: Optional[str] = None
+
+
 @router.get("/users", response_model=List[UserOut])
-async def list_users():
+async def list_users(user=CurrentUser):  # type: ignore
+    require_perm(user, "user.read")
     return [UserOut.model_validate(v) for v in _STORE.values()]
 
 
+@router.get("/users/suggest", response_model=List[UserSuggestOut])
+async def suggest_users(
+    prefix: str = Query("", max_length=255),
+    limit: int = Query(suggest_service.SUGGEST_LIMIT, ge=1, le=suggest_service.SUGGEST_MAX_LIMIT),
+    user=CurrentUser,  # type: ignore
+):
+    """Подсказки для выбора исполнителя: пользователи БД (users.id — Task.assignee_id) по началу email / имени."""
+    require_perm(user, "user.read")
+    return await suggest_service.suggest("users", prefix, limit)
+
+
 @router.get("/users/{user_id}", response_model=UserOut)
-async def get_user(user_id: int):
+async def get_user(user_id: int, user=CurrentUser):  # type: ignore
+    require_perm(user, "user.read")
     if user_id not in _STORE:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="user not found")
     return UserOut.model_validate(_STORE[user_id])
 
 
 @router.post("/users", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-async def create_user(body: UserIn):
+async def create_user(body: UserIn, user=CurrentUser):  # type: ignore
+    require_perm(user, "user.manage")
     uid = next(_ids)
     obj = body.model_dump()
     obj.update({"id": uid, "created_at": datetime.utcnow().isoformat()})
@@ -68,7 +91,8 @@ async def create_user(body: UserIn):
 
 
 @router.patch("/users/{user_id}", response_model=UserOut)
-async def patch_user(user_id: int, body: UserPatch):
+async def patch_user(user_id: int, body: UserPatch, user=CurrentUser):  # type: ignore
+    require_perm(user, "user.manage")
     if user_id not in _STORE:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="user not found")
     for k, v in body.model_dump(exclude_none=True).items():
@@ -77,7 +101,8 @@ async def patch_user(user_id: int, body: UserPatch):
 
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user(user_id: int):
+async def delete_user(user_id: int, user=CurrentUser):  # type: ignore
+    require_perm(user, "user.manage")
     if _STORE.pop(user_id, None) is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="user not found")
     return
@@ -6,12 +6,14 @@ from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel, Field
 
+from ._deps import CurrentUser, require_perm
+
 router = APIRouter(tags=["views"])
 
 # --- сервис (фоллбек) ---
 try:
     from ..services.views_service import ViewsService  # type: ignore
-except Exception:
+except Exception:  # pragma: no cover
     import itertools
     class ViewsService:  # type: ignore
         _id = itertools.count(1)
@@ -59,6 +61,11 @@ class ViewOut(BaseModel):
     meta: Dict[str, Any]
     created_at: Optional[datetime] = None
 
+class ViewResultsOut(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+    group_by: Optional[str] = None  # при группировке элементы идут подряд по группам
+
 def _svc() -> ViewsService:
     return ViewsService()
 
@@ -78,7 +85,10 @@ async def get_view(view_id: int, svc: ViewsService = Depends(_svc)):
 
 @router.post("/views", response_model=ViewOut, status_code=status.HTTP_201_CREATED)
 async def create_view(body: ViewIn, svc: ViewsService = Depends(_svc)):
-    i = await svc.create(body.name, body.resource, body.query, body.layout, body.meta)
+    try:
+        i = await svc.create(body.name, body.resource, body.query, body.layout, body.meta)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"invalid query: {e}")
     return ViewOut.model_validate(i)
 
 @router.patch("/views/{view_id}", response_model=ViewOut)
@@ -88,6 +98,8 @@ async def patch_view(view_id: int, body: ViewPatch, svc: ViewsService = Depends(
         return ViewOut.model_validate(i)
     except KeyError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="view not found")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"invalid query: {e}")
 
 @router.delete("/views/{view_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_view(view_id: int, svc: ViewsService = Depends(_svc)):
@@ -95,3 +107,24 @@ async def delete_view(view_id: int, svc: ViewsService = Depends(_svc)):
     if not ok:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="view not found")
     return
+
+@router.get("/views/{view_id}/results", response_model=ViewResultsOut)
+async def view_results(
+    view_id: int,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor из предыдущей страницы"),
+    svc: ViewsService = Depends(_svc),
+    user=CurrentUser,  # type: ignore
+):
+    """Исполнить представление: скомпилированный запрос + keyset-страница (кэшируется до события)."""
+
+    def authorize(resource: str) -> None:
+        require_perm(user, "task.read" if resource == "tasks" else "process.read")
+
+    scope = frozenset(str(p).strip().lower() for p in (user.get("perms") or []))
+    try:
+        return await svc.results(view_id, limit=limit, cursor=cursor, authorize=authorize, scope=scope)
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="view not found")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -38,12 +38,15 @@ try:
     from ..events.bus import send_webhook  # type: ignore
 except Exception:
     import httpx, json, hmac, hashlib
+    from ..core.deadline import HEADER as DEADLINE_HEADER, budget
     async def send_webhook(url: str, payload: dict, secret: str | None = None) -> None:  # type: ignore
+        # таймаут — остаток дедлайна запроса (не больше 10 с); вышел — в сеть не идём
+        timeout = budget(10.0, "webhook")
         body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
-        headers = {"Content-Type": "application/json"}
+        headers = {"Content-Type": "application/json", DEADLINE_HEADER: f"{timeout:.3f}"}
         if secret:
             headers["X-Signature-SHA256"] = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
-        async with httpx.AsyncClient(timeout=10) as cli:
+        async with httpx.AsyncClient(timeout=timeout) as cli:
             await cli.post(url, content=body, headers=headers)
 
 # --- Schemas ---
@@ -11,7 +11,9 @@ from ..core.blueprints import (
     create_default_store,
     compile_to_workflow,
 )
+from ..core.events import events
 from ..core.workflow import WorkflowEngine, InMemoryWorkflowStore
+from .response_cache import cache_response
 
 router = APIRouter(prefix="/workflows", tags=["workflows"])
 
@@ -32,6 +34,7 @@ class BlueprintOut(BlueprintIn):
 
 
 @router.get("/blueprints", response_model=List[BlueprintOut])
+@cache_response("workflows")
 async def list_blueprints():
     items = await _store.list_as_list()
     return [BlueprintOut(**bp.to_dict()) for bp in items]
@@ -54,6 +57,7 @@ async def upsert_blueprint(body: BlueprintIn):
         edges=body.edges,
         version=body.version,
     )
+    await events.publish({"type": "blueprint_saved", "key": bp.key})
     return BlueprintOut(**bp.to_dict())
 
 
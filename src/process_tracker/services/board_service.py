@@ -0,0 +1,151 @@
+from __future__ import annotations
+"""
+Kanban-доска поверх TaskRepo.
+
+- board(): колонки = TaskType.statuses (или явный список / встречающиеся статусы),
+  все колонки — одним запросом, у каждой свой лимит и курсор
+- move(): перенос карточки — UPDATE одной строки (дробный ранг, db/ranking.py)
+- ранги, ставшие длиннее REBALANCE_LEN, ставят колонку в очередь; run_board_rebalancer()
+  (lifespan приложения) раскладывает такие колонки заново в фоне
+"""
+
+import asyncio
+from typing import Any, Mapping, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.async_utils import single_flight
+from ..core.events import events
+from ..core.logging import get_logger
+from ..db.dal.loaders import shape_task_row, task_columns
+from ..db.dal.task_repo import TaskRepo
+from ..db.models import Task, TaskType
+from ..db.ranking import REBALANCE_LEN
+from ..db.session import AsyncWriteSessionLocal
+
+log = get_logger("board")
+
+REBALANCE_INTERVAL = 2.0  # сек между проходами фоновой раскладки
+
+# поля карточки без ?fields= — колонки профиля board
+BOARD_CARD_FIELDS: tuple[str, ...] = tuple(c.key for c in task_columns("board"))
+
+# колонки (type_id, status), ждущие раскладки; множество — повторные move не плодят работу
+_pending: set[tuple[Optional[int], str]] = set()
+
+
+class BoardService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.repo = TaskRepo(session)
+
+    async def columns_for(self, type_id: Optional[int], statuses: Optional[Sequence[str]] = None) -> list[str]:
+        """Явный список → он; иначе TaskType.statuses; иначе — статусы, встречающиеся на доске. KeyError — нет типа."""
+        if statuses:
+            return list(dict.fromkeys(statuses))
+        if type_id is not None:
+            tt = await self.session.get(TaskType, type_id)
+            if tt is None:
+                raise KeyError(type_id)
+            if tt.statuses:
+                return list(tt.statuses)
+        return await self.repo.board_statuses(type_id)
+
+    @single_flight
+    async def board(
+        self,
+        *,
+        type_id: Optional[int] = None,
+        statuses: Optional[Sequence[str]] = None,
+        limit: Optional[int] = None,
+        cursors: Optional[Mapping[str, str]] = None,
+        assignee_id: Optional[int] = None,
+        process_id: Optional[int] = None,
+        with_counts: bool = False,
+        fields: Optional[Sequence[str]] = None,
+        include: Sequence[str] = (),
+    ) -> dict[str, Any]:
+        cols = await self.columns_for(type_id, statuses)
+        pages = await self.repo.board_columns(
+            type_id=type_id, statuses=cols, limit=limit, cursors=cursors,
+            assignee_id=assignee_id, process_id=process_id, fields=fields, include=include,
+        )
+        # id / status / rank выбираются всегда (ключи колонок и курсора), остальное — как просили
+        card_fields = tuple(dict.fromkeys(("id", "status", "rank", *fields))) if fields is not None else BOARD_CARD_FIELDS
+        counts = (
+            await self.repo.board_counts(type_id=type_id, statuses=cols, assignee_id=assignee_id, process_id=process_id)
+            if with_counts else None
+        )
+        return {
+            "type_id": type_id,
+            "columns": [
+                {
+                    "status": st,
+                    "items": [shape_task_row(r, card_fields, include) for r in pages[st][0]],
+                    "next_cursor": pages[st][1],
+                    "count": counts.get(st, 0) if counts is not None else None,
+                }
+                for st in cols
+            ],
+        }
+
+    async def move(
+        self,
+        task_id: int,
+        *,
+        status: Optional[str] = None,
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+    ) -> Optional[dict[str, Any]]:
+        """None — задачи нет; ValueError — некорректные соседи или статус не из TaskType.statuses. Событие — после commit."""
+        if status is not None:
+            allowed = (
+                await self.session.execute(
+                    select(TaskType.statuses).join(Task, Task.type_id == TaskType.id).where(Task.id == task_id)
+                )
+            ).scalar()
+            if allowed and status not in allowed:
+                raise ValueError(f"status '{status}' is not allowed for this task type")
+        try:
+            moved = await self.repo.move(task_id, status=status, after_id=after_id, before_id=before_id)
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        if moved is None:
+            return None
+        new_status, rank, type_id = moved
+        if len(rank) > REBALANCE_LEN:
+            _pending.add((type_id, new_status))
+        await events.publish({"type": "task_moved", "id": task_id, "status": new_status, "rank": rank})
+        return {"id": task_id, "status": new_status, "rank": rank, "type_id": type_id}
+
+
+async def rebalance_pending() -> int:
+    """Разложить все колонки из очереди; каждая — в своей транзакции."""
+    done = 0
+    while _pending:
+        type_id, status = _pending.pop()
+        async with AsyncWriteSessionLocal() as s:
+            try:
+                n = await TaskRepo(s).rebalance_column(type_id, status)
+                await s.commit()
+            except Exception:
+                await s.rollback()
+                log.exception("board_rebalance_failed", type_id=type_id, status=status)
+                continue
+        done += 1
+        log.info("board_rebalanced", type_id=type_id, status=status, cards=n)
+        # ранги колонки сменились — старые курсоры указывают «мимо», клиенту стоит перечитать колонку
+        await events.publish({"type": "task_board_rebalanced", "type_id": type_id, "status": status})
+    return done
+
+
+async def run_board_rebalancer(interval: float = REBALANCE_INTERVAL) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await rebalance_pending()
+
+
+__all__ = ["BoardService", "rebalance_pending", "run_board_rebalancer"]
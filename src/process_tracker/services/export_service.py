@@ -0,0 +1,149 @@
+from __future__ import annotations
+"""
+Потоковый экспорт задач и ответов форм в NDJSON/CSV.
+
+Строки читаются серверным курсором (`session.stream` + yield_per) и сразу
+кодируются в байты пачками, поэтому память постоянна при любом размере таблицы.
+Один и тот же движок используют HTTP (`StreamingResponse`) и `cli.py export`.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Literal, Mapping, Optional, Sequence
+
+from sqlalchemy import select
+
+from ..db.dal.task_repo import TaskRepo
+from ..db.models import FormDef, FormSubmission, Task
+from ..db.session import AsyncSessionLocal
+
+ExportFormat = Literal["ndjson", "csv"]
+
+EXPORT_FORMATS: tuple[str, ...] = ("ndjson", "csv")
+MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# строк на один fetch серверного курсора
+STREAM_ROWS = 1000
+# размер отдаваемого куска; мелкие строки склеиваем, чтобы не плодить write() на каждую
+FLUSH_BYTES = 64 * 1024
+
+TASK_COLUMNS: tuple[str, ...] = (
+    "id", "title", "description", "status", "process_id", "type_id",
+    "assignee_id", "fields", "start_at", "due_at", "created_at", "updated_at",
+)
+SUBMISSION_COLUMNS: tuple[str, ...] = (
+    "id", "form_id", "form_key", "created_by_id", "submitted_at", "created_at", "data",
+)
+
+
+def _plain(v: Any) -> Any:
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    return v
+
+
+def _csv_cell(v: Any) -> Any:
+    if isinstance(v, (dict, list)):
+        return json.dumps(v, ensure_ascii=False, separators=(",", ":"))
+    if v is None:
+        return ""
+    return _plain(v)
+
+
+async def encode_rows(
+    rows: AsyncIterator[Mapping[str, Any]],
+    fmt: ExportFormat,
+    columns: Sequence[str],
+) -> AsyncIterator[bytes]:
+    """Mapping-строки → куски байт NDJSON/CSV (CSV с заголовком, JSON-поля — строкой)."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unsupported export format '{fmt}'")
+    buf = io.StringIO()
+    writer = csv.writer(buf) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(columns)
+
+    async for row in rows:
+        if writer is not None:
+            writer.writerow([_csv_cell(row.get(c)) for c in columns])
+        else:
+            buf.write(json.dumps({c: _plain(row.get(c)) for c in columns}, ensure_ascii=False, default=str))
+            buf.write("\n")
+        if buf.tell() >= FLUSH_BYTES:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+async def export_tasks(
+    fmt: ExportFormat = "ndjson",
+    *,
+    status: str | None = None,
+    assignee_id: int | None = None,
+    process_id: int | None = None,
+    type_id: int | None = None,
+    field_filters: Sequence[tuple[str, str, str]] = (),
+) -> AsyncIterator[bytes]:
+    """
+    Экспорт задач с теми же фильтрами, что у ленты (включая f.<key>).
+    Сессия своя: генератор живёт дольше обработчика запроса.
+    """
+    async with AsyncSessionLocal() as session:
+        rows = TaskRepo(session).stream_rows(
+            *(getattr(Task, c) for c in TASK_COLUMNS),
+            status=status,
+            assignee_id=assignee_id,
+            process_id=process_id,
+            type_id=type_id,
+            field_filters=field_filters,
+            yield_per=STREAM_ROWS,
+        )
+        async for chunk in encode_rows(rows, fmt, TASK_COLUMNS):
+            yield chunk
+
+
+async def _submission_rows(session, form_key: Optional[str]) -> AsyncIterator[Mapping[str, Any]]:
+    stmt = (
+        select(
+            FormSubmission.id,
+            FormSubmission.form_id,
+            FormDef.key.label("form_key"),
+            FormSubmission.created_by_id,
+            FormSubmission.submitted_at,
+            FormSubmission.created_at,
+            FormSubmission.data,
+        )
+        .join(FormDef, FormDef.id == FormSubmission.form_id)
+        .order_by(FormSubmission.id)
+    )
+    if form_key:
+        stmt = stmt.where(FormDef.key == form_key)
+    res = await session.stream(stmt.execution_options(yield_per=STREAM_ROWS))
+    async for row in res.mappings():
+        yield row
+
+
+async def export_submissions(fmt: ExportFormat = "ndjson", *, form_key: str | None = None) -> AsyncIterator[bytes]:
+    async with AsyncSessionLocal() as session:
+        async for chunk in encode_rows(_submission_rows(session, form_key), fmt, SUBMISSION_COLUMNS):
+            yield chunk
+
+
+__all__ = [
+    "ExportFormat",
+    "EXPORT_FORMATS",
+    "MEDIA_TYPES",
+    "TASK_COLUMNS",
+    "SUBMISSION_COLUMNS",
+    "encode_rows",
+    "export_tasks",
+    "export_submissions",
+]
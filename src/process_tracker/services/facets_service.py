@@ -0,0 +1,63 @@
+from __future__ import annotations
+"""
+Фасеты панели фильтров: счётчики задач по status / assignee / type / process
+под текущим фильтром (TaskRepo.facet_counts — один запрос на все фасеты).
+
+Результат кэшируется по хэшу фильтра и поколению ресурса "tasks": любое
+событие task_* делает старые записи ненаходимыми (core/cache.py).
+TTL — страховка от записей в обход шины событий.
+Одновременные промахи с одним фильтром (все клиенты обновились после события)
+склеиваются single_flight в один запрос.
+"""
+
+from typing import Any, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.async_utils import single_flight
+from ..core.cache import LRUCache, generation
+from ..db.dal.task_repo import FACETS, TaskRepo
+
+FACETS_CACHE_SIZE = 512
+FACETS_TTL = 60.0
+
+_cache = LRUCache(FACETS_CACHE_SIZE, ttl=FACETS_TTL)
+
+
+@single_flight
+async def task_facets(
+    session: AsyncSession,
+    *,
+    status: Optional[str] = None,
+    assignee_id: Optional[int] = None,
+    process_id: Optional[int] = None,
+    type_id: Optional[int] = None,
+    field_filters: Sequence[tuple[str, str, str]] = (),
+) -> dict[str, Any]:
+    """
+    {"total": N, "facets": {facet: [{"value": v, "count": n}, ...]}}.
+    ValueError — некорректный field-фильтр (как у ленты задач).
+    """
+    # поколение читаем до запроса: событие во время чтения не даст закэшировать устаревшее
+    key = (status, assignee_id, process_id, type_id, tuple(sorted(field_filters)), generation("tasks"))
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    counts = await TaskRepo(session).facet_counts(
+        status=status,
+        assignee_id=assignee_id,
+        process_id=process_id,
+        type_id=type_id,
+        field_filters=field_filters,
+    )
+    out = {
+        # status NOT NULL — сумма по нему и есть число задач под фильтром
+        "total": sum(n for _, n in counts["status"]),
+        "facets": {f: [{"value": v, "count": n} for v, n in counts[f]] for f in FACETS},
+    }
+    _cache.put(key, out)
+    return out
+
+
+__all__ = ["task_facets"]
@@ -0,0 +1,147 @@
+from __future__ import annotations
+"""
+Групповой commit: мутации из параллельных запросов копятся несколько миллисекунд
+(или до max_ops штук) и фиксируются ОДНОЙ транзакцией — один fsync на пачку, а не на каждую.
+
+    task = await committer.submit(lambda s: TaskRepo(s).create(title), event=lambda t: {...})
+
+- операция выполняется на общей сессии пачки, каждая — в своём SAVEPOINT: ошибка одной
+  откатывает только её, вызывающий получает своё исключение, остальные идут дальше
+- результат отдаётся вызывающему только после общего COMMIT; упал COMMIT — исключение
+  получают все операции пачки, событий нет
+- события операций (event(result) → dict | None) публикуются после успешного COMMIT, по порядку
+- вызов, отменённый до начала своей пачки, в неё не попадает
+- пачки выполняются последовательно: пока фиксируется одна, копится следующая
+- очередь и flusher — свои у каждого event loop (API и UI работают в разных циклах),
+  future операции создаётся и разрешается в цикле вызывающего
+- сбой публикации события после COMMIT логируется, а не отдаётся вызывающему
+- flusher работает вне дедлайна запроса, который его запустил (core/deadline.detached);
+  вызов с уже исчерпанным бюджетом в пачку не попадает
+- пачка открывает свою сессию записи: вызывающий, чья сессия уже держит транзакцию
+  (а с ней — единственное соединение писателя SQLite), в пачку идти не должен —
+  пачка ждала бы его, а он её (TaskService в этом случае пишет на своей сессии)
+"""
+
+import asyncio
+import logging
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.deadline import budget, detached
+from ..core.events import events
+from ..db.session import AsyncWriteSessionLocal
+
+T = TypeVar("T")
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class _Op:
+    fn: Callable[[AsyncSession], Awaitable[Any]]
+    event: Optional[Callable[[Any], Optional[dict]]]
+    future: "asyncio.Future[Any]"
+
+
+@dataclass
+class _Queue:
+    """Очередь одного event loop: её futures и flusher живут только в нём."""
+    pending: list[_Op] = field(default_factory=list)
+    full: Optional["asyncio.Future[None]"] = None  # будит окно досрочно, когда набралось max_ops
+    flusher: Optional[asyncio.Task] = None
+
+
+class GroupCommitter:
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = AsyncWriteSessionLocal,
+        *,
+        window: float = 0.005,
+        max_ops: int = 64,
+    ) -> None:
+        self.session_factory = session_factory
+        self.window = max(0.0, window)
+        self.max_ops = max(1, max_ops)
+        # по очереди на цикл (Flet и uvicorn — разные циклы): пачка не смешивает futures циклов
+        self._queues: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Queue]" = weakref.WeakKeyDictionary()
+
+    async def submit(
+        self,
+        fn: Callable[[AsyncSession], Awaitable[T]],
+        *,
+        event: Optional[Callable[[T], Optional[dict]]] = None,
+    ) -> T:
+        budget(None, "group commit")  # бюджет запроса уже исчерпан — в пачку не ставим
+        loop = asyncio.get_running_loop()
+        q = self._queues.get(loop)
+        if q is None:
+            q = self._queues[loop] = _Queue()
+        fut: asyncio.Future[Any] = loop.create_future()
+        q.pending.append(_Op(fn, event, fut))
+        if len(q.pending) >= self.max_ops and q.full is not None and not q.full.done():
+            q.full.set_result(None)
+        if q.flusher is None or q.flusher.done():
+            # пачка общая: дедлайн запроса, который запустил flusher, к остальным не относится
+            with detached():
+                q.flusher = asyncio.create_task(self._run(q), name="group-commit")
+        return await fut
+
+    async def _run(self, q: _Queue) -> None:
+        while q.pending:
+            if len(q.pending) < self.max_ops:
+                q.full = asyncio.get_running_loop().create_future()
+                await asyncio.wait([q.full], timeout=self.window)
+                q.full = None
+            batch, q.pending = q.pending[: self.max_ops], q.pending[self.max_ops:]
+            try:
+                await self._commit(batch)
+            except Exception as e:  # на всякий случай: ни один вызов не должен зависнуть
+                log.exception("group_commit_failed")
+                for op in batch:
+                    if not op.future.done():
+                        op.future.set_exception(e)
+
+    async def _commit(self, batch: list[_Op]) -> None:
+        ops = [op for op in batch if not op.future.done()]
+        if not ops:
+            return
+        done: list[tuple[_Op, Any, Optional[BaseException]]] = []
+        try:
+            async with self.session_factory() as s:
+                for op in ops:
+                    try:
+                        async with s.begin_nested():
+                            res = await op.fn(s)
+                    except Exception as e:
+                        done.append((op, None, e))
+                    else:
+                        done.append((op, res, None))
+                await s.commit()
+        except Exception as e:
+            for op in ops:
+                if not op.future.done():
+                    op.future.set_exception(e)
+            return
+
+        for op, res, err in done:
+            if err is None and op.event is not None:
+                try:
+                    payload = op.event(res)
+                    if payload:
+                        await events.publish(payload)
+                except Exception:
+                    # запись уже зафиксирована — сбой события не превращаем в ошибку операции
+                    log.exception("group_commit_event_failed")
+        for op, res, err in done:
+            if op.future.done():
+                continue
+            if err is None:
+                op.future.set_result(res)
+            else:
+                op.future.set_exception(err)
+
+
+__all__ = ["GroupCommitter"]
@@ -0,0 +1,537 @@
+from __future__ import annotations
+"""
+Массовый импорт задач/процессов из NDJSON или CSV.
+
+Конвейер по чанкам (по умолчанию 1000 записей):
+  1) потоковый парсинг файла (в потоке-воркере, в памяти — только текущий чанк)
+  2) валидация чанка: TaskType (тип, статусы, обязательные/типизированные поля,
+     дефолты), FormDef (поля по схеме формы, если у записи есть form_key),
+     FK — одним IN-запросом на колонку
+  3) вставка: executemany одним statement на чанк, на Postgres (asyncpg) — COPY
+  4) commit чанка + прогресс + событие {kind}_import с id вставленных строк
+     (индексы меток и подсказок дочитывают только их); COPY id не возвращает —
+     тогда событие чанка без ids, а в конце импорта одно {..., "done": True}
+     на полную перестройку
+
+Каждый чанк коммитится отдельно, поэтому после сбоя импорт продолжается
+с `resume_from` (номер чанка) без дублей. Тот же движок — у `cli.py import`
+и у эндпоинтов загрузки (фоновая задача + статус по job id).
+"""
+
+import asyncio
+import csv
+import io
+import itertools
+import json
+import os
+import tempfile
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import IO, Any, Callable, Iterator, Literal, Mapping, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.async_utils import fire_and_forget
+from ..core.events import events
+from ..db.field_indexes import coerce_value, normalize_kind, parse_datetime
+from ..db.models import FormDef, Process, Task, TaskType, User, utcnow
+from ..db.ranking import initial_rank
+from ..db.session import AsyncWriteSessionLocal
+from .forms_service import FormSchema, FormsService
+
+ImportKind = Literal["tasks", "processes"]
+ImportFormat = Literal["ndjson", "csv"]
+
+IMPORT_KINDS: tuple[str, ...] = ("tasks", "processes")
+IMPORT_FORMATS: tuple[str, ...] = ("ndjson", "csv")
+IMPORT_CHUNK = 1000
+MAX_ERRORS = 100  # сколько ошибок по строкам держим в прогрессе
+
+_TASK_COLUMNS = (
+    "title", "description", "status", "process_id", "type_id", "assignee_id", "fields",
+    "start_at", "due_at", "updated_at", "rank",
+)
+_PROCESS_COLUMNS = ("name", "description", "status")
+# CSV: всё, что не колонка задачи и не ссылка, уходит в fields
+_TASK_KNOWN = set(_TASK_COLUMNS) | {
+    "id", "created_at", "type_key", "process_name", "assignee_email", "form_key", "priority",
+}
+
+
+@dataclass
+class ImportProgress:
+    kind: str
+    chunk_size: int
+    start_chunk: int = 0
+    chunks_done: int = 0
+    rows_read: int = 0
+    inserted: int = 0
+    failed: int = 0
+    errors: list[dict[str, Any]] = field(default_factory=list)
+    resume_from: int = 0      # с какого чанка продолжать, если прервётся
+    done: bool = False
+
+    def add_error(self, row: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"row": row, "error": error})
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+ProgressCallback = Callable[[ImportProgress], None]
+
+
+# ───────────────────────── парсинг ─────────────────────────
+
+def detect_format(filename: str | None, fmt: str | None = None) -> ImportFormat:
+    if fmt:
+        if fmt not in IMPORT_FORMATS:
+            raise ValueError(f"unsupported import format '{fmt}'")
+        return fmt  # type: ignore[return-value]
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".ndjson", ".jsonl", ".json"):
+        return "ndjson"
+    raise ValueError("cannot detect format, pass ndjson or csv explicitly")
+
+
+def _csv_value(name: str, v: str | None) -> Any:
+    if v is None or v == "":
+        return None
+    if name in ("fields", "data"):
+        return json.loads(v)
+    if name.endswith("_id"):
+        return int(v)
+    return v
+
+
+def iter_records(fp: IO[bytes], fmt: ImportFormat) -> Iterator[dict[str, Any] | Exception]:
+    """
+    Записи файла по одной. Битая строка не рвёт импорт — вместо dict приходит
+    исключение, и она попадает в errors своего чанка.
+    """
+    text = io.TextIOWrapper(fp, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for raw in csv.DictReader(text):
+            try:
+                yield {k: _csv_value(k, v) for k, v in raw.items() if k}
+            except ValueError as e:
+                yield e
+        return
+    for line in text:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            rec = json.loads(line)
+            yield rec if isinstance(rec, dict) else ValueError("record must be a JSON object")
+        except ValueError as e:
+            yield e
+
+
+# ───────────────────────── валидация ─────────────────────────
+
+@dataclass
+class _TypeInfo:
+    id: int
+    statuses: list[str]
+    defaults: dict[str, Any]
+    required: set[str]
+    kinds: dict[str, str]
+
+
+class _TaskContext:
+    """Справочники, нужные для проверки задач; грузятся один раз на импорт."""
+
+    def __init__(self) -> None:
+        self.types_by_id: dict[int, _TypeInfo] = {}
+        self.types_by_key: dict[str, _TypeInfo] = {}
+        self.forms: Optional[FormsService] = None
+
+    async def load(self, session: AsyncSession) -> "_TaskContext":
+        for tt in (await session.execute(select(TaskType))).scalars():
+            info = _TypeInfo(id=tt.id, statuses=list(tt.statuses or []), defaults={}, required=set(), kinds={})
+            for key, spec in (tt.default_fields or {}).items():
+                if isinstance(spec, Mapping):
+                    if "default" in spec:
+                        info.defaults[key] = spec["default"]
+                    if spec.get("required"):
+                        info.required.add(key)
+                    if spec.get("type"):
+                        try:
+                            info.kinds[key] = normalize_kind(spec["type"])
+                        except ValueError:
+                            pass
+                else:
+                    info.defaults[key] = spec
+            self.types_by_id[tt.id] = info
+            self.types_by_key[tt.key] = info
+        forms: dict[str, FormSchema] = {}
+        for fd in (await session.execute(select(FormDef))).scalars():
+            # схема формы в формате FormsService ({"fields": [...]}); иначе проверять нечем
+            try:
+                forms[fd.key] = FormSchema(id=fd.key, title=fd.title, fields=(fd.schema or {})["fields"])
+            except (KeyError, TypeError, ValueError):
+                continue
+        # пустой dict FormsService заменит демо-формами — поэтому None
+        self.forms = FormsService(forms) if forms else None
+        return self
+
+
+def _check_task(rec: dict[str, Any], ctx: _TaskContext) -> dict[str, Any]:
+    """Запись → строка для INSERT (без FK-проверок). ValueError — ошибка записи."""
+    title = rec.get("title")
+    if not isinstance(title, str) or not title.strip():
+        raise ValueError("title is required")
+    if len(title) > 300:
+        raise ValueError("title is longer than 300 chars")
+
+    fields = rec.get("fields") or {}
+    if not isinstance(fields, dict):
+        raise ValueError("fields must be an object")
+    fields = dict(fields)
+    for k, v in rec.items():
+        if k not in _TASK_KNOWN and v is not None:
+            fields.setdefault(k, v)
+    if rec.get("priority") is not None:
+        fields["priority"] = rec["priority"]
+    dates: dict[str, Any] = {}
+    for k in ("start_at", "due_at"):
+        v = rec.get(k)
+        try:
+            dates[k] = parse_datetime(str(v)) if v not in (None, "") else None
+        except ValueError:
+            raise ValueError(f"'{k}' is not a valid datetime") from None
+    if dates["start_at"] and dates["due_at"] and dates["start_at"] > dates["due_at"]:
+        raise ValueError("start_at must not be later than due_at")
+
+    info: Optional[_TypeInfo] = None
+    if rec.get("type_id") is not None:
+        info = ctx.types_by_id.get(int(rec["type_id"]))
+        if info is None:
+            raise ValueError(f"unknown type_id {rec['type_id']}")
+    elif rec.get("type_key"):
+        info = ctx.types_by_key.get(rec["type_key"])
+        if info is None:
+            raise ValueError(f"unknown type_key '{rec['type_key']}'")
+
+    status = rec.get("status")
+    if info is not None:
+        for k, v in info.defaults.items():
+            fields.setdefault(k, v)
+        # due_at/start_at теперь колонки — обязательность проверяем и по ним
+        missing = sorted(k for k in info.required if fields.get(k) in (None, "") and dates.get(k) is None)
+        if missing:
+            raise ValueError(f"missing required fields: {', '.join(missing)}")
+        for k, kind in info.kinds.items():
+            v = fields.get(k)
+            if v is not None and not (kind == "number" and isinstance(v, (int, float))):
+                try:
+                    coerce_value("", kind, str(v))
+                except ValueError:
+                    raise ValueError(f"field '{k}' is not a valid {kind}") from None
+        if info.statuses:
+            status = status or info.statuses[0]
+            if status not in info.statuses:
+                raise ValueError(f"status '{status}' is not allowed for this type")
+
+    form_key = rec.get("form_key")
+    if form_key:
+        if ctx.forms is None or ctx.forms.get_form(form_key) is None:
+            raise ValueError(f"form '{form_key}' not found or has no fields schema")
+        ok, errs = ctx.forms.validate_data(form_key, fields)
+        if not ok:
+            raise ValueError("; ".join(f"{k}: {v}" for k, v in errs.items()))
+
+    return {
+        "title": title.strip(),
+        "description": rec.get("description"),
+        "status": status or "open",
+        "process_id": rec.get("process_id"),
+        "type_id": info.id if info else None,
+        "assignee_id": rec.get("assignee_id"),
+        "fields": fields,
+        **dates,
+        "updated_at": utcnow(),
+        "rank": initial_rank(),  # COPY не применяет default колонки
+        # ссылки по натуральным ключам — разрешаются на уровне чанка
+        "_process_name": rec.get("process_name"),
+        "_assignee_email": rec.get("assignee_email"),
+    }
+
+
+async def _lookup(session: AsyncSession, key_col, id_col, values: set) -> dict[Any, int]:
+    if not values:
+        return {}
+    res = await session.execute(select(key_col, id_col).where(key_col.in_(values)))
+    return {k: i for k, i in res.all()}
+
+
+async def _resolve_task_refs(
+    session: AsyncSession, items: list[tuple[int, dict[str, Any]]], progress: ImportProgress
+) -> list[dict[str, Any]]:
+    """FK и ссылки по имени/email: один IN-запрос на колонку на весь чанк."""
+    names = {r["_process_name"] for _, r in items if r["_process_name"]}
+    emails = {str(r["_assignee_email"]).lower() for _, r in items if r["_assignee_email"]}
+    by_name = await _lookup(session, Process.name, Process.id, names)
+    by_email = await _lookup(session, User.email, User.id, emails)
+    proc_ids = await _lookup(session, Process.id, Process.id, {r["process_id"] for _, r in items if r["process_id"]})
+    user_ids = await _lookup(session, User.id, User.id, {r["assignee_id"] for _, r in items if r["assignee_id"]})
+
+    out: list[dict[str, Any]] = []
+    for n, r in items:
+        name, email = r.pop("_process_name"), r.pop("_assignee_email")
+        if r["process_id"] is None and name:
+            r["process_id"] = by_name.get(name)
+            if r["process_id"] is None:
+                progress.add_error(n, f"unknown process '{name}'")
+                continue
+        elif r["process_id"] is not None and r["process_id"] not in proc_ids:
+            progress.add_error(n, f"unknown process_id {r['process_id']}")
+            continue
+        if r["assignee_id"] is None and email:
+            r["assignee_id"] = by_email.get(str(email).lower())
+            if r["assignee_id"] is None:
+                progress.add_error(n, f"unknown assignee '{email}'")
+                continue
+        elif r["assignee_id"] is not None and r["assignee_id"] not in user_ids:
+            progress.add_error(n, f"unknown assignee_id {r['assignee_id']}")
+            continue
+        out.append(r)
+    return out
+
+
+def _check_process(rec: dict[str, Any]) -> dict[str, Any]:
+    name = rec.get("name")
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError("name is required")
+    if len(name) > 200:
+        raise ValueError("name is longer than 200 chars")
+    return {"name": name.strip(), "description": rec.get("description"), "status": rec.get("status") or "active"}
+
+
+async def _dedupe_processes(
+    session: AsyncSession, items: list[tuple[int, dict[str, Any]]], progress: ImportProgress
+) -> list[dict[str, Any]]:
+    taken = set(await _lookup(session, Process.name, Process.id, {r["name"] for _, r in items}))
+    out: list[dict[str, Any]] = []
+    for n, r in items:
+        if r["name"] in taken:
+            progress.add_error(n, f"process '{r['name']}' already exists")
+            continue
+        taken.add(r["name"])
+        out.append(r)
+    return out
+
+
+# ───────────────────────── вставка ─────────────────────────
+
+async def _insert_rows(
+    session: AsyncSession, table, columns: tuple[str, ...], rows: list[dict[str, Any]]
+) -> Optional[list[int]]:
+    """Вставить чанк; id новых строк или None, если способ вставки их не возвращает (COPY)."""
+    if not rows:
+        return []
+    conn = await session.connection()
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "asyncpg":
+        # COPY ... FROM STDIN — в разы быстрее executemany; json/jsonb asyncpg принимает строкой
+        raw = await conn.get_raw_connection()
+        json_cols = {c for c in columns if c in ("fields",)}
+        records = [
+            tuple(json.dumps(r[c]) if c in json_cols else r[c] for c in columns)
+            for r in rows
+        ]
+        await raw.driver_connection.copy_records_to_table(table.name, records=records, columns=list(columns))
+        return None
+    # executemany: один statement, пачка параметров (с RETURNING id — пачками insertmanyvalues)
+    params = [{c: r[c] for c in columns} for r in rows]
+    if not conn.dialect.insert_executemany_returning:
+        await session.execute(insert(table), params)
+        return None
+    res = await session.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), params)
+    return [int(i) for i in res.scalars()]
+
+
+# ───────────────────────── импорт ─────────────────────────
+
+async def import_records(
+    fp: IO[bytes],
+    kind: ImportKind,
+    fmt: ImportFormat,
+    *,
+    chunk_size: int = IMPORT_CHUNK,
+    start_chunk: int = 0,
+    on_progress: Optional[ProgressCallback] = None,
+    progress: Optional[ImportProgress] = None,
+) -> ImportProgress:
+    """
+    Импорт из бинарного файла. Чанки < start_chunk только читаются (уже вставлены
+    прошлым запуском). При ошибке БД чанк откатывается, исключение пробрасывается,
+    а progress.resume_from указывает, откуда повторить.
+    """
+    if kind not in IMPORT_KINDS:
+        raise ValueError(f"unsupported import kind '{kind}'")
+    chunk_size = max(1, int(chunk_size))
+    progress = progress or ImportProgress(kind=kind, chunk_size=chunk_size)
+    progress.start_chunk = progress.resume_from = start_chunk
+    records = iter_records(fp, fmt)
+
+    def _next_chunk() -> list[dict[str, Any] | Exception]:
+        return list(itertools.islice(records, chunk_size))
+
+    event_type = f"{kind[:-1]}_import"
+    unindexed = False  # были чанки без id (COPY) — в конце одно событие на перестройку индексов
+
+    async def _publish_done() -> None:
+        if unindexed:
+            await events.publish({"type": event_type, "done": True, "inserted": progress.inserted})
+
+    async with AsyncWriteSessionLocal() as session:
+        ctx = await _TaskContext().load(session) if kind == "tasks" else None
+        await session.commit()  # не держим транзакцию открытой между чанками
+        chunk_no = 0
+        while True:
+            batch = await asyncio.to_thread(_next_chunk)
+            if not batch:
+                break
+            first_row = chunk_no * chunk_size
+            chunk_no += 1
+            if chunk_no <= start_chunk:
+                continue
+            progress.rows_read = first_row + len(batch)
+
+            checked: list[tuple[int, dict[str, Any]]] = []
+            for n, rec in enumerate(batch, start=first_row):
+                try:
+                    if isinstance(rec, Exception):
+                        raise rec
+                    checked.append((n, _check_task(rec, ctx) if ctx else _check_process(rec)))
+                except (ValueError, TypeError) as e:
+                    progress.add_error(n, str(e))
+
+            try:
+                if ctx:
+                    rows = await _resolve_task_refs(session, checked, progress)
+                    ids = await _insert_rows(session, Task.__table__, _TASK_COLUMNS, rows)
+                else:
+                    rows = await _dedupe_processes(session, checked, progress)
+                    ids = await _insert_rows(session, Process.__table__, _PROCESS_COLUMNS, rows)
+                await session.commit()
+            except SQLAlchemyError:
+                await session.rollback()
+                await _publish_done()  # уже зафиксированные чанки без id — тоже в индексы
+                raise
+
+            progress.inserted += len(rows)
+            progress.chunks_done += 1
+            progress.resume_from = chunk_no
+            if rows:
+                ev: dict[str, Any] = {"type": event_type, "chunk": chunk_no - 1, "inserted": len(rows)}
+                if ids is not None:
+                    ev["ids"] = ids  # индексы дочитывают вставленное, а не перестраиваются на каждый чанк
+                else:
+                    unindexed = True
+                await events.publish(ev)
+            if on_progress:
+                on_progress(progress)
+
+    await _publish_done()
+    progress.done = True
+    if on_progress:
+        on_progress(progress)
+    return progress
+
+
+async def import_file(path: str, kind: ImportKind, fmt: str | None = None, **kwargs: Any) -> ImportProgress:
+    with open(path, "rb") as fp:
+        return await import_records(fp, kind, detect_format(path, fmt), **kwargs)
+
+
+# ───────────────────────── фоновые задания (HTTP) ─────────────────────────
+
+@dataclass
+class ImportJob:
+    id: str
+    kind: str
+    status: str = "running"  # running | done | failed
+    error: Optional[str] = None
+    progress: Optional[ImportProgress] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "error": self.error,
+            "progress": self.progress.to_dict() if self.progress else None,
+        }
+
+
+_JOBS: dict[str, ImportJob] = {}
+_MAX_JOBS = 100
+
+
+async def spool_upload(upload: Any, suffix: str = "") -> str:
+    """Скопировать загруженный файл во временный: UploadFile закрывается вместе с запросом."""
+    fd, path = tempfile.mkstemp(prefix="pt-import-", suffix=suffix)
+    with os.fdopen(fd, "wb") as out:
+        while chunk := await upload.read(1 << 20):
+            out.write(chunk)
+    return path
+
+
+def get_import_job(job_id: str) -> Optional[ImportJob]:
+    return _JOBS.get(job_id)
+
+
+def start_import_job(
+    path: str,
+    kind: ImportKind,
+    fmt: ImportFormat,
+    *,
+    chunk_size: int = IMPORT_CHUNK,
+    start_chunk: int = 0,
+) -> ImportJob:
+    """Запустить импорт уже сохранённого файла в фоне; файл удаляется по завершении."""
+    job = ImportJob(id=uuid.uuid4().hex, kind=kind, progress=ImportProgress(kind=kind, chunk_size=chunk_size))
+    while len(_JOBS) >= _MAX_JOBS:
+        _JOBS.pop(next(iter(_JOBS)))
+    _JOBS[job.id] = job
+
+    async def _run() -> None:
+        try:
+            await import_file(path, kind, fmt, chunk_size=chunk_size, start_chunk=start_chunk, progress=job.progress)
+            job.status = "done"
+        except Exception as e:  # noqa: BLE001 — ошибка уходит в статус задания
+            job.status, job.error = "failed", str(e)
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    fire_and_forget(_run(), name=f"import-{job.id}")
+    return job
+
+
+__all__ = [
+    "ImportKind",
+    "ImportFormat",
+    "IMPORT_KINDS",
+    "IMPORT_FORMATS",
+    "IMPORT_CHUNK",
+    "ImportProgress",
+    "ImportJob",
+    "detect_format",
+    "iter_records",
+    "import_records",
+    "import_file",
+    "spool_upload",
+    "start_import_job",
+    "get_import_job",
+]
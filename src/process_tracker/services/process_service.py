@@ -5,15 +5,18 @@ from typing import List, Optional, Callable, AsyncIterator
 from sqlalchemy import select, desc
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..db.session import AsyncSessionLocal
+from ..db.session import AsyncWriteSessionLocal
 from ..db.models import Process
+from ..db.dal.loaders import ProcessProfile, process_options
+from ..db.dal.process_repo import ProcessRepo
+from ..db.entity_cache import ProcessDTO
 
 
 class ProcessService:
     """
     Сервис процессов с мягкой зависимостью от сессии:
     - можно передать уже открытую AsyncSession
-    - можно создать без аргументов — он сам откроет AsyncSessionLocal()
+    - можно создать без аргументов — он сам откроет AsyncWriteSessionLocal()
     """
 
     def __init__(
@@ -38,8 +41,8 @@ class ProcessService:
                 yield s
             return
 
-        # по умолчанию — свой AsyncSessionLocal
-        async with AsyncSessionLocal() as s:
+        # по умолчанию — свой AsyncWriteSessionLocal
+        async with AsyncWriteSessionLocal() as s:
             yield s
 
     # ---- Операции ----
@@ -57,17 +60,23 @@ class ProcessService:
             return obj
         raise RuntimeError("No session available")
 
-    async def list_recent(self, *, limit: int = 50) -> List[Process]:
+    async def get(self, process_id: int) -> Optional[ProcessDTO]:
+        """Процесс по id — неизменяемый DTO из кэша сущностей (промах — один SELECT)."""
         async for s in self._open_session():
-            # TimestampMixin: есть created_at/updated_at — используем updated_at если доступен
-            order_col = getattr(Process, "updated_at", None) or getattr(Process, "created_at", None)
+            return await ProcessRepo(s).get_dto(process_id)
+        return None
+
+    async def list_recent(self, *, limit: int = 50, profile: ProcessProfile = "list") -> List[Process]:
+        async for s in self._open_session():
+            # last_activity_at всегда заполнен (ORM/триггеры db/activity.py) и проиндексирован
             res = await s.scalars(
                 select(Process)
-                .order_by(desc(order_col))
+                .options(*process_options(profile))
+                .order_by(desc(Process.last_activity_at), desc(Process.id))
                 .limit(limit)
             )
             return list(res)
         return []
 
-    async def get_recent(self, *, limit: int = 50) -> List[Process]:
-        return await self.list_recent(limit=limit)
+    async def get_recent(self, *, limit: int = 50, profile: ProcessProfile = "list") -> List[Process]:
+        return await self.list_recent(limit=limit, profile=profile)
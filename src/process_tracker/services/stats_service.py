@@ -0,0 +1,96 @@
+from __future__ import annotations
+"""
+Живые счётчики дашборда поверх db/stats.py.
+
+- run_stats_watcher(): слушает шину событий; после пачки task_*/process_* событий
+  (с небольшим debounce) перечитывает task_counters, считает дельту к прошлому
+  снимку и публикует {"type": "task_stats", "delta": ..., "summary": ...}.
+  Префикс task_ — чтобы событие ушло и в /ws/tasks.
+- run_reconciler(): периодическая сверка счётчиков с COUNT(*).
+Оба запускаются в lifespan приложения (routes/__init__.build_api).
+"""
+
+import asyncio
+from typing import Any, Optional
+
+from ..core.config import settings
+from ..core.events import events
+from ..core.logging import get_logger
+from ..db.session import AsyncSessionLocal, engine
+from ..db.stats import read_counters, reconcile_counters, summarize
+
+log = get_logger("stats")
+
+STATS_EVENT = "task_stats"
+DEBOUNCE = 0.2  # сек: склеиваем всплеск событий (batch/import) в одну дельту
+
+
+def _relevant(ev: Any) -> bool:
+    if not isinstance(ev, dict):
+        return False
+    t = str(ev.get("type", ""))
+    return t != STATS_EVENT and (t.startswith("task_") or t.startswith("process_"))
+
+
+def diff_counters(before: dict[tuple[str, str], int], after: dict[tuple[str, str], int]) -> dict[str, dict[str, int]]:
+    """{dim: {key: +/-n}} — только изменившиеся значения."""
+    delta: dict[str, dict[str, int]] = {}
+    for dk in set(before) | set(after):
+        d = after.get(dk, 0) - before.get(dk, 0)
+        if d:
+            dim, key = dk
+            delta.setdefault(dim, {})[key or "none"] = d
+    return delta
+
+
+async def _snapshot() -> dict[tuple[str, str], int]:
+    async with AsyncSessionLocal() as s:
+        return await read_counters(s)
+
+
+async def run_stats_watcher() -> None:
+    q = await events.subscribe()
+    try:
+        last = await _snapshot()
+        while True:
+            ev = await q.get()
+            if not _relevant(ev):
+                continue
+            # дочитываем всё, что прилетит за окно debounce, — одна дельта на всплеск
+            await asyncio.sleep(DEBOUNCE)
+            while not q.empty():
+                q.get_nowait()
+            try:
+                cur = await _snapshot()
+            except Exception:
+                log.exception("stats_snapshot_failed")
+                continue
+            delta = diff_counters(last, cur)
+            last = cur
+            if delta:
+                await events.publish({"type": STATS_EVENT, "delta": delta, "summary": summarize(cur)})
+    finally:
+        await events.unsubscribe(q)
+
+
+async def reconcile_once() -> int:
+    async with engine.begin() as conn:
+        fixed = await reconcile_counters(conn)
+    if fixed:
+        log.warning("stats_counters_reconciled", fixed=fixed)
+    return fixed
+
+
+async def run_reconciler(interval: Optional[float] = None) -> None:
+    interval = float(interval if interval is not None else settings.stats_reconcile_interval)
+    if interval <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await reconcile_once()
+        except Exception:
+            log.exception("stats_reconcile_failed")
+
+
+__all__ = ["STATS_EVENT", "diff_counters", "run_stats_watcher", "reconcile_once", "run_reconciler"]
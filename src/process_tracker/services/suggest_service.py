@@ -0,0 +1,165 @@
+from __future__ import annotations
+"""
+Подсказки для полей выбора (typeahead): пользователи, процессы, типы задач.
+
+Каждый вид — PrefixIndex в памяти (core/prefix_index.py): ответ на запрос —
+bisect по отсортированным ключам, без обращения к БД.
+
+- users (email / display_name активных db.models.User — те id, на которые ссылается
+  Task.assignee_id), processes и task_types строятся из БД при старте (run_suggest_indexer()
+  в lifespan) и дальше обновляются по событиям шины (user_* / process_* / task_type_*):
+  для id из события строки перечитываются, события без id — перезагрузка вида целиком
+  (чанки импорта через COPY id не несут — перезагрузка одна, по событию конца импорта)
+"""
+
+import asyncio
+from typing import Any, Callable, Iterable, Literal, Optional
+
+from sqlalchemy import select
+
+from ..core.events import events
+from ..core.logging import get_logger
+from ..core.prefix_index import PrefixIndex
+from ..db.models import Process, TaskType, User
+from ..db.session import AsyncSessionLocal
+
+log = get_logger("suggest")
+
+SUGGEST_LIMIT = 10
+SUGGEST_MAX_LIMIT = 50
+DEBOUNCE = 0.05  # сек: всплеск событий → одно перечитывание
+
+SuggestKind = Literal["users", "processes", "task_types"]
+
+users = PrefixIndex()
+processes = PrefixIndex()
+task_types = PrefixIndex()
+
+
+def _process_entry(r: Any) -> tuple[int, tuple, dict[str, Any]]:
+    return r.id, (r.name,), {"id": r.id, "name": r.name, "status": r.status}
+
+
+def _task_type_entry(r: Any) -> tuple[int, tuple, dict[str, Any]]:
+    return r.id, (r.key, r.title), {"id": r.id, "key": r.key, "title": r.title}
+
+
+def _user_entry(r: Any) -> tuple[int, tuple, dict[str, Any]]:
+    return r.id, (r.email, r.display_name), {"id": r.id, "email": r.email, "name": r.display_name}
+
+
+# вид → (индекс, колонки выборки, построитель записи, префикс событий, условие отбора)
+_SOURCES: dict[str, tuple[PrefixIndex, tuple, Callable[[Any], tuple], str, Any]] = {
+    "users": (users, (User.id, User.email, User.display_name), _user_entry, "user_", User.is_active.is_(True)),
+    "processes": (processes, (Process.id, Process.name, Process.status), _process_entry, "process_", None),
+    "task_types": (task_types, (TaskType.id, TaskType.key, TaskType.title), _task_type_entry, "task_type_", None),
+}
+
+
+def _select(kind: str):
+    _, cols, _, _, where = _SOURCES[kind]
+    stmt = select(*cols)
+    return stmt if where is None else stmt.where(where)
+
+_lock = asyncio.Lock()
+
+
+async def reload(kind: str) -> None:
+    index, _, entry, _, _ = _SOURCES[kind]
+    async with _lock:
+        async with AsyncSessionLocal() as s:
+            rows = (await s.execute(_select(kind))).all()
+        index.load(entry(r) for r in rows)
+    log.info("suggest_index_loaded", kind=kind, items=len(index))
+
+
+async def refresh(kind: str, ids: Iterable[int]) -> None:
+    """Перечитать заданные id: есть в БД (и проходят отбор) — обновить, нет — убрать из индекса."""
+    index, cols, entry, _, _ = _SOURCES[kind]
+    ids = sorted(set(ids))
+    if not ids:
+        return
+    async with _lock:
+        async with AsyncSessionLocal() as s:
+            rows = (await s.execute(_select(kind).where(cols[0].in_(ids)))).all()
+        found = set()
+        for r in rows:
+            found.add(r.id)
+            index.upsert(*entry(r))
+        for i in ids:
+            if i not in found:
+                index.remove(i)
+
+
+async def suggest(kind: SuggestKind, prefix: str, limit: Optional[int] = None) -> list[dict[str, Any]]:
+    n = max(1, min(int(limit or SUGGEST_LIMIT), SUGGEST_MAX_LIMIT))
+    index = _SOURCES[kind][0]
+    if not index.ready:
+        await reload(kind)
+    return index.suggest(prefix, n)
+
+
+def _route(ev: Any) -> tuple[Optional[str], Optional[set[int]]]:
+    """(вид, id для перечитывания); id None — перезагрузка вида целиком."""
+    if not isinstance(ev, dict):
+        return None, set()
+    t = str(ev.get("type", ""))
+    for kind, (_, _, _, prefix, _) in _SOURCES.items():
+        if t.startswith(prefix):
+            if ev.get("ids") is not None:
+                return kind, {int(i) for i in ev["ids"]}
+            if ev.get("id") is not None:
+                return kind, {int(ev["id"])}
+            if t.endswith("_import") and not ev.get("done"):
+                return kind, set()  # чанк без id (COPY) — перезагрузка одна, по событию конца импорта
+            return kind, None
+    return None, set()
+
+
+async def run_suggest_indexer() -> None:
+    q = await events.subscribe()  # подписка до загрузки — события за время чтения не теряются
+    try:
+        for kind in _SOURCES:
+            try:
+                await reload(kind)
+            except Exception:
+                log.exception("suggest_index_load_failed", kind=kind)
+        while True:
+            batch = [await q.get()]
+            await asyncio.sleep(DEBOUNCE)
+            while not q.empty():
+                batch.append(q.get_nowait())
+            ids: dict[str, set[int]] = {}
+            full: set[str] = set()
+            for ev in batch:
+                kind, got = _route(ev)
+                if kind is None:
+                    continue
+                if got is None:
+                    full.add(kind)
+                else:
+                    ids.setdefault(kind, set()).update(got)
+            for kind in _SOURCES:
+                try:
+                    if kind in full:
+                        await reload(kind)
+                    elif ids.get(kind):
+                        await refresh(kind, ids[kind])
+                except Exception:
+                    log.exception("suggest_index_update_failed", kind=kind)
+    finally:
+        await events.unsubscribe(q)
+
+
+__all__ = [
+    "SUGGEST_LIMIT",
+    "SUGGEST_MAX_LIMIT",
+    "SuggestKind",
+    "users",
+    "processes",
+    "task_types",
+    "reload",
+    "refresh",
+    "suggest",
+    "run_suggest_indexer",
+]
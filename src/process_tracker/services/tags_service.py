@@ -0,0 +1,401 @@
+from __future__ import annotations
+"""
+Метки задач + индекс для комбинированных фильтров.
+
+TagIndex держит в памяти сжатые битмапы id задач (core/bitmap.py):
+по каждой метке, по статусу и по исполнителю, плюс «вселенную» всех задач
+(для NOT). Булево выражение вида
+
+    urgent AND (backend OR "api v2") AND NOT status:done AND assignee:12
+
+сводится к нескольким операциям над битмапами, а страница результата
+гидрируется одним запросом TaskRepo.rows_by_ids.
+
+Индекс строится целиком при старте (run_tag_indexer() в lifespan) и дальше
+поддерживается инкрементально по событиям шины: для затронутых id перечитываются
+status/assignee/метки (чанк импорта — id вставленных строк). События без id —
+полная перестройка; импорт через COPY id не знает — перестройка одна, в конце.
+Индекс eventually consistent: запись без события будет видна после перестройки.
+"""
+
+import asyncio
+import re
+from typing import Any, Iterable, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.bitmap import BACKEND, new_bitmap, page_desc
+from ..core.events import events
+from ..core.logging import get_logger
+from ..db.dal.keyset import clamp_limit, decode_cursor, encode_cursor
+from ..db.dal.tag_repo import TagRepo
+from ..db.dal.task_repo import TaskRepo
+from ..db.session import AsyncSessionLocal
+
+log = get_logger("tags")
+
+DEBOUNCE = 0.05          # сек: склеиваем всплеск событий в одно обновление индекса
+FULL_REBUILD_IDS = 20_000  # больше затронутых id за раз — дешевле перестроить целиком
+
+_IGNORED_EVENTS = {"task_stats", "task_board_rebalanced", "task_type_created"}
+
+
+# ───────────────────────── индекс ─────────────────────────
+
+class TagIndex:
+    def __init__(self) -> None:
+        self.universe = new_bitmap()
+        self.tags: dict[int, Any] = {}
+        self.statuses: dict[str, Any] = {}
+        self.assignees: dict[Optional[int], Any] = {}
+        self.names: dict[str, int] = {}  # имя метки → id
+        self.ready = False
+
+    @staticmethod
+    def _put(d: dict, key: Any, task_id: int) -> None:
+        bm = d.get(key)
+        if bm is None:
+            bm = d[key] = new_bitmap()
+        bm.add(task_id)
+
+    def load(self, tasks: Iterable[Sequence[Any]], pairs: Iterable[tuple[int, int]]) -> None:
+        """Добавить задачи (id, status, assignee_id) и пары (task_id, tag_id)."""
+        for task_id, status, assignee_id in tasks:
+            self.universe.add(task_id)
+            self._put(self.statuses, status, task_id)
+            self._put(self.assignees, assignee_id, task_id)
+        for task_id, tag_id in pairs:
+            self._put(self.tags, tag_id, task_id)
+
+    def forget(self, ids: Iterable[int]) -> None:
+        """Убрать задачи из всех битмапов — одна ANDNOT-операция на битмап, а не на задачу."""
+        gone = new_bitmap(ids)
+        self.universe -= gone
+        for d in (self.statuses, self.assignees, self.tags):
+            for key in list(d):
+                d[key] -= gone
+                if not d[key] and d is not self.tags:
+                    del d[key]
+
+    def refresh(self, ids: Iterable[int], tasks: Iterable[Sequence[Any]], pairs: Iterable[tuple[int, int]]) -> None:
+        self.forget(ids)
+        self.load(tasks, pairs)
+
+    def swap(self, other: "TagIndex") -> None:
+        self.universe, self.tags, self.statuses, self.assignees, self.names = (
+            other.universe, other.tags, other.statuses, other.assignees, other.names,
+        )
+        self.ready = True
+
+    def rename(self, tag_id: int, name: Optional[str]) -> None:
+        self.names = {n: i for n, i in self.names.items() if i != tag_id}
+        if name is not None:
+            self.names[name] = tag_id
+
+    def drop_tag(self, tag_id: int) -> None:
+        self.tags.pop(tag_id, None)
+        self.rename(tag_id, None)
+
+    def count(self, tag_id: int) -> int:
+        bm = self.tags.get(tag_id)
+        return len(bm) if bm is not None else 0
+
+    # ---- выражения ----
+
+    def atom(self, token: str, *, quoted: bool = False) -> Any:
+        """Битмап для терма: метка, status:<s> или assignee:<id|none>. ValueError — неизвестная метка."""
+        if not quoted:
+            key, sep, value = token.partition(":")
+            if sep and key.lower() == "status":
+                bm = self.statuses.get(value)
+                return bm.copy() if bm is not None else new_bitmap()
+            if sep and key.lower() == "assignee":
+                if value.lower() in ("none", "null", ""):
+                    aid: Optional[int] = None
+                else:
+                    try:
+                        aid = int(value)
+                    except ValueError:
+                        raise ValueError(f"invalid assignee '{value}'") from None
+                bm = self.assignees.get(aid)
+                return bm.copy() if bm is not None else new_bitmap()
+        tag_id = self.names.get(token)
+        if tag_id is None:
+            raise ValueError(f"unknown tag '{token}'")
+        bm = self.tags.get(tag_id)
+        return bm.copy() if bm is not None else new_bitmap()
+
+    def evaluate(self, expr: str) -> Any:
+        """Битмап id задач, удовлетворяющих выражению. ValueError — синтаксис или неизвестная метка."""
+        return _Parser(self, expr).parse()
+
+
+_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+_KEYWORDS = {"AND", "OR", "NOT"}
+
+
+class _Parser:
+    """
+    expr   := term (OR term)*
+    term   := factor ([AND] factor)*      — соседние термы без оператора = AND
+    factor := NOT factor | '(' expr ')' | атом
+    """
+
+    def __init__(self, index: TagIndex, expr: str) -> None:
+        self.index = index
+        self.tokens: list[tuple[str, str]] = []
+        pos, text = 0, (expr or "").strip()
+        while pos < len(text):
+            m = _TOKEN_RE.match(text, pos)
+            if not m or m.end() == pos:
+                raise ValueError(f"unexpected input at {pos}: {text[pos:pos + 10]!r}")
+            pos = m.end()
+            lpar, rpar, quoted, word = m.groups()
+            if lpar:
+                self.tokens.append(("(", "("))
+            elif rpar:
+                self.tokens.append((")", ")"))
+            elif quoted is not None:
+                self.tokens.append(("quoted", quoted))
+            elif word.upper() in _KEYWORDS:
+                self.tokens.append((word.upper(), word))
+            else:
+                self.tokens.append(("word", word))
+        self.pos = 0
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def _take(self) -> tuple[str, str]:
+        tok = self.tokens[self.pos]
+        self.pos += 1
+        return tok
+
+    def parse(self) -> Any:
+        if not self.tokens:
+            raise ValueError("empty expression")
+        out = self._expr()
+        if self._peek() is not None:
+            raise ValueError(f"unexpected '{self.tokens[self.pos][1]}'")
+        return out
+
+    def _expr(self) -> Any:
+        out = self._term()
+        while self._peek() == "OR":
+            self._take()
+            out |= self._term()
+        return out
+
+    def _term(self) -> Any:
+        out = self._factor()
+        while self._peek() in ("AND", "NOT", "(", "word", "quoted"):
+            if self._peek() == "AND":
+                self._take()
+            out &= self._factor()
+        return out
+
+    def _factor(self) -> Any:
+        kind = self._peek()
+        if kind is None:
+            raise ValueError("unexpected end of expression")
+        if kind == "NOT":
+            self._take()
+            return self.index.universe - self._factor()
+        if kind == "(":
+            self._take()
+            out = self._expr()
+            if self._peek() != ")":
+                raise ValueError("missing ')'")
+            self._take()
+            return out
+        if kind in ("word", "quoted"):
+            _, value = self._take()
+            return self.index.atom(value, quoted=kind == "quoted")
+        raise ValueError(f"unexpected '{self.tokens[self.pos][1]}'")
+
+
+tag_index = TagIndex()
+_rebuild_lock = asyncio.Lock()
+
+
+async def rebuild_index() -> None:
+    """Полная перестройка: строим новый индекс рядом и подменяем содержимое tag_index."""
+    async with _rebuild_lock:
+        fresh = TagIndex()
+        async with AsyncSessionLocal() as s:
+            repo = TagRepo(s)
+            fresh.names = {t.name: t.id for t in await repo.list()}
+            async for kind, row in repo.stream_all():
+                if kind == "task":
+                    fresh.load((row,), ())
+                else:
+                    fresh.load((), (row,))
+        tag_index.swap(fresh)
+        log.info("tag_index_rebuilt", tasks=len(fresh.universe), tags=len(fresh.names), backend=BACKEND)
+
+
+async def refresh_index(ids: Iterable[int]) -> None:
+    ids = sorted(set(ids))
+    if not ids:
+        return
+    async with AsyncSessionLocal() as s:
+        tasks, pairs = await TagRepo(s).task_states(ids)
+    tag_index.refresh(ids, tasks, pairs)
+
+
+async def ensure_index() -> TagIndex:
+    if not tag_index.ready:
+        await rebuild_index()
+    return tag_index
+
+
+def _apply_event(ev: Any) -> Optional[set[int]]:
+    """Правки меток применяет сразу; возвращает id задач для перечитывания, None — нужна полная перестройка."""
+    if not isinstance(ev, dict):
+        return set()
+    t = str(ev.get("type", ""))
+    if t == "tag_deleted":
+        tag_index.drop_tag(int(ev["id"]))
+        return set()
+    if t in ("tag_created", "tag_updated"):
+        tag_index.rename(int(ev["id"]), ev.get("name"))
+        return set()
+    if not t.startswith("task_") or t in _IGNORED_EVENTS:
+        return set()
+    if t == "task_batch":
+        return {int(i) for k in ("created", "updated", "deleted") for i in ev.get(k) or ()}
+    if ev.get("ids") is not None:
+        return {int(i) for i in ev["ids"]}
+    if ev.get("id") is not None:
+        return {int(ev["id"])}
+    if t == "task_import" and not ev.get("done"):
+        return set()  # чанк без id (COPY) — перестройка одна, по событию конца импорта
+    return None
+
+
+async def run_tag_indexer() -> None:
+    q = await events.subscribe()  # подписка до перестройки — события за время сборки не теряются
+    try:
+        try:
+            await rebuild_index()
+        except Exception:
+            log.exception("tag_index_rebuild_failed")
+        while True:
+            batch = [await q.get()]
+            await asyncio.sleep(DEBOUNCE)
+            while not q.empty():
+                batch.append(q.get_nowait())
+            ids: set[int] = set()
+            full = False
+            for ev in batch:
+                got = _apply_event(ev)
+                if got is None:
+                    full = True
+                else:
+                    ids |= got
+            try:
+                if full or len(ids) > FULL_REBUILD_IDS:
+                    await rebuild_index()
+                elif ids:
+                    await refresh_index(ids)
+            except Exception:
+                log.exception("tag_index_update_failed", ids=len(ids), full=full)
+    finally:
+        await events.unsubscribe(q)
+
+
+# ───────────────────────── сервис ─────────────────────────
+
+class TagsService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.repo = TagRepo(session)
+
+    async def list(self) -> list[dict[str, Any]]:
+        index = await ensure_index()
+        return [
+            {"id": t.id, "name": t.name, "color": t.color, "tasks": index.count(t.id)}
+            for t in await self.repo.list()
+        ]
+
+    async def create(self, name: str, color: Optional[str] = None) -> dict[str, Any]:
+        try:
+            tag = await self.repo.create(name, color)
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        await events.publish({"type": "tag_created", "id": tag.id, "name": tag.name})
+        return {"id": tag.id, "name": tag.name, "color": tag.color, "tasks": 0}
+
+    async def update(self, tag_id: int, values: dict[str, Any]) -> Optional[dict[str, Any]]:
+        try:
+            if values and not await self.repo.update(tag_id, **values):
+                return None
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        tag = await self.repo.get_by_id(tag_id)
+        if tag is None:
+            return None
+        await events.publish({"type": "tag_updated", "id": tag.id, "name": tag.name})
+        return {"id": tag.id, "name": tag.name, "color": tag.color, "tasks": tag_index.count(tag.id)}
+
+    async def delete(self, tag_id: int) -> bool:
+        try:
+            removed = await self.repo.remove(tag_id)
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        if removed:
+            await events.publish({"type": "tag_deleted", "id": tag_id})
+        return bool(removed)
+
+    async def set_task_tags(self, task_id: int, names: Sequence[str]) -> Optional[list[str]]:
+        """Заменить метки задачи (недостающие метки создаются). None — задачи нет."""
+        if task_id not in await TaskRepo(self.session).existing_ids([task_id]):
+            return None
+        names = list(dict.fromkeys(n.strip() for n in names if n and n.strip()))
+        try:
+            ids = await self.repo.ensure(names)
+            await self.repo.set_task_tags(task_id, ids.values())
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        for name, tag_id in ids.items():
+            tag_index.rename(tag_id, name)  # новые метки — сразу видны в выражениях
+        await events.publish({"type": "task_tags", "ids": [task_id], "tags": sorted(names)})
+        return sorted(names)
+
+    async def query(self, expr: str, *, limit: Optional[int] = None, cursor: Optional[str] = None) -> dict[str, Any]:
+        """
+        Задачи по булеву выражению над метками/статусом/исполнителем, ORDER BY id DESC.
+        ValueError — синтаксис/неизвестная метка/битый курсор.
+        """
+        n = clamp_limit(limit)
+        below = decode_cursor(cursor)[1] if cursor else None
+        index = await ensure_index()
+        matched = index.evaluate(expr)
+        total = len(matched)
+        ids = page_desc(matched, n + 1, below)
+        rows = await TaskRepo(self.session).rows_by_ids(ids[:n])
+        tags = await self.repo.tags_of(r["id"] for r in rows)
+        return {
+            "total": total,
+            "items": [{**dict(r), "tags": tags.get(r["id"], [])} for r in rows],
+            "next_cursor": encode_cursor([], ids[n - 1]) if len(ids) > n else None,
+        }
+
+
+__all__ = [
+    "TagIndex",
+    "TagsService",
+    "tag_index",
+    "rebuild_index",
+    "refresh_index",
+    "ensure_index",
+    "run_tag_indexer",
+]
@@ -1,47 +1,66 @@
 from __future__ import annotations
 
-from typing import Any, Optional
+from typing import Any, Awaitable, Callable, Optional, TypeVar
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..db.dal.task_repo import TaskRepo
+from ..core.config import settings
 from ..core.events import events
+from .group_commit import GroupCommitter
+
+T = TypeVar("T")
+
+# общий для всех экземпляров TaskService: пачка собирается из параллельных запросов
+task_commits = GroupCommitter(
+    window=settings.task_group_commit_window_ms / 1000.0,
+    max_ops=settings.task_group_commit_max_ops,
+)
 
 
 class TaskService:
-    def __init__(self, session: AsyncSession):
+    """
+    create / set_status / remove: по умолчанию — commit на своей сессии;
+    с settings.task_group_commit (или group=...) — через групповой commit
+    (services/group_commit.py): результат и событие — после общего COMMIT пачки.
+    Если у сессии сервиса уже открыта транзакция (был хоть один запрос), мутация идёт
+    в ней, без пачки: пачке нужен писатель SQLite, а его держит эта же транзакция.
+    """
+
+    def __init__(self, session: AsyncSession, *, group: Optional[GroupCommitter] = None):
         self.repo = TaskRepo(session)
         self.session = session
+        self.group = group if group is not None else (task_commits if settings.task_group_commit else None)
+
+    async def _mutate(
+        self,
+        fn: Callable[[TaskRepo], Awaitable[T]],
+        event: Callable[[T], Optional[dict]],
+    ) -> T:
+        if self.group is not None and not self.session.in_transaction():
+            return await self.group.submit(lambda s: fn(TaskRepo(s)), event=event)
+        result = await fn(self.repo)
+        await self.session.commit()
+        payload = event(result)
+        if payload:
+            await events.publish(payload)
+        return result
 
     async def list(self):
         return await self.repo.list()
 
     async def create(self, title: str):
-        task = await self.repo.create(title)
-        await self.session.commit()
-        await events.publish({"type": "task_created", "id": task.id, "title": getattr(task, "title", f"Task #{task.id}")})
-        return task
+        return await self._mutate(
+            lambda repo: repo.create(title),
+            lambda task: {"type": "task_created", "id": task.id, "title": getattr(task, "title", f"Task #{task.id}")},
+        )
 
     async def set_status(self, task_id: int, status: str) -> int:
-        """
-        Унифицированная смена статуса.
-        Совместимость:
-          - если в repo есть set_status(...) — используем его
-          - иначе транслируем в set_done(...) (старый флаг)
-        """
-        changed_id: int = 0
-        if hasattr(self.repo, "set_status"):
-            changed_id = await getattr(self.repo, "set_status")(task_id, status)
-        else:
-            # Fallback к старому полю done
-            normalized = (status or "").strip().lower()
-            done = normalized in {"done", "closed", "resolved", "complete"}
-            changed_id = await getattr(self.repo, "set_done")(task_id, done)  # type: ignore[misc]
-
-        await self.session.commit()
-        if changed_id:
-            await events.publish({"type": "task_updated", "id": task_id, "status": status})
-        return changed_id
+        """Смена статуса одним UPDATE; возвращает id задачи или 0, если её нет."""
+        return await self._mutate(
+            lambda repo: repo.update_status(task_id, status),
+            lambda changed: {"type": "task_updated", "id": task_id, "status": status} if changed else None,
+        )
 
     async def set_done(self, task_id: int, done: bool) -> int:
         """
@@ -50,8 +69,78 @@ class TaskService:
         return await self.set_status(task_id, "done" if done else "open")
 
     async def remove(self, task_id: int):
-        removed = await self.repo.remove(task_id)
-        await self.session.commit()
-        if removed:
-            await events.publish({"type": "task_deleted", "id": task_id})
-        return removed
+        return await self._mutate(
+            lambda repo: repo.remove(task_id),
+            lambda removed: {"type": "task_deleted", "id": task_id} if removed else None,
+        )
+
+    async def apply_batch(self, ops: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Пакетное применение операций в ОДНОЙ транзакции.
+        ops: {"op": "create", "values": {...}}
+           | {"op": "patch", "id": int, "values": {...}}   (values["fields"] — merge в БД)
+           | {"op": "delete", "id": int}
+        Порядок применения: все create → все patch → все delete.
+        Возвращает результаты в порядке ops: {"ok": bool, "id": int|None, "error": str|None}.
+        Событие — одно на всю пачку (task_batch), и только после commit.
+        """
+        if not ops:
+            return []
+        results: list[Optional[dict[str, Any]]] = [None] * len(ops)
+        creates = [(i, op) for i, op in enumerate(ops) if op["op"] == "create"]
+        patches = [(i, op) for i, op in enumerate(ops) if op["op"] == "patch"]
+        deletes = [(i, op) for i, op in enumerate(ops) if op["op"] == "delete"]
+
+        try:
+            created_ids = await self.repo.create_many([op["values"] for _, op in creates])
+            for (i, _), tid in zip(creates, created_ids):
+                results[i] = {"ok": True, "id": tid, "error": None}
+
+            updated: list[int] = []
+            if patches:
+                # сроки — чтобы проверить start_at <= due_at с учётом хранимого значения:
+                # иначе патч одной даты упрётся в ck_tasks_span и откатит всю пачку
+                spans = await self.repo.spans_by_ids(op["id"] for _, op in patches)
+                rows: list[dict[str, Any]] = []
+                field_patches: list[tuple[int, dict]] = []
+                for i, op in patches:
+                    tid = int(op["id"])
+                    if tid not in spans:
+                        results[i] = {"ok": False, "id": tid, "error": "not found"}
+                        continue
+                    values = dict(op["values"])
+                    start, due = spans[tid]
+                    start = values.get("start_at", start)
+                    due = values.get("due_at", due)
+                    if start is not None and due is not None and start > due:
+                        results[i] = {"ok": False, "id": tid, "error": "start_at must not be later than due_at"}
+                        continue
+                    spans[tid] = (start, due)
+                    if "fields" in values:
+                        # merge делает БД (json_patch / jsonb ||) — без чтения текущих fields
+                        field_patches.append((tid, values.pop("fields") or {}))
+                    if values:
+                        rows.append({"id": tid, **values})
+                    results[i] = {"ok": True, "id": tid, "error": None}
+                    updated.append(tid)
+                await self.repo.update_many(rows)
+                await self.repo.update_fields_many(field_patches)
+
+            removed = await self.repo.remove_many(op["id"] for _, op in deletes)
+            for i, op in deletes:
+                tid = int(op["id"])
+                ok = tid in removed
+                results[i] = {"ok": ok, "id": tid, "error": None if ok else "not found"}
+
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+
+        await events.publish({
+            "type": "task_batch",
+            "created": created_ids,
+            "updated": sorted(set(updated)),
+            "deleted": sorted(removed),
+        })
+        return results  # type: ignore[return-value]
@@ -0,0 +1,137 @@
+from __future__ import annotations
+"""
+Сохранённые представления в БД (SavedView) + исполнение.
+
+- CRUD с тем же интерфейсом, что и in-memory фоллбек в routes/views.py
+- results(): спецификация компилируется один раз на (view_id, version) в
+  CompiledView (LRU), страница читается keyset'ом
+- страницы результатов кэшируются по (view, version, права вызывающего, поколение ресурса,
+  cursor, limit) — страница одного вызывающего другому не отдаётся;
+  поколения двигают события task_* / process_* (core/cache.py).
+  TTL — страховка от записей без событий.
+"""
+
+from typing import Callable, Hashable, Optional
+
+from sqlalchemy import select
+
+from ..core.cache import LRUCache, generation
+from ..db.dal.keyset import clamp_limit
+from ..db.dal.view_query import CompiledView, compile_view
+from ..db.models import SavedView
+from ..db.session import AsyncSessionLocal, AsyncWriteSessionLocal
+
+COMPILED_CACHE_SIZE = 256
+RESULTS_CACHE_SIZE = 1024
+RESULTS_TTL = 60.0
+
+
+_compiled = LRUCache(COMPILED_CACHE_SIZE)
+_results = LRUCache(RESULTS_CACHE_SIZE, ttl=RESULTS_TTL)
+
+
+def _to_dict(v: SavedView) -> dict:
+    return {
+        "id": v.id, "name": v.name, "resource": v.resource, "query": v.query or {},
+        "layout": v.layout, "meta": v.meta or {}, "created_at": v.created_at, "version": v.version,
+    }
+
+
+class ViewsService:
+    """Представления в БД; каждая операция — в своей короткой сессии."""
+
+    async def list(self, resource: Optional[str] = None) -> list[dict]:
+        async with AsyncSessionLocal() as s:
+            stmt = select(SavedView).order_by(SavedView.id)
+            if resource:
+                stmt = stmt.where(SavedView.resource == resource)
+            return [_to_dict(v) for v in (await s.execute(stmt)).scalars()]
+
+    async def get(self, view_id: int) -> dict:
+        async with AsyncSessionLocal() as s:
+            v = await s.get(SavedView, view_id)
+            if v is None:
+                raise KeyError(view_id)
+            return _to_dict(v)
+
+    async def create(self, name: str, resource: str, query: dict, layout: str, meta: dict | None) -> dict:
+        compile_view(resource, query)  # ValueError — сразу, а не при первом results()
+        async with AsyncWriteSessionLocal() as s:
+            v = SavedView(name=name, resource=resource, query=query or {}, layout=layout, meta=meta or {})
+            s.add(v)
+            await s.commit()
+            await s.refresh(v)
+            return _to_dict(v)
+
+    async def update(self, view_id: int, patch: dict) -> dict:
+        async with AsyncWriteSessionLocal() as s:
+            v = await s.get(SavedView, view_id)
+            if v is None:
+                raise KeyError(view_id)
+            if "query" in patch or "resource" in patch:
+                compile_view(patch.get("resource", v.resource), patch.get("query", v.query))
+            for k in ("name", "resource", "query", "layout", "meta"):
+                if k in patch:
+                    setattr(v, k, patch[k])
+            v.version = (v.version or 0) + 1  # старые скомпилированные запросы/результаты больше не совпадут
+            await s.commit()
+            await s.refresh(v)
+            return _to_dict(v)
+
+    async def delete(self, view_id: int) -> bool:
+        async with AsyncWriteSessionLocal() as s:
+            v = await s.get(SavedView, view_id)
+            if v is None:
+                return False
+            await s.delete(v)
+            await s.commit()
+            return True
+
+    async def results(
+        self,
+        view_id: int,
+        *,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        authorize: Optional[Callable[[str], None]] = None,
+        scope: Hashable = None,
+    ) -> dict:
+        """
+        Страница результатов представления: {"items", "next_cursor", "group_by"}.
+        authorize(resource) — проверка прав на ресурс представления (до кэша и запроса);
+        scope — права вызывающего, часть ключа кэша страниц.
+        KeyError — нет представления, ValueError — битый курсор/спецификация.
+        """
+        n = clamp_limit(limit)
+        async with AsyncSessionLocal() as s:
+            head = (
+                await s.execute(
+                    select(SavedView.resource, SavedView.query, SavedView.version).where(SavedView.id == view_id)
+                )
+            ).first()
+            if head is None:
+                raise KeyError(view_id)
+            resource, query, version = head
+            if authorize is not None:
+                authorize(resource)
+            dialect = s.get_bind().dialect.name
+
+            ckey = (view_id, version, dialect)
+            compiled: Optional[CompiledView] = _compiled.get(ckey)
+            if compiled is None:
+                compiled = compile_view(resource, query, dialect)
+                _compiled.put(ckey, compiled)
+
+            rkey = (view_id, version, scope, generation(resource), cursor, n)
+            cached = _results.get(rkey)
+            if cached is not None:
+                return cached
+
+            rows = (await s.execute(compiled.page(n, cursor))).mappings().all()
+        items, next_cursor = compiled.cut(rows, n)
+        out = {"items": items, "next_cursor": next_cursor, "group_by": compiled.group_by}
+        _results.put(rkey, out)
+        return out
+
+
+__all__ = ["ViewsService"]
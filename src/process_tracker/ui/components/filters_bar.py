@@ -1,4 +1,5 @@
 from __future__ import annotations
+from typing import Any, Callable, Mapping, Optional, Sequence
 import flet as ft
 
 def filters_bar(*controls: ft.Control) -> ft.Container:
@@ -6,3 +7,25 @@ def filters_bar(*controls: ft.Control) -> ft.Container:
     return ft.Container(row, padding=10, border_radius=12,
                         border=ft.border.all(1, ft.colors.with_opacity(0.06, ft.colors.WHITE)),
                         bgcolor=ft.colors.with_opacity(0.04, ft.colors.SURFACE))
+
+
+def facet_dropdown(
+    label: str,
+    values: Sequence[Mapping[str, Any]],
+    *,
+    value: Optional[str] = None,
+    labels: Optional[Mapping[Any, str]] = None,
+    on_change: Optional[Callable[[Any], Any]] = None,
+) -> ft.Dropdown:
+    """
+    Выпадающий фильтр по одному фасету из GET /tasks/facets:
+    values — [{"value": v, "count": n}], пункт «значение (n)»; None — «не задано».
+    """
+    labels = labels or {}
+    options = [ft.dropdown.Option(key="", text="Все")]
+    for item in values:
+        v = item.get("value")
+        if v is None:
+            continue  # «не задано» фильтром ленты не выразить
+        options.append(ft.dropdown.Option(key=str(v), text=f"{labels.get(v, v)} ({item.get('count', 0)})"))
+    return ft.Dropdown(label=label, options=options, value=value or "", width=200, dense=True, on_change=on_change)
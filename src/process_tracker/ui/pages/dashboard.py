@@ -1,41 +1,31 @@
 from __future__ import annotations
 
+import asyncio
+
 import flet as ft
-from sqlalchemy import select, func
 
+from ...core.events import events
 from ...db.session import AsyncSessionLocal
-from ...db.models import Task, Process
+from ...db.stats import read_summary
 from ..components.shell import page_scaffold
 from ..components.stat_card import metric_tile
 
 
 # ── данные ───────────────────────────────────────────────────────────────────
 
+def _kpi(summary: dict) -> tuple[int, int, int]:
+    done_cnt = int(summary.get("by_status", {}).get("done", 0))
+    open_cnt = max(int(summary.get("total", 0)) - done_cnt, 0)
+    return open_cnt, done_cnt, int(summary.get("processes", 0))
+
+
 async def _load_counts():
-    open_cnt = 0
-    done_cnt = 0
-    proc_cnt = 0
-    async with AsyncSessionLocal() as s:
-        try:
-            proc_cnt = (await s.scalar(select(func.count()).select_from(Process))) or 0
-        except Exception:
-            proc_cnt = 0
-        try:
-            total = (await s.scalar(select(func.count()).select_from(Task))) or 0
-        except Exception:
-            total = 0
-        try:
-            if hasattr(Task, "status"):
-                done_cnt = (await s.scalar(
-                    select(func.count()).select_from(Task).where(Task.status == "done")
-                )) or 0
-                open_cnt = max(total - done_cnt, 0)
-            else:
-                open_cnt = total
-        except Exception:
-            open_cnt = total
-            done_cnt = 0
-    return open_cnt, done_cnt, proc_cnt
+    # одна выборка из task_counters (ведётся триггерами) вместо трёх COUNT(*) по tasks
+    try:
+        async with AsyncSessionLocal() as s:
+            return _kpi(await read_summary(s))
+    except Exception:
+        return 0, 0, 0
 
 
 # ── view ─────────────────────────────────────────────────────────────────────
@@ -54,8 +44,28 @@ def view(page: ft.Page) -> ft.View:
         except Exception:
             pass
 
+    async def watch():
+        # живые дельты: событие task_stats несёт актуальную сводку — БД не трогаем
+        q = await events.subscribe()
+        try:
+            while page.route == "/dashboard":
+                try:
+                    ev = await asyncio.wait_for(q.get(), timeout=5.0)
+                except asyncio.TimeoutError:
+                    continue  # заодно проверяем, что пользователь ещё на дашборде
+                if isinstance(ev, dict) and ev.get("type") == "task_stats":
+                    o, d, p = _kpi(ev.get("summary") or {})
+                    v_open.value, v_done.value, v_proc.value = str(o), str(d), str(p)
+                    try:
+                        page.update()
+                    except Exception:
+                        pass
+        finally:
+            await events.unsubscribe(q)
+
     try:
         page.run_task(refresh)
+        page.run_task(watch)
     except Exception:
         pass
 
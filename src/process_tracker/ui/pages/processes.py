@@ -10,18 +10,34 @@ def view(page: ft.Page) -> ft.View:
 
     async def load():
         try:
-            items = await api.list_processes(limit=100)
+            # сводки по задачам приходят вместе со списком — без отдельных запросов задач
+            data = await api.processes_list(rollups=True, limit=100, fields=("name", "status"))
         except Exception as ex:  # noqa: BLE001
             toast(page, f"Ошибка загрузки: {ex}", kind="error")
             return
         table.controls[:] = []
-        for p in items:
+        for p in data.get("items", []):
+            t = p.get("tasks") or {}
+            total = t.get("open", 0) + t.get("done", 0)
             row = ft.Container(
                 content=ft.Row(
                     [
                         ft.Text(f"#{p['id']}", width=60),
                         ft.Text(p["name"], expand=True),
                         ft.Container(width=10),
+                        ft.Column(
+                            [
+                                ft.ProgressBar(value=(t.get("done", 0) / total) if total else 0, width=140),
+                                ft.Text(
+                                    f"{t.get('done', 0)}/{total} готово"
+                                    + (f" · просрочено {t['overdue']}" if t.get("overdue") else ""),
+                                    size=12,
+                                ),
+                            ],
+                            spacing=2,
+                            tight=True,
+                        ),
+                        ft.Container(width=10),
                         ft.Chip(label=ft.Text(p["status"])),
                     ],
                     vertical_alignment=ft.CrossAxisAlignment.CENTER,
@@ -39,7 +55,7 @@ def view(page: ft.Page) -> ft.View:
         n = (name.value or "").strip()
         if not n:
             toast(page, "Введите название", kind="warning"); return
-        await api.create_process(n)
+        await api.processes_create(n)
         name.value = ""
         await load()
 
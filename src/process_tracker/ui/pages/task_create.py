@@ -7,6 +7,7 @@ import flet as ft
 from ..components.shell import page_scaffold
 from ..components.forms import async_button, toast
 from ..state import state
+from ...core.async_utils import Debouncer
 from ...core.logging import logger
 from ..services.api import api
 
@@ -125,20 +126,23 @@ def view(page: ft.Page) -> ft.View:
         width=260,
     )
 
-    # Исполнитель: пробуем подтянуть список, есть фоллбэк на email
+    # Исполнитель: подсказки с сервера по мере ввода (префиксный индекс), есть фоллбэк на email
     assignee_dd = ft.Dropdown(label="Исполнитель (список)", dense=True, width=320)
+    assignee_search = ft.TextField(label="Поиск исполнителя", hint_text="Имя или email…", dense=True, width=320)
     assignee_email = ft.TextField(label="или укажите email исполнителя", dense=True, width=320)
+    users_debouncer = Debouncer(0.25)
 
-    async def _load_users():
+    async def _load_users(prefix: str = ""):
         try:
-            users = await api.list_users()  # [{'id','name','email'}, ...]
-            logger.info("ui_task_create_users_loaded", count=len(users))
+            users = await api.users_suggest(prefix, limit=20)  # [{'id','name','email'}, ...]
+            logger.info("ui_task_create_users_loaded", count=len(users), prefix=prefix)
             assignee_dd.options = [
                 _opt(str(u.get("id", u.get("email", ""))), f"{u.get('name') or u.get('email')} ({u.get('email','')})")
                 for u in (users or [])
             ]
-            if assignee_dd.options:
-                assignee_dd.value = assignee_dd.options[0].key
+            keys = {o.key for o in assignee_dd.options}
+            if assignee_dd.value not in keys:
+                assignee_dd.value = assignee_dd.options[0].key if assignee_dd.options else None
             try:
                 assignee_dd.update()
             except Exception:
@@ -146,6 +150,12 @@ def view(page: ft.Page) -> ft.View:
         except Exception as e:  # noqa: BLE001
             logger.warning("ui_task_create_users_failed", error=str(e))
 
+    async def _on_assignee_search(e: ft.ControlEvent):  # async — Debouncer нужен работающий цикл
+        prefix = (e.control.value or "").strip()
+        users_debouncer.call(lambda: _load_users(prefix))
+
+    assignee_search.on_change = _on_assignee_search
+
     # Срок
     date_picker = ft.DatePicker()
     time_picker = ft.TimePicker()
@@ -244,7 +254,7 @@ def view(page: ft.Page) -> ft.View:
     file_picker.on_result = _on_files_result
     attach_btn = ft.OutlinedButton("Прикрепить файлы", icon=ft.icons.ATTACH_FILE, on_click=_pick_files)
 
-    # предзагрузка пользователей (мягко)
+    # первые подсказки без префикса (мягко)
     _ = page.run_task(_load_users) if hasattr(page, "run_task") else None
 
     # --------- сохранение ---------
@@ -330,7 +340,7 @@ def view(page: ft.Page) -> ft.View:
     )
 
     assignee_row = ft.Row(
-        [assignee_dd, assignee_email],
+        [assignee_search, assignee_dd, assignee_email],
         spacing=10,
         wrap=True,
         vertical_alignment=ft.CrossAxisAlignment.END,
@@ -3,6 +3,8 @@ import os
 import httpx
 from typing import Any, Dict, Iterable, Optional
 
+from ...core.deadline import HEADER as DEADLINE_HEADER, budget
+
 
 class ApiClient:
     def __init__(self, base_url: Optional[str] = None):
@@ -27,10 +29,14 @@ class ApiClient:
     ) -> Any:
         await self._ensure_client()
         assert self._client
-        headers: Dict[str, str] = {}
+        # таймаут и X-Request-Deadline — остаток дедлайна вызывающего (если он задан)
+        timeout = budget(10.0, path)
+        headers: Dict[str, str] = {DEADLINE_HEADER: f"{timeout:.3f}"}
         if self._token:
             headers["Authorization"] = f"Bearer {self._token}"
-        r = await self._client.request(method.upper(), path, json=json_body, params=params, headers=headers)
+        r = await self._client.request(
+            method.upper(), path, json=json_body, params=params, headers=headers, timeout=timeout
+        )
         r.raise_for_status()
         ct = r.headers.get("content-type", "")
         return r.json() if ct.startswith("application/json") else r.content
@@ -58,6 +64,39 @@ class ApiClient:
     async def users_delete(self, user_id: int):
         return await self._req("DELETE", f"/users/{user_id}")
 
+    # ---- Processes ----
+    async def processes_list(
+        self,
+        *,
+        rollups: bool = True,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None,
+    ):
+        """{"items": [...], "next_cursor": ...}; rollups — счётчики задач (open/done/overdue) в том же ответе,
+        fields — только эти поля процесса (id приходит всегда)."""
+        params: Dict[str, Any] = {"limit": limit}
+        if rollups:
+            params["with"] = "rollups"
+        if cursor:
+            params["cursor"] = cursor
+        if fields:
+            params["fields"] = ",".join(fields)
+        return await self._req("GET", "/processes", params=params)
+
+    async def processes_create(self, name: str, description: Optional[str] = None):
+        return await self._req("POST", "/processes", json_body={"name": name, "description": description})
+
+    # ---- Typeahead ----
+    async def users_suggest(self, prefix: str = "", limit: int = 10):
+        return await self._req("GET", "/users/suggest", params={"prefix": prefix, "limit": limit})
+
+    async def processes_suggest(self, prefix: str = "", limit: int = 10):
+        return await self._req("GET", "/processes/suggest", params={"prefix": prefix, "limit": limit})
+
+    async def task_types_suggest(self, prefix: str = "", limit: int = 10):
+        return await self._req("GET", "/task-types/suggest", params={"prefix": prefix, "limit": limit})
+
     # ---- Templates ----
     async def templates_list(self, q: Optional[str] = None):
         return await self._req("GET", "/templates", params={"q": q} if q else None)
@@ -101,6 +140,12 @@ class ApiClient:
     async def views_delete(self, view_id: int):
         return await self._req("DELETE", f"/views/{view_id}")
 
+    # ---- Tasks ----
+    async def tasks_facets(self, **filters: Any):
+        """Счётчики для панели фильтров: status/assignee_id/type_id/process_id (+ f.<key>=...)."""
+        params = {k: v for k, v in filters.items() if v is not None}
+        return await self._req("GET", "/tasks/facets", params=params)
+
     # ---- Audit ----
     async def audit_list(
         self,
@@ -0,0 +1,42 @@
+"""db.admission: таймаут ожидания и release() в одном шаге цикла не ломают очередь."""
+
+import asyncio
+
+import pytest
+
+from process_tracker.db.admission import AdmissionController, AdmissionRejected
+
+
+def test_timeout_racing_release_does_not_lose_waiter():
+    # таймаут ожидания отменил future, а release() успел выкинуть отменённого из очереди
+    # до того, как acquire() взял lock, — ожидающий получает AdmissionRejected, слот не теряется
+    async def scenario() -> None:
+        ctl = AdmissionController("t", initial=1, min_limit=1, max_limit=1, wait=0.01)
+        await ctl.acquire()
+        waiter = asyncio.create_task(ctl.acquire())
+        while not ctl._waiters:
+            await asyncio.sleep(0)
+        # release() сразу после отмены future таймаутом — раньше, чем acquire() продолжится
+        ctl._waiters[0].future.add_done_callback(lambda _: ctl.release(None))
+        with pytest.raises(AdmissionRejected):
+            await waiter
+        assert ctl.in_flight == 0
+        assert not ctl._waiters
+        await ctl.acquire()
+        assert ctl.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_release_grants_to_waiter():
+    async def scenario() -> None:
+        ctl = AdmissionController("t", initial=1, min_limit=1, max_limit=1, wait=1.0)
+        await ctl.acquire()
+        waiter = asyncio.create_task(ctl.acquire())
+        await asyncio.sleep(0.01)
+        ctl.release(None)
+        await asyncio.wait_for(waiter, 1.0)
+        assert ctl.in_flight == 1
+        assert ctl.stats()["queued"] == 1
+
+    asyncio.run(scenario())
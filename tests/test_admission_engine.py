@@ -0,0 +1,105 @@
+"""db.admission на движках SQLite: слот на оператор, после выдачи соединения, у движка оператора."""
+
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+from process_tracker.db.admission import install_admission
+from process_tracker.db.dal.task_repo import TaskRepo
+from process_tracker.db.models import Base
+from process_tracker.db.sqlite import create_sqlite_engines, make_sessionmaker
+
+
+@pytest.fixture
+def engines(tmp_path):
+    writer, reader = create_sqlite_engines(f"sqlite+aiosqlite:///{tmp_path / 'adm.db'}", single_writer=True)
+    ctls = install_admission(writer, role="writer"), install_admission(reader, role="reader")
+
+    async def setup() -> None:
+        async with writer.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(setup())
+    yield writer, reader, ctls
+    asyncio.run(writer.dispose())
+    asyncio.run(reader.dispose())
+
+
+def test_concurrent_write_sessions_do_not_deadlock(engines):
+    # сессии в очереди к единственному писателю не держат слоты, которых ждёт его владелец
+    writer, reader, (w_ctl, _) = engines
+    Write = make_sessionmaker(writer, reader, write=True)
+
+    async def one(i: int) -> None:
+        async with Write() as s:
+            repo = TaskRepo(s)
+            await repo.list()
+            await repo.create(f"t{i}")
+            await s.commit()
+
+    async def scenario() -> list:
+        return await asyncio.wait_for(asyncio.gather(*(one(i) for i in range(40)), return_exceptions=True), 30)
+
+    results = asyncio.run(scenario())
+    assert [r for r in results if r is not None] == []
+    assert w_ctl.in_flight == 0
+    assert w_ctl.stats()["rejected"] == {"queue_full": 0, "timeout": 0, "deadline": 0}
+
+
+def test_reads_and_writes_use_their_engine_controller(engines):
+    writer, reader, (w_ctl, r_ctl) = engines
+    Local = make_sessionmaker(writer, reader)
+
+    def admitted() -> tuple[int, int]:
+        return r_ctl.stats()["admitted"], w_ctl.stats()["admitted"]
+
+    async def scenario() -> None:
+        reads, writes = admitted()  # схема создана через писателя
+        async with Local() as s:
+            await TaskRepo(s).list()
+        assert admitted() == (reads + 1, writes)
+        async with Local() as s:
+            await TaskRepo(s).create("x")
+            await s.commit()
+        assert admitted()[0] == reads + 1
+        assert admitted()[1] > writes
+
+    asyncio.run(scenario())
+
+
+def test_failed_statement_returns_slot(engines):
+    writer, reader, (w_ctl, _) = engines
+    Write = make_sessionmaker(writer, reader, write=True)
+
+    async def scenario() -> None:
+        async with Write() as s:
+            with pytest.raises(Exception):
+                await s.execute(text("SELECT * FROM no_such_table"))
+        assert w_ctl.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_writer_queue_under_minimal_limit(engines):
+    # очередь к писателю SQLite — пул на одно соединение, а не ожидание слота: даже при лимите 1
+    # сессии «прочитал → записал» проходят по очереди
+    writer, reader, ctls = engines
+    for ctl in ctls:
+        ctl.limit = 1.0
+        ctl.max_limit = 1
+    Local = make_sessionmaker(writer, reader)
+    Write = make_sessionmaker(writer, reader, write=True)
+
+    async def one(i: int) -> None:
+        async with (Write if i % 2 else Local)() as s:
+            repo = TaskRepo(s)
+            await repo.list()
+            await repo.create(f"t{i}")
+            await s.commit()
+
+    async def scenario() -> list:
+        return await asyncio.wait_for(asyncio.gather(*(one(i) for i in range(40)), return_exceptions=True), 30)
+
+    assert [r for r in asyncio.run(scenario()) if r is not None] == []
+    assert all(ctl.in_flight == 0 for ctl in ctls)
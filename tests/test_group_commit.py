@@ -0,0 +1,67 @@
+"""services.group_commit + TaskService: пачка не ждёт писателя, которого держит сам вызывающий."""
+
+import asyncio
+
+import pytest
+
+from process_tracker.db.models import Base
+from process_tracker.db.sqlite import create_sqlite_engines, make_sessionmaker
+from process_tracker.services.group_commit import GroupCommitter
+from process_tracker.services.task_service import TaskService
+
+
+@pytest.fixture
+def db(tmp_path):
+    writer, reader = create_sqlite_engines(f"sqlite+aiosqlite:///{tmp_path / 'gc.db'}", single_writer=True)
+
+    async def setup() -> None:
+        async with writer.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(setup())
+    yield make_sessionmaker(writer, reader, write=True)
+    asyncio.run(writer.dispose())
+    asyncio.run(reader.dispose())
+
+
+def _counting(factory):
+    calls = []
+
+    def make():
+        calls.append(1)
+        return factory()
+
+    return make, calls
+
+
+def test_caller_holding_writer_bypasses_batch(db):
+    factory, batches = _counting(db)
+    group = GroupCommitter(factory, window=0.001)
+
+    async def scenario() -> None:
+        async with db() as s:
+            svc = TaskService(s, group=group)
+            await svc.list()  # транзакция открыта — писатель у этой сессии
+            task = await asyncio.wait_for(svc.create("x"), 5)
+            assert task.id
+        async with db() as s:
+            assert [t.title for t in await TaskService(s).list()] == ["x"]
+
+    asyncio.run(scenario())
+    assert batches == []
+
+
+def test_fresh_sessions_are_batched(db):
+    factory, batches = _counting(db)
+    group = GroupCommitter(factory, window=0.01)
+
+    async def one(i: int):
+        async with db() as s:
+            return await TaskService(s, group=group).create(f"t{i}")
+
+    async def scenario() -> list:
+        return await asyncio.wait_for(asyncio.gather(*(one(i) for i in range(10))), 5)
+
+    tasks = asyncio.run(scenario())
+    assert len({t.id for t in tasks}) == 10
+    assert len(batches) < 10
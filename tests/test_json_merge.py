@@ -0,0 +1,64 @@
+"""db.types.json_merge: одна семантика merge на всех диалектах — как dict.update."""
+
+import sqlalchemy as sa
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from process_tracker.db.types import JSON_AUTO, json_merge
+
+
+def _expected(old, patch):
+    out = dict(old or {})
+    out.update(patch)
+    return out
+
+
+@pytest.fixture()
+def table():
+    engine = sa.create_engine("sqlite://")
+    md = sa.MetaData()
+    t = sa.Table("t", md, sa.Column("id", sa.Integer, primary_key=True), sa.Column("fields", JSON_AUTO))
+    md.create_all(engine)
+    yield engine, t
+    engine.dispose()
+
+
+CASES = [
+    ({"a": 1, "n": {"x": 1, "y": 2}}, {"n": {"z": 3}}),            # вложенный объект заменяется целиком
+    ({"a": 1, "b": "s"}, {"b": None, "c": None}),                     # null записывается, ключ остаётся
+    ({"keep": None, "t": True}, {"f": False, "l": [1, None, True]}),  # null в колонке остаётся, bool — bool
+    (None, {"s": 'q"uote', "r": 1.5, "i": -3}),
+    ({"a": 1}, {}),
+]
+
+
+@pytest.mark.parametrize("old,patch", CASES)
+def test_sqlite_merge_is_shallow(table, old, patch):
+    engine, t = table
+    with engine.begin() as c:
+        c.execute(t.insert().values(id=1, fields=old))
+        c.execute(sa.update(t).where(t.c.id == 1).values(fields=json_merge(t.c.fields, patch)))
+        assert c.execute(sa.select(t.c.fields)).scalar_one() == _expected(old, patch)
+
+
+def test_sqlite_merge_executemany(table):
+    engine, t = table
+    stmt = (
+        sa.update(t)
+        .where(t.c.id == sa.bindparam("b_id"))
+        .values(fields=json_merge(t.c.fields, sa.bindparam("b_patch", type_=JSON_AUTO)))
+    )
+    with engine.begin() as c:
+        c.execute(t.insert(), [{"id": 1, "fields": {"a": 1}}, {"id": 2, "fields": {"b": {"x": 1}}}])
+        c.execute(stmt, [{"b_id": 1, "b_patch": {"a": None, "c": 2}}, {"b_id": 2, "b_patch": {"b": {"y": 1}}}])
+        rows = dict(c.execute(sa.select(t.c.id, t.c.fields)).all())
+    assert rows == {1: {"a": None, "c": 2}, 2: {"b": {"y": 1}}}
+
+
+def test_postgres_merge_is_shallow_and_keeps_nulls():
+    t = sa.table("t", sa.column("fields", JSON_AUTO))
+    sql = str(sa.update(t).values(fields=json_merge(t.c.fields, {"a": None})).compile(dialect=postgresql.dialect()))
+    # || — поверхностная замена ключей; null из patch остаётся значением (jsonb 'null')
+    assert "|| CAST(" in sql
+    assert " - " not in sql
+    assert "json_patch" not in sql
@@ -0,0 +1,43 @@
+"""db.ranking: rank_between всегда строго между соседями (или ValueError)."""
+
+import random
+
+import pytest
+
+from process_tracker.db.ranking import DIGITS, initial_rank, is_valid_rank, rank_between, spread_ranks
+
+
+def _random_rank(rng: random.Random) -> str:
+    n = rng.randint(1, 6)
+    body = "".join(rng.choice(DIGITS) for _ in range(n - 1))
+    return body + rng.choice(DIGITS[1:])  # валидный ранг не оканчивается на "0"
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rank_between_random_pairs(seed):
+    rng = random.Random(seed)
+    for _ in range(4000):
+        lo, hi = sorted((_random_rank(rng), _random_rank(rng)))
+        if rng.random() < 0.3:
+            hi = lo + _random_rank(rng)  # hi продолжает lo — самый «тесный» случай
+        if lo == hi:
+            continue
+        r = rank_between(lo, hi)
+        assert lo < r < hi, (lo, hi, r)
+        assert is_valid_rank(r)
+        assert rank_between(None, lo) < lo
+        assert rank_between(hi, None) > hi
+
+
+def test_rank_between_raises_when_hi_is_lo_with_zeros():
+    # такие пары дают старые данные (ранги на "0"); ранга между ними нет
+    for lo, hi in [("y1", "y10"), ("2", "20"), ("a", "a00")]:
+        with pytest.raises(ValueError):
+            rank_between(lo, hi)
+
+
+def test_generated_ranks_never_end_with_zero():
+    assert initial_rank()[-1] != "0"
+    ranks = spread_ranks(500)
+    assert ranks == sorted(ranks)
+    assert all(is_valid_rank(r) for r in ranks)
@@ -0,0 +1,51 @@
+"""routes/search.py: без индекса полнотекстового поиска (SQLite без FTS5) — 503, а не 500."""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from process_tracker.db.models import Base
+from process_tracker.db.sqlite import create_sqlite_engines, make_sessionmaker
+from process_tracker.routes import _deps
+from process_tracker.routes.search import router
+
+
+@pytest.fixture
+def client(tmp_path):
+    # схема без search_fts — как после init_db на сборке SQLite без FTS5
+    writer, reader = create_sqlite_engines(f"sqlite+aiosqlite:///{tmp_path / 'nofts.db'}", single_writer=True)
+
+    async def setup() -> None:
+        async with writer.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(setup())
+    Local = make_sessionmaker(writer, reader)
+
+    async def get_db():
+        async with Local() as s:
+            yield s
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[_deps.get_db] = get_db
+    app.dependency_overrides[_deps.get_current_user] = lambda: {"perms": ["*"]}
+    with TestClient(app) as c:
+        yield c
+    asyncio.run(writer.dispose())
+    asyncio.run(reader.dispose())
+
+
+def test_search_without_index_is_503(client):
+    r = client.get("/search", params={"q": "report"})
+    assert r.status_code == 503
+    assert r.json()["detail"] == "full-text search is not available"
+
+
+def test_search_without_allowed_kinds_skips_index(client):
+    client.app.dependency_overrides[_deps.get_current_user] = lambda: {"perms": []}
+    r = client.get("/search", params={"q": "report"})
+    assert r.status_code == 200
+    assert r.json() == {"q": "report", "items": []}
@@ -0,0 +1,97 @@
+"""core.async_utils.SingleFlight: каждый вызов ждёт общий результат в пределах своего дедлайна."""
+
+import asyncio
+
+import pytest
+
+from process_tracker.core.async_utils import SingleFlight, single_flight
+from process_tracker.core.deadline import DeadlineExceeded, deadline_scope, remaining
+
+
+def test_short_deadline_does_not_fail_coalesced_callers():
+    async def scenario() -> None:
+        sf = SingleFlight()
+        seen = []
+
+        async def work() -> int:
+            seen.append(remaining())
+            await asyncio.sleep(0.2)
+            return 42
+
+        async def call(seconds: float) -> int:
+            with deadline_scope(seconds):
+                return await sf.do("k", work, name="t")
+
+        leader = asyncio.create_task(call(30))
+        await asyncio.sleep(0)
+        short = asyncio.create_task(call(0.05))
+        with pytest.raises(DeadlineExceeded):
+            await short
+        assert not leader.done()
+        assert await leader == 42
+        assert seen == [None]  # общее вычисление не наследует дедлайн первого вызова
+
+    asyncio.run(scenario())
+
+
+def test_leader_deadline_without_waiters_cancels_work():
+    async def scenario() -> None:
+        sf = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def work() -> None:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with deadline_scope(0.05), pytest.raises(DeadlineExceeded):
+            await sf.do("k", work)
+        await asyncio.wait_for(cancelled.wait(), 1.0)
+
+    asyncio.run(scenario())
+
+
+class _FakeSession:
+    opened: list = []
+
+    async def __aenter__(self):
+        _FakeSession.opened.append(self)
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _Service:
+    def __init__(self, session):
+        self.session = session
+
+    @single_flight(session_factory=_FakeSession)
+    async def compute(self, x: int):
+        await asyncio.sleep(0.2)
+        return x, self.session
+
+
+def test_leader_returns_on_its_deadline_with_waiters():
+    # вычисление — на своей сессии, поэтому первый вызов уходит по своему дедлайну, не дожидаясь его
+    async def scenario() -> None:
+        leader_session = object()
+
+        async def call(seconds: float):
+            with deadline_scope(seconds):
+                return await _Service(leader_session).compute(1)
+
+        leader = asyncio.create_task(call(0.05))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(call(30))
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with pytest.raises(DeadlineExceeded):
+            await leader
+        assert loop.time() - started < 0.15
+        x, session = await follower
+        assert x == 1 and session is _FakeSession.opened[-1] and session is not leader_session
+
+    asyncio.run(scenario())
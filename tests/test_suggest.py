@@ -0,0 +1,54 @@
+"""services.suggest_service: индекс пользователей строится из db.models.User (id — те, что в Task.assignee_id)."""
+
+import asyncio
+
+import pytest
+
+from process_tracker.db.models import Base, User
+from process_tracker.db.sqlite import create_sqlite_engines, make_sessionmaker
+from process_tracker.services import suggest_service
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    writer, reader = create_sqlite_engines(f"sqlite+aiosqlite:///{tmp_path / 'sg.db'}", single_writer=True)
+
+    async def setup() -> None:
+        async with writer.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(setup())
+    factory = make_sessionmaker(writer, reader)
+    monkeypatch.setattr(suggest_service, "AsyncSessionLocal", factory)
+    monkeypatch.setattr(suggest_service, "users", suggest_service.PrefixIndex())
+    monkeypatch.setitem(
+        suggest_service._SOURCES, "users", (suggest_service.users, *suggest_service._SOURCES["users"][1:])
+    )
+    yield factory
+    asyncio.run(writer.dispose())
+    asyncio.run(reader.dispose())
+
+
+def test_users_from_db_and_refresh_on_events(session_factory):
+    async def scenario() -> None:
+        async with session_factory() as s:
+            ivan = User(email="ivan@example.com", display_name="Ivan Petrov")
+            gone = User(email="old@example.com", display_name="Old Timer", is_active=False)
+            s.add_all([ivan, gone])
+            await s.commit()
+
+        got = await suggest_service.suggest("users", "pet")  # индекс не загружен — грузится из БД
+        assert got == [{"id": ivan.id, "email": "ivan@example.com", "name": "Ivan Petrov"}]
+        assert await suggest_service.suggest("users", "old") == []  # неактивные не предлагаются
+
+        async with session_factory() as s:
+            maria = User(email="maria@example.com", display_name="Maria")
+            s.add(maria)
+            (await s.get(User, ivan.id)).is_active = False
+            await s.commit()
+        kind, ids = suggest_service._route({"type": "user_updated", "ids": [ivan.id, maria.id]})
+        assert kind == "users"
+        await suggest_service.refresh(kind, ids)
+        assert [u["id"] for u in await suggest_service.suggest("users", "")] == [maria.id]
+
+    asyncio.run(scenario())
@@ -0,0 +1,109 @@
+"""services.tags_service: булевы выражения над метками и обновление индекса по событиям импорта."""
+
+import asyncio
+import io
+import json
+import re
+
+import pytest
+
+from process_tracker.core.events import events
+from process_tracker.db.models import Base
+from process_tracker.db.sqlite import create_sqlite_engines, make_sessionmaker
+from process_tracker.services import import_service
+from process_tracker.services.tags_service import TagIndex, _apply_event
+
+# задача: (id, status, assignee_id); метки: a=1, b=2, c=3, "red team"=4, NOT=5 (имя — ключевое слово)
+TASKS = [(1, "open", None), (2, "open", 7), (3, "done", 7), (4, "done", None), (5, "open", 8)]
+PAIRS = [(1, 1), (1, 2), (2, 2), (2, 3), (3, 1), (3, 3), (4, 4), (5, 5)]
+
+
+@pytest.fixture
+def index() -> TagIndex:
+    ix = TagIndex()
+    ix.names = {"a": 1, "b": 2, "c": 3, "red team": 4, "NOT": 5}
+    ix.load(TASKS, PAIRS)
+    return ix
+
+
+def ids(ix: TagIndex, expr: str) -> list[int]:
+    return sorted(ix.evaluate(expr))
+
+
+@pytest.mark.parametrize(
+    "expr, expected",
+    [
+        ("a", [1, 3]),
+        ("a OR b AND c", [1, 2, 3]),          # AND сильнее OR: a OR (b AND c)
+        ("(a OR b) AND c", [2, 3]),
+        ("a b", [1]),                          # соседние термы — AND
+        ("a (b OR c)", [1, 3]),
+        ("a and not b", [3]),                  # ключевые слова без учёта регистра
+        ("NOT a", [2, 4, 5]),                  # дополнение до всех задач, включая задачи без меток
+        ("NOT NOT a", [1, 3]),
+        ("NOT (a OR b OR c)", [4, 5]),
+        ('"red team"', [4]),
+        ('"NOT"', [5]),                        # в кавычках — имя метки, а не оператор
+        ("status:done", [3, 4]),
+        ("assignee:7 NOT c", []),
+        ("assignee:none AND NOT status:done", [1]),
+        ("status:archived", []),               # неизвестный статус — пустое множество, не ошибка
+    ],
+)
+def test_evaluate(index, expr, expected):
+    assert ids(index, expr) == expected
+
+
+@pytest.mark.parametrize(
+    "expr, message",
+    [
+        ("", "empty expression"),
+        ("   ", "empty expression"),
+        ("missing", "unknown tag"),
+        ('"status:done"', "unknown tag"),      # в кавычках — имя метки, не фильтр статуса
+        ("a AND", "unexpected end"),
+        ("a OR", "unexpected end"),
+        ("NOT", "unexpected end"),
+        ("(a OR b", "missing ')'"),
+        ("a)", "unexpected ')'"),
+        ("OR a", "unexpected 'OR'"),
+        ('"red team', "unexpected input"),
+        ("assignee:x", "invalid assignee"),
+    ],
+)
+def test_evaluate_errors(index, expr, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        index.evaluate(expr)
+
+
+def test_import_events_refresh_only_inserted_ids():
+    assert _apply_event({"type": "task_import", "chunk": 0, "inserted": 2, "ids": [10, 11]}) == {10, 11}
+    assert _apply_event({"type": "task_import", "chunk": 1, "inserted": 2}) == set()  # COPY: ждём конца импорта
+    assert _apply_event({"type": "task_import", "done": True, "inserted": 4}) is None
+
+
+def test_import_publishes_ids_per_chunk(tmp_path, monkeypatch):
+    writer, reader = create_sqlite_engines(f"sqlite+aiosqlite:///{tmp_path / 'imp.db'}", single_writer=True)
+    monkeypatch.setattr(import_service, "AsyncWriteSessionLocal", make_sessionmaker(writer, reader, write=True))
+    data = "\n".join(json.dumps({"title": f"t{i}"}) for i in range(5)).encode()
+
+    async def scenario() -> list:
+        async with writer.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        q = await events.subscribe()
+        try:
+            progress = await import_service.import_records(io.BytesIO(data), "tasks", "ndjson", chunk_size=2)
+            assert progress.inserted == 5
+            got = []
+            while not q.empty():
+                got.append(q.get_nowait())
+            return got
+        finally:
+            await events.unsubscribe(q)
+            await writer.dispose()
+            await reader.dispose()
+
+    got = [ev for ev in asyncio.run(scenario()) if ev.get("type") == "task_import"]
+    assert [len(ev["ids"]) for ev in got] == [2, 2, 1]
+    assert sorted(i for ev in got for i in ev["ids"]) == [1, 2, 3, 4, 5]
+    assert not any(ev.get("done") for ev in got)